@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Reproducible throughput benchmarks for fitness and the DE/GA operators.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --out bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json --tolerance 0.15
+
+Every benchmark reseeds the RNGs and clears the fitness cache first, so runs
+on the same machine are comparable. Results (rates and tracemalloc peak
+memory) are written as JSON; with --baseline, any rate that dropped or peak
+that grew by more than the tolerance is flagged and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.database import load_card_db
+from src.deck import seed_rngs
+from src.deck_optimiser import (
+    NP,
+    build_initial_population,
+    crossover,
+    crossover_batch,
+    de_evolve,
+    generate_random_deck,
+    load_seed_decks,
+    mutate,
+    mutate_batch,
+    pick_donors,
+    sanitize_seed_deck,
+)
+from src.fitness import EvalContext, evaluate_fitness, fitness_batch
+from src.ga_optimizer import breed_batch, mutate_deck, run_ga, uniform_crossover
+from src.incremental import IncrementalScorer
+from src.local_search import SwapSearch
+
+SEED = 12345
+CARD_DB_PATH = os.path.join("data", "blue_eyes_clean.json")
+SEEDS_PATH   = os.path.join("data", "seed_decks.json")
+POP_SIZES    = (8, 16, 64)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark fitness and evolution throughput")
+    p.add_argument('--out', default=None,
+                   help='Write results JSON here (default: print only)')
+    p.add_argument('--baseline', default=None,
+                   help='Compare against a previous results JSON and flag regressions')
+    p.add_argument('--tolerance', type=float, default=0.10,
+                   help='Allowed fractional slowdown / memory growth (default=0.10)')
+    p.add_argument('--quick', action='store_true',
+                   help='Fewer repetitions, for smoke runs')
+    p.add_argument('--only', default=None,
+                   help='Run only benchmarks whose name contains this substring')
+    return p.parse_args()
+
+
+def _measure(fn: Callable[[], object], ops_per_call: int, min_time: float) -> Dict[str, float]:
+    """
+    Call `fn` until `min_time` seconds have passed, then once more under
+    tracemalloc. Returns ops/s and peak traced memory in KiB.
+    """
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'rate': calls * ops_per_call / elapsed, 'peak_kib': peak / 1024}
+
+
+def build_benchmarks(card_db: Dict, seeds: List[Dict[int, int]], quick: bool) -> Dict[str, Dict]:
+    """name -> {'fn', 'ops', 'unit', 'setup'} for every benchmark."""
+    ctx = EvalContext.for_card_db(card_db)
+    gens = 5 if quick else 20
+
+    seed_rngs(SEED)
+    seed_decks = [sanitize_seed_deck(s, card_db) for s in seeds]
+    random_decks = [generate_random_deck(card_db) for _ in range(64)]
+    seed_dicts = [d.to_dict() for d in seed_decks]
+    random_dicts = [d.to_dict() for d in random_decks]
+    random_counts = np.array([d.counts for d in random_decks] * 16)
+    a, b, c = random_decks[:3]
+    scorer = IncrementalScorer(seed_decks[0], ctx)
+    present = list(seed_decks[0].keys())
+    swaps = [[(present[i % len(present)], int(cid))]
+             for i, cid in enumerate(ctx.index.ids[:256])]
+    random_scores = [evaluate_fitness(d, ctx) for d in random_dicts]
+    pop_counts = np.array([d.counts for d in random_decks])
+    trial_targets = np.repeat(np.arange(len(random_decks)), 4)
+    donors = pick_donors(len(random_decks), trial_targets, np.random.default_rng(SEED))
+    # One DE generation's trials at the default NP, for the MIN_BATCH_TRIALS cutoff
+    np_decks = random_decks[:NP]
+    np_counts = pop_counts[:NP]
+    np_donors = pick_donors(NP, np.arange(NP), np.random.default_rng(SEED))
+    search = SwapSearch(ctx)
+    ls_counts, ls_agg, _ = search.start(seed_decks[0])
+
+    benches: Dict[str, Dict] = {
+        'fitness.seed_decks': {
+            'fn': lambda: [evaluate_fitness(d, ctx) for d in seed_dicts],
+            'ops': len(seed_dicts), 'unit': 'evals/s'},
+        'fitness.random_decks': {
+            'fn': lambda: [evaluate_fitness(d, ctx) for d in random_dicts],
+            'ops': len(random_dicts), 'unit': 'evals/s'},
+        'fitness.random_deck_objects': {
+            'fn': lambda: [evaluate_fitness(d, ctx) for d in random_decks],
+            'ops': len(random_decks), 'unit': 'evals/s'},
+        'fitness.batch_random': {
+            'fn': lambda: fitness_batch(random_counts, ctx),
+            'ops': len(random_counts), 'unit': 'evals/s'},
+        'fitness.incremental_swap': {
+            'fn': lambda: [scorer.peek(e) for e in swaps],
+            'ops': len(swaps), 'unit': 'evals/s'},
+        'local_search.neighbours': {
+            'fn': lambda: search.neighbours(ls_counts, ls_agg),
+            'ops': len(present) * len(ctx.index), 'unit': 'evals/s'},
+        'de.mutate': {
+            'fn': lambda: mutate(a, b, c, card_db), 'ops': 1, 'unit': 'ops/s'},
+        'de.crossover': {
+            'fn': lambda: crossover(a, b, card_db), 'ops': 1, 'unit': 'ops/s'},
+        'de.trials_batch': {
+            'fn': lambda: crossover_batch(pop_counts[trial_targets],
+                                          mutate_batch(pop_counts, donors, card_db), card_db),
+            'ops': len(trial_targets), 'unit': 'ops/s'},
+        f'de.trials_scalar.np{NP}': {
+            'fn': lambda: [crossover(np_decks[i], mutate(*(np_decks[j] for j in d), card_db), card_db)
+                           for i, d in enumerate(np_donors.tolist())],
+            'ops': NP, 'unit': 'ops/s'},
+        f'de.trials_batch.np{NP}': {
+            'fn': lambda: crossover_batch(np_counts, mutate_batch(np_counts, np_donors, card_db),
+                                          card_db),
+            'ops': NP, 'unit': 'ops/s'},
+        'de.sanitize_seed_deck': {
+            'fn': lambda: [sanitize_seed_deck(s, card_db) for s in seeds],
+            'ops': len(seeds), 'unit': 'ops/s'},
+        'ga.mutate_deck': {
+            'fn': lambda: mutate_deck(a, card_db), 'ops': 1, 'unit': 'ops/s'},
+        'ga.uniform_crossover': {
+            'fn': lambda: uniform_crossover(a, b), 'ops': 1, 'unit': 'ops/s'},
+        'ga.breed_batch': {
+            'fn': lambda: breed_batch(random_decks, random_scores, 256, card_db),
+            'ops': 256, 'unit': 'ops/s'},
+    }
+
+    for size in POP_SIZES:
+        init_pop = build_initial_population(card_db, seeds, size)
+        benches[f'de.evolve.np{size}'] = {
+            'fn': (lambda pop=init_pop: de_evolve(card_db, list(pop), gens, None, verbosity='quiet')),
+            'ops': gens, 'unit': 'gens/s'}
+        benches[f'ga.run.np{size}'] = {
+            'fn': (lambda size=size: run_ga(card_db, seeds, gens, verbose=False, pop_size=size)),
+            'ops': gens, 'unit': 'gens/s'}
+    return benches
+
+
+def run_benchmarks(quick: bool = False, only: str = None) -> Dict:
+    card_db = load_card_db(CARD_DB_PATH)
+    seeds = load_seed_decks(SEEDS_PATH)
+    ctx = EvalContext.for_card_db(card_db)
+    min_time = 0.2 if quick else 1.0
+
+    results: Dict[str, Dict] = {}
+    for name, bench in build_benchmarks(card_db, seeds, quick).items():
+        if only and only not in name:
+            continue
+        seed_rngs(SEED)
+        ctx.cache.clear()
+        res = _measure(bench['fn'], bench['ops'], min_time)
+        res['unit'] = bench['unit']
+        results[name] = res
+        print(f"{name:28s} {res['rate']:12.1f} {res['unit']:8s} peak {res['peak_kib']:9.1f} KiB")
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regression messages (empty if none)."""
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        cur = current['results'].get(name)
+        if cur is None:
+            continue
+        if cur['rate'] < base['rate'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: rate {cur['rate']:.1f} < baseline {base['rate']:.1f} {cur['unit']}")
+        if cur['peak_kib'] > base['peak_kib'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak {cur['peak_kib']:.1f} > baseline {base['peak_kib']:.1f} KiB")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    current = run_benchmarks(args.quick, args.only)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nResults written to '{args.out}'")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"\n[WARN] {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for msg in regressions:
+                print(f"  {msg}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against '{args.baseline}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.database import load_card_db
+from src.deck import Deck, get_rng, seed_rngs
+from src.deck_optimiser import (
+    format_deck,
+    generate_random_deck,
+    load_seed_decks,
+    sanitize_seed_deck,
+)
+from src.fitness import EvalContext, fitness, set_exact_hand_rates, set_rules
+from src.incremental import IncrementalScorer
+from src.rules import load_rules
+
+# == ANNEALING / TABU PARAMETERS ==
+STEPS        = 20000   # moves per run (one fitness evaluation each for SA)
+T_END        = 0.01    # final temperature
+T0_ACCEPT    = 0.5     # acceptance of the smallest worsening move at the start
+T0_SAMPLES   = 200     # random moves sampled to calibrate the start temperature
+TABU_TENURE  = 7       # steps a reversed move stays forbidden
+CANDIDATES   = 20      # sampled swaps scored per tabu step
+
+CARD_DB_PATH = os.path.join("data", "blue_eyes_clean.json")
+SEEDS_PATH   = os.path.join("data", "seed_decks.json")
+
+# Swap = (card position removed, card position added)
+Swap = Tuple[int, int]
+
+
+# == Cooling schedules: temperature at `step` of `steps`, from t0 down to t_end ==
+def geometric_cooling(t0: float, t_end: float, step: int, steps: int) -> float:
+    return t0 * (t_end / t0) ** (step / max(steps - 1, 1))
+
+
+def linear_cooling(t0: float, t_end: float, step: int, steps: int) -> float:
+    return t0 + (t_end - t0) * step / max(steps - 1, 1)
+
+
+def logarithmic_cooling(t0: float, t_end: float, step: int, steps: int) -> float:
+    # Slow classic schedule t0 / ln(e + k), floored at t_end
+    return max(t0 / math.log(math.e + step), t_end)
+
+
+SCHEDULES: Dict[str, Callable[[float, float, int, int], float]] = {
+    'geometric': geometric_cooling,
+    'linear': linear_cooling,
+    'logarithmic': logarithmic_cooling,
+}
+
+
+class SwapTrajectory:
+    """
+    One deck walked through one-card swaps (remove a copy, add a copy of a
+    card with banlist room), so every state is a legal deck of fixed size.
+
+    In exact mode moves are scored through an IncrementalScorer (only the
+    two edited cards are touched); with Monte Carlo hand rates each
+    proposal goes through fitness() and its cache.
+    """
+
+    def __init__(self, deck: Deck, ctx: EvalContext):
+        self.ctx = ctx
+        self.ids = ctx.index.ids
+        self.limits = ctx.index.limits
+        self.counts = deck.counts.astype(np.int64)
+        self.evaluated = 0
+        self._scorer = IncrementalScorer(deck, ctx) if ctx.exact else None
+        self.score = self._scorer.score if self._scorer else fitness(deck, ctx)
+
+    def random_swap(self, rng: np.random.Generator) -> Swap:
+        """A uniformly drawn copy out, a uniformly drawn card with room in."""
+        slots = np.repeat(np.arange(len(self.counts)), self.counts)
+        remove = int(slots[rng.integers(len(slots))])
+        room = np.flatnonzero(self.counts < self.limits)
+        room = room[room != remove]
+        return remove, int(room[rng.integers(len(room))])
+
+    def _edit(self, move: Swap) -> List[Tuple[int, int]]:
+        return [(int(self.ids[move[0]]), int(self.ids[move[1]]))]
+
+    def peek(self, move: Swap) -> float:
+        """Score after `move`, leaving the deck unchanged."""
+        self.evaluated += 1
+        if self._scorer:
+            return self._scorer.peek(self._edit(move))
+        counts = self.counts.copy()
+        counts[move[0]] -= 1
+        counts[move[1]] += 1
+        return fitness(Deck(self.ctx.index, counts.astype(np.uint8)), self.ctx)
+
+    def apply(self, move: Swap, score: float) -> None:
+        self.counts[move[0]] -= 1
+        self.counts[move[1]] += 1
+        if self._scorer:
+            self._scorer.apply(self._edit(move))
+        self.score = score
+
+    def deck(self) -> Deck:
+        return Deck(self.ctx.index, self.counts.astype(np.uint8))
+
+
+def initial_temperature(walk: SwapTrajectory, rng: np.random.Generator,
+                        samples: int = T0_SAMPLES, accept: float = T0_ACCEPT) -> float:
+    """
+    Temperature at which the smallest worsening among `samples` random
+    moves from the start deck is accepted with probability `accept`.
+    Rule scores move in steps of whole points, and a start hot enough for
+    the average loss dissolves the deck, so the finest step sets the scale.
+    """
+    losses = [walk.score - walk.peek(walk.random_swap(rng)) for _ in range(samples)]
+    losses = [d for d in losses if 0 < d < float('inf')]
+    return -(min(losses) if losses else 1.0) / math.log(accept)
+
+
+def anneal(
+    deck: Deck,
+    ctx: EvalContext,
+    steps: int = STEPS,
+    schedule: str = 'geometric',
+    t0: Optional[float] = None,
+    t_end: float = T_END,
+    verbose: bool = True
+) -> Tuple[Deck, float, SwapTrajectory]:
+    """
+    Simulated annealing from `deck`: each step scores one random swap and
+    takes it if it is no worse, or with probability exp(delta / T) if it
+    is. T follows `schedule` from `t0` (calibrated when None) to `t_end`.
+    Returns (best deck seen, its fitness, the trajectory).
+    """
+    cool = SCHEDULES[schedule]
+    rng = get_rng()
+    walk = SwapTrajectory(deck, ctx)
+    if t0 is None:
+        t0 = initial_temperature(walk, rng)
+    best_counts, best_score = walk.counts.copy(), walk.score
+    accepted = 0
+    report = max(steps // 10, 1)
+    for step in range(steps):
+        temp = cool(t0, t_end, step, steps)
+        move = walk.random_swap(rng)
+        score = walk.peek(move)
+        delta = score - walk.score
+        if delta >= 0 or (delta > float('-inf') and rng.random() < math.exp(delta / temp)):
+            walk.apply(move, score)
+            accepted += 1
+            if score > best_score:
+                best_counts, best_score = walk.counts.copy(), score
+        if verbose and (step + 1) % report == 0:
+            print(f"Step {step + 1:6d}: T={temp:.4f}  current={walk.score:.2f}  "
+                  f"best={best_score:.2f}  accepted={accepted / (step + 1):.1%}")
+    return Deck(ctx.index, best_counts.astype(np.uint8)), best_score, walk
+
+
+def tabu_search(
+    deck: Deck,
+    ctx: EvalContext,
+    steps: int = STEPS,
+    tenure: int = TABU_TENURE,
+    candidates: int = CANDIDATES,
+    verbose: bool = True
+) -> Tuple[Deck, float, SwapTrajectory]:
+    """
+    Tabu search from `deck`: each step scores `candidates` random swaps and
+    takes the best one that is not tabu, even if it is worse. After a swap
+    (r, a), re-adding r and removing a are tabu for `tenure` steps; the
+    tabu list is a hash map from (card, direction) to its expiry step.
+    A tabu swap is still allowed if it beats the best deck seen
+    (aspiration). Returns (best deck seen, its fitness, the trajectory).
+    """
+    rng = get_rng()
+    walk = SwapTrajectory(deck, ctx)
+    tabu: Dict[Tuple[int, int], int] = {}
+    best_counts, best_score = walk.counts.copy(), walk.score
+    report = max(steps // 10, 1)
+    for step in range(steps):
+        chosen, chosen_score = None, float('-inf')
+        for _ in range(candidates):
+            move = walk.random_swap(rng)
+            score = walk.peek(move)
+            forbidden = tabu.get((move[0], -1), -1) >= step or tabu.get((move[1], +1), -1) >= step
+            if forbidden and score <= best_score:
+                continue
+            if score > chosen_score:
+                chosen, chosen_score = move, score
+        if chosen is not None:
+            walk.apply(chosen, chosen_score)
+            # Undoing the swap means adding the removed card or removing the added one
+            tabu[(chosen[0], +1)] = step + tenure
+            tabu[(chosen[1], -1)] = step + tenure
+            if chosen_score > best_score:
+                best_counts, best_score = walk.counts.copy(), chosen_score
+        if len(tabu) > 4 * tenure:
+            tabu = {k: v for k, v in tabu.items() if v >= step}
+        if verbose and (step + 1) % report == 0:
+            print(f"Step {step + 1:6d}: current={walk.score:.2f}  best={best_score:.2f}")
+    return Deck(ctx.index, best_counts.astype(np.uint8)), best_score, walk
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Polish a Yu-Gi-Oh! deck by simulated annealing or tabu search")
+    p.add_argument('--method', choices=('anneal', 'tabu'), default='anneal',
+                   help='Single-trajectory method (default=anneal)')
+    p.add_argument('-n', '--steps', type=int, default=STEPS,
+                   help=f'Moves per run (default={STEPS})')
+    p.add_argument('--schedule', choices=sorted(SCHEDULES), default='geometric',
+                   help='Annealing cooling schedule (default=geometric)')
+    p.add_argument('--t0', type=float, default=None,
+                   help='Start temperature (default: calibrated from random moves)')
+    p.add_argument('--t-end', type=float, default=T_END,
+                   help=f'Final temperature (default={T_END})')
+    p.add_argument('--tenure', type=int, default=TABU_TENURE,
+                   help=f'Tabu tenure in steps (default={TABU_TENURE})')
+    p.add_argument('--candidates', type=int, default=CANDIDATES,
+                   help=f'Swaps scored per tabu step (default={CANDIDATES})')
+    p.add_argument('--random-start', action='store_true',
+                   help='Start from a random deck instead of the best seed deck')
+    p.add_argument('--monte-carlo', action='store_true',
+                   help='Estimate hand rates by sampling instead of exactly')
+    p.add_argument('--rules', default=None, metavar='PATH',
+                   help='Score decks with the rule file at PATH instead of the built-in rules')
+    p.add_argument('--seed', type=int, default=None,
+                   help='RNG seed')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.monte_carlo:
+        set_exact_hand_rates(False)
+    if args.rules:
+        set_rules(load_rules(args.rules))
+    if args.seed is not None:
+        seed_rngs(args.seed)
+    card_db = load_card_db(CARD_DB_PATH)
+    ctx = EvalContext.for_card_db(card_db)
+    seeds = [sanitize_seed_deck(s, card_db) for s in load_seed_decks(SEEDS_PATH)]
+    if args.random_start or not seeds:
+        start = generate_random_deck(card_db)
+    else:
+        start = max(seeds, key=lambda d: fitness(d, ctx))
+    print(f"Start fitness = {fitness(start, ctx):.2f}")
+
+    t = time.perf_counter()
+    if args.method == 'anneal':
+        best_deck, best_score, walk = anneal(start, ctx, args.steps, args.schedule,
+                                             args.t0, args.t_end)
+    else:
+        best_deck, best_score, walk = tabu_search(start, ctx, args.steps, args.tenure,
+                                                  args.candidates)
+    elapsed = time.perf_counter() - t
+    print(f"{walk.evaluated} evaluations in {elapsed:.2f}s "
+          f"({walk.evaluated / max(elapsed, 1e-9):,.0f}/s)")
+
+    print(f"\n=== Best Deck After {'Annealing' if args.method == 'anneal' else 'Tabu Search'} ===")
+    print(f"Fitness = {best_score:.2f}")
+    print(format_deck(best_deck, card_db))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+# Type-category bits stored per card
+CAT_MONSTER = 1
+CAT_SPELL   = 2
+CAT_TRAP    = 4
+
+# Bump when the compiled index layout changes
+INDEX_VERSION = 1
+
+
+def type_categories(types: Iterable[str]) -> np.ndarray:
+    """Bitmask of CAT_* flags for each type string."""
+    cats = []
+    for t in types:
+        t = t or ''
+        cats.append((CAT_MONSTER if 'Monster' in t else 0)
+                    | (CAT_SPELL if 'Spell' in t else 0)
+                    | (CAT_TRAP if 'Trap' in t else 0))
+    return np.asarray(cats, dtype=np.uint8)
+
+
+def _pack_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 blob plus (n+1) offsets for a list of strings."""
+    encoded = [(s or '').encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class CardIndex:
+    """
+    Dense view of a card DB: card i of the pool sits at position i of every
+    per-card vector (ids, types, banlist limits), so decks can be stored as
+    count vectors and scored with array operations.
+    """
+
+    def __init__(self, ids: Iterable[int], names: List[str], types: List[str],
+                 limits: Iterable[int], categories: Optional[np.ndarray] = None):
+        self.ids = np.asarray(list(ids), dtype=np.int64)
+        self.names = list(names)
+        self.types = list(types)
+        self.limits = np.asarray(list(limits), dtype=np.uint8)
+        self.categories = (type_categories(self.types) if categories is None
+                           else np.asarray(categories, dtype=np.uint8))
+        self.pos: Dict[int, int] = {int(cid): i for i, cid in enumerate(self.ids.tolist())}
+        self._units: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_card_db(cls, card_db: Dict[int, Dict[str, Any]]) -> 'CardIndex':
+        return cls(
+            ids=card_db.keys(),
+            names=[info['name'] for info in card_db.values()],
+            types=[info['type'] for info in card_db.values()],
+            limits=[info['banlist_limit'] for info in card_db.values()],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def capacity_units(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        One unit per allowed copy of every card, in card order:
+        (card position of each unit, index of each card's first unit,
+        int64 limits). Built once and shared by every deck repair.
+        """
+        if self._units is None:
+            limits = self.limits.astype(np.int64)
+            unit_card = np.repeat(np.arange(len(self)), limits)
+            first_unit = np.cumsum(limits) - limits
+            self._units = (unit_card, first_unit, limits)
+        return self._units
+
+    def mask(self, card_ids: Iterable[int]) -> np.ndarray:
+        """Boolean vector marking the given card IDs (unknown IDs are ignored)."""
+        m = np.zeros(len(self), dtype=bool)
+        for cid in card_ids:
+            i = self.pos.get(cid)
+            if i is not None:
+                m[i] = True
+        return m
+
+    def type_mask(self, *types: str) -> np.ndarray:
+        """Boolean vector of cards whose type is exactly one of `types`."""
+        return np.array([t in types for t in self.types], dtype=bool)
+
+    def category_mask(self, category: int) -> np.ndarray:
+        """Boolean vector of cards with any of the given CAT_* bits."""
+        return (self.categories & category) != 0
+
+    def to_counts(self, deck: Mapping[int, int]) -> np.ndarray:
+        """Count vector for a {card_id: count} deck; raises KeyError on unknown IDs."""
+        counts = np.zeros(len(self), dtype=np.int64)
+        for cid, cnt in deck.items():
+            counts[self.pos[cid]] = cnt
+        return counts
+
+    def to_counts_matrix(self, decks: Iterable[Mapping[int, int]]) -> np.ndarray:
+        """Stack decks into a (population x card-pool) count matrix."""
+        return np.array([self.to_counts(d) for d in decks], dtype=np.int64).reshape(-1, len(self))
+
+    def from_counts(self, counts: np.ndarray) -> Dict[int, int]:
+        """{card_id: count} dict for a count vector."""
+        nz = np.flatnonzero(counts)
+        return dict(zip(self.ids[nz].tolist(), np.asarray(counts)[nz].tolist()))
+
+    def to_card_db(self) -> Dict[int, Dict[str, Any]]:
+        """Card DB dict in the shape returned by load_card_db."""
+        return {
+            cid: {'name': name, 'type': ctype, 'banlist_limit': limit}
+            for cid, name, ctype, limit in zip(
+                self.ids.tolist(), self.names, self.types, self.limits.tolist())
+        }
+
+    # -- Compiled (.npz) form --
+    def save(self, path: str, source: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Write the index as an uncompressed .npz. `source` records the
+        mtime_ns / size / sha256 of the JSON it was compiled from.
+        """
+        source = source or {}
+        type_table = sorted(set(t or '' for t in self.types))
+        type_code = {t: i for i, t in enumerate(type_table)}
+        name_blob, name_offsets = _pack_strings(self.names)
+        type_blob, type_offsets = _pack_strings(type_table)
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.int64(INDEX_VERSION),
+                ids=self.ids,
+                limits=self.limits,
+                categories=self.categories,
+                type_codes=np.array([type_code[t or ''] for t in self.types], dtype=np.uint16),
+                type_blob=type_blob,
+                type_offsets=type_offsets,
+                name_blob=name_blob,
+                name_offsets=name_offsets,
+                source_mtime_ns=np.int64(source.get('mtime_ns', -1)),
+                source_size=np.int64(source.get('size', -1)),
+                source_sha256=np.frombuffer(bytes.fromhex(source.get('sha256', '')), dtype=np.uint8),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> Tuple['CardIndex', Dict[str, Any]]:
+        """Read a compiled index; returns (index, source metadata)."""
+        with np.load(path) as data:
+            if int(data['version']) != INDEX_VERSION:
+                raise ValueError(f"Unsupported card index version in {path}")
+            type_table = _unpack_strings(data['type_blob'], data['type_offsets'])
+            index = cls(
+                ids=data['ids'],
+                names=_unpack_strings(data['name_blob'], data['name_offsets']),
+                types=[type_table[c] for c in data['type_codes'].tolist()],
+                limits=data['limits'],
+                categories=data['categories'],
+            )
+            source = {
+                'mtime_ns': int(data['source_mtime_ns']),
+                'size': int(data['source_size']),
+                'sha256': data['source_sha256'].tobytes().hex(),
+            }
+        return index, source
+
+
+# One CardIndex per card DB object, so every deck built from the same DB
+# shares positions (and the scorer's precomputed features).
+_INDEX_BY_DB: Dict[int, Tuple[Dict[int, Dict[str, Any]], CardIndex]] = {}
+
+
+def card_index_for(card_db: Dict[int, Dict[str, Any]]) -> CardIndex:
+    entry = _INDEX_BY_DB.get(id(card_db))
+    if entry is None or entry[0] is not card_db:
+        entry = (card_db, CardIndex.from_card_db(card_db))
+        _INDEX_BY_DB[id(card_db)] = entry
+    return entry[1]
+
+
+def register_card_db(card_db: Dict[int, Dict[str, Any]], index: CardIndex) -> None:
+    """Record that `card_db` was built from `index`, so card_index_for reuses it."""
+    _INDEX_BY_DB[id(card_db)] = (card_db, index)
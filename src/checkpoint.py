@@ -0,0 +1,212 @@
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.card_index import CardIndex
+from src.deck import Deck, get_rng
+
+# == CHECKPOINT PARAMETERS ==
+CHECKPOINT_EVERY = 100   # default generations between checkpoints
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(
+    path: str,
+    engine: str,
+    gen: int,
+    pop: Sequence[Deck],
+    history: Any,
+    ctx,
+    evaluator=None,
+    surrogate=None,
+    racer=None
+) -> None:
+    """
+    Atomically write everything needed to continue a run after `gen`:
+    the population as a uint8 count matrix, the fitness history, both RNG
+    states, the shared hand bank and the evaluator's batch counter. In Monte Carlo mode cached
+    scores are themselves random draws, so the fitness cache is stored too.
+    A `surrogate`'s learned fit and a `racer`'s remembered hands are stored
+    with the run they serve.
+    """
+    meta = {
+        'version': CHECKPOINT_VERSION,
+        'engine': engine,
+        'gen': gen,
+        'history': sorted(history.items()) if isinstance(history, dict) else list(history),
+        'n_cards': len(ctx.index),
+        'exact': ctx.exact,
+        'random_state': random.getstate(),
+        'numpy_state': get_rng().bit_generator.state,
+        'eval_seed': evaluator.seed if evaluator is not None else None,
+        'eval_batches': evaluator.batches if evaluator is not None else 0,
+        'cache_hits': ctx.cache.hits,
+        'cache_misses': ctx.cache.misses,
+        'hand_bank': list(ctx.hand_bank.state()) if ctx.hand_bank is not None else None,
+    }
+    arrays = {
+        'pop': np.array([d.counts for d in pop], dtype=np.uint8),
+    }
+    _put_state(meta, arrays, 'surrogate', surrogate)
+    _put_state(meta, arrays, 'racer', racer)
+    arrays['meta'] = np.array(json.dumps(meta))
+    if not ctx.exact:
+        n = len(ctx.index)
+        entries = [(k, s) for k, s in ctx.cache._scores.items()
+                   if isinstance(k, bytes) and len(k) == n]
+        arrays['cache_keys'] = np.frombuffer(b''.join(k for k, _ in entries),
+                                             dtype=np.uint8).reshape(len(entries), n)
+        arrays['cache_scores'] = np.array([s for _, s in entries], dtype=np.float64)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.ckpt-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _put_state(meta: Dict[str, Any], arrays: Dict[str, np.ndarray], name: str, obj) -> None:
+    """Split obj.state() into npz arrays ('<name>.<key>') and JSON meta."""
+    if obj is None:
+        meta[name] = None
+        return
+    state = obj.state()
+    meta[name] = {k: v for k, v in state.items() if not isinstance(v, np.ndarray)}
+    for k, v in state.items():
+        if isinstance(v, np.ndarray):
+            arrays[f'{name}.{k}'] = v
+
+
+def _get_state(meta: Dict[str, Any], data, name: str) -> Optional[Dict[str, Any]]:
+    """Inverse of _put_state; None if the checkpoint holds no such state."""
+    if meta.get(name) is None:
+        return None
+    state = dict(meta[name])
+    prefix = f'{name}.'
+    for key in data.files:
+        if key.startswith(prefix):
+            state[key[len(prefix):]] = data[key]
+    return state
+
+
+def load_checkpoint(path: str, index: CardIndex) -> Dict[str, Any]:
+    """
+    Read a checkpoint written by save_checkpoint. The population comes back
+    as Decks over `index`; raises ValueError if the card pool has changed.
+    """
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        pop = data['pop']
+        cache_keys = data['cache_keys'] if 'cache_keys' in data else None
+        cache_scores = data['cache_scores'] if 'cache_scores' in data else None
+        surrogate = _get_state(meta, data, 'surrogate')
+        racer = _get_state(meta, data, 'racer')
+
+    if meta['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {meta['version']} in '{path}'")
+    if meta['n_cards'] != len(index):
+        raise ValueError(f"Checkpoint '{path}' was written for {meta['n_cards']} cards, "
+                         f"the card pool has {len(index)}")
+
+    if meta['engine'] == 'de':
+        history: Any = {int(g): score for g, score in meta['history']}
+    else:
+        history = list(meta['history'])
+    state = dict(meta)
+    state['history'] = history
+    state['pop'] = [Deck(index, row) for row in pop]
+    state['cache_keys'] = cache_keys
+    state['cache_scores'] = cache_scores
+    state['surrogate'] = surrogate
+    state['racer'] = racer
+    return state
+
+
+def _as_tuple(x: Any) -> Any:
+    return tuple(_as_tuple(v) for v in x) if isinstance(x, list) else x
+
+
+def restore_checkpoint(state: Dict[str, Any], ctx, evaluator=None, surrogate=None,
+                       racer=None) -> None:
+    """
+    Put the RNGs, fitness cache, evaluator, surrogate and racer back where
+    the checkpointed run left them, so the resumed run continues bit-for-bit.
+    """
+    if state['exact'] != ctx.exact:
+        mode = 'exact' if state['exact'] else 'Monte Carlo'
+        raise ValueError(f"Checkpoint was written in {mode} mode; rerun with the same mode")
+    if state.get('hand_bank') is not None:
+        if ctx.hand_bank is None:
+            raise ValueError("Checkpoint was written with common random numbers; rerun with --crn")
+        ctx.hand_bank.set_state(state['hand_bank'])
+    random.setstate(_as_tuple(state['random_state']))
+    get_rng().bit_generator.state = state['numpy_state']
+
+    if state['cache_keys'] is not None:
+        ctx.cache.clear()
+        for row, score in zip(state['cache_keys'], state['cache_scores']):
+            ctx.cache.put(row.tobytes(), float(score))
+    ctx.cache.hits = state['cache_hits']
+    ctx.cache.misses = state['cache_misses']
+
+    if evaluator is not None:
+        evaluator.batches = state['eval_batches']
+    if state.get('surrogate') is not None:
+        if surrogate is None:
+            raise ValueError("Checkpoint was written with a surrogate; rerun with --surrogate")
+        surrogate.set_state(state['surrogate'])
+    if state.get('racer') is not None:
+        if racer is None:
+            raise ValueError("Checkpoint was written with racing; rerun with --race")
+        racer.set_state(state['racer'])
+
+
+class Checkpointer:
+    """
+    Decides when to checkpoint: every `every` generations and/or once
+    `seconds` have passed since the last save. The last generation of a
+    run is always saved.
+    """
+
+    def __init__(self, path: str, engine: str, every: Optional[int] = None,
+                 seconds: Optional[float] = None):
+        self.path = path
+        self.engine = engine
+        self.every = every if every or seconds else CHECKPOINT_EVERY
+        self.seconds = seconds
+        self._last = time.monotonic()
+
+    def due(self, gen: int, final: bool = False) -> bool:
+        if final:
+            return True
+        if self.every and gen % self.every == 0:
+            return True
+        return bool(self.seconds) and time.monotonic() - self._last >= self.seconds
+
+    def maybe_save(self, gen: int, pop: List[Deck], history: Any, ctx,
+                   evaluator=None, final: bool = False, surrogate=None, racer=None) -> bool:
+        """Save if a checkpoint is due; returns whether one was written."""
+        if not self.due(gen, final):
+            return False
+        save_checkpoint(self.path, self.engine, gen, pop, history, ctx, evaluator, surrogate,
+                        racer)
+        self._last = time.monotonic()
+        return True
+
+
+def make_checkpointer(path: Optional[str], engine: str, every: Optional[int],
+                      seconds: Optional[float]) -> Optional[Checkpointer]:
+    """Checkpointer writing to `path`, or None if checkpointing is off."""
+    return Checkpointer(path, engine, every, seconds) if path else None
@@ -1,7 +1,9 @@
+import hashlib
 import json
-import requests
 import os
-from typing import List, Dict, Any
+from typing import Dict, Any
+
+from src.card_index import CardIndex, register_card_db
 
 DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'blue_eyes_clean.json')
 
@@ -13,43 +15,107 @@ BANLIST_MAPPING = {
 }
 
 
-def load_card_db(path: str = None) -> Dict[int, Dict[str, Any]]:
-    """
-    Load a JSON file of cards and return a dict mapping card_id to:
-      - name: str
-      - type: str
-      - banlist_limit: int
-    Defaults to blue_eyes_clean.json in data/ if path is None.
-    """
-    if path is None:
-        path = DEFAULT_DB_PATH
-    path = os.path.abspath(path)
+def card_entry(card: Dict[str, Any]) -> Dict[str, Any]:
+    """card_db entry (name, type, banlist_limit) for one card JSON object."""
+    status = card.get('banlist_status', 'Unlimited')
+    return {
+        'name': card.get('name'),
+        'type': card.get('type'),
+        'banlist_limit': BANLIST_MAPPING.get(status, 3)
+    }
+
+
+def _read_card_json(path: str) -> CardIndex:
+    """Parse a card JSON file into a CardIndex."""
     with open(path, 'r', encoding='utf-8') as f:
         cards = json.load(f)
 
     card_db: Dict[int, Dict[str, Any]] = {}
     for card in cards:
-        cid = int(card.get('id'))
-        status = card.get('banlist_status', 'Unlimited')
-        limit = BANLIST_MAPPING.get(status, 3)
-        card_db[cid] = {
-            'name': card.get('name'),
-            'type': card.get('type'),
-            'banlist_limit': limit
-        }
-    return card_db
+        card_db[int(card.get('id'))] = card_entry(card)
+    return CardIndex.from_card_db(card_db)
 
 
-def is_card_count_valid(card_id: int, count: int, card_db: Dict[int, Dict[str, Any]]) -> bool:
+def compiled_index_path(path: str) -> str:
+    """Compiled index sits beside the JSON: foo.json -> foo.idx.npz"""
+    return os.path.splitext(path)[0] + '.idx.npz'
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_card_index(path: str = None, rebuild: bool = False) -> CardIndex:
     """
-    Return True if count is between 1 and banlist_limit for card_id in card_db.
+    Load the card pool as a CardIndex from its compiled .idx.npz, which is
+    (re)built from the JSON whenever the JSON's mtime/size and content hash
+    no longer match. A touched-but-unchanged JSON only refreshes the stamp.
+    Falls back to in-memory parsing if the index cannot be written.
     """
-    info = card_db.get(card_id)
-    if not info:
-        return False
-    return 1 <= count <= info['banlist_limit']
+    if path is None:
+        path = DEFAULT_DB_PATH
+    path = os.path.abspath(path)
+    idx_path = compiled_index_path(path)
+    st = os.stat(path)
+    source = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+    index = None
+    if not rebuild and os.path.isfile(idx_path):
+        try:
+            index, stored = CardIndex.load(idx_path)
+        except (OSError, ValueError, KeyError):
+            index = None
+        else:
+            if stored['mtime_ns'] == source['mtime_ns'] and stored['size'] == source['size']:
+                return index
+            source['sha256'] = _file_sha256(path)
+            if stored['sha256'] != source['sha256']:
+                index = None
+
+    if index is None:
+        index = _read_card_json(path)
+    source.setdefault('sha256', _file_sha256(path))
+    write_card_index(path, index, source)
+    return index
+
+
+def write_card_index(path: str, index: CardIndex, source: Dict[str, Any] = None) -> None:
+    """
+    Atomically write `index` as the compiled index of the JSON at `path`,
+    stamped with the JSON's mtime/size/hash (computed if `source` is None).
+    """
+    path = os.path.abspath(path)
+    idx_path = compiled_index_path(path)
+    if source is None:
+        st = os.stat(path)
+        source = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                  'sha256': _file_sha256(path)}
+    try:
+        tmp_path = idx_path + '.tmp'
+        index.save(tmp_path, source)
+        os.replace(tmp_path, idx_path)
+    except OSError as e:
+        print(f"[WARN] Could not write card index {idx_path}: {e}")
 
 
+def load_card_db(path: str = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Load a JSON file of cards and return a dict mapping card_id to:
+      - name: str
+      - type: str
+      - banlist_limit: int
+    Defaults to blue_eyes_clean.json in data/ if path is None.
+    Reads the compiled index beside the JSON (see load_card_index).
+    """
+    index = load_card_index(path)
+    card_db = index.to_card_db()
+    register_card_db(card_db, index)
+    return card_db
+
 
 # API endpoints
 API_ALL_URL   = "https://db.ygoprodeck.com/api/v7/cardinfo.php"
@@ -64,71 +130,37 @@ DESIRED_RACES     = ["Dragon", "Spellcaster"]
 EXCLUDE_SUBTYPES  = ["Equip Spell", "Ritual Spell", "Ritual Monster"]
 # Explicit cards to always include
 EXPLICIT_INCLUDES = ["Piri Reis Map", "Wishes for Eyes of Blue", "Roar Of The Blue-Eyed Dragons"]
+# Archetypes dropped from the final pool
+EXCLUDE_ARCHETYPES = {'Genex', 'Performapal', 'Odd-Eyes', 'Dragunity', 'D/D/D', 'D/D',
+                      'D/D/D/D', 'D/D/D/D/D', 'Photon', 'Malefic', 'Gishki',
+                      'Gusto', 'Gem-Knight', 'Fabled', 'Nekroz', 'Noble Knight', 'Aether'}
+# Fields kept in the clean pool JSON
+CLEAN_FIELDS = ('id', 'name', 'type', 'archetype')
 
 
-def fetch_cards(url: str) -> List[Dict[str, Any]]:
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    return data.get('data', [])
-
-
-def filter_main_deck(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Remove Extra Deck / Pendulum cards."""
-    return [c for c in cards
-            if not any(extra in c.get('type', '') for extra in EXTRA_DECK_TYPES)]
-
-
-def filter_monsters(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Keep only monsters of desired races."""
-    return [c for c in cards
-            if 'Monster' in c.get('type', '') and c.get('race') in DESIRED_RACES]
+def is_main_deck(c: Dict[str, Any]) -> bool:
+    return not any(extra in c.get('type', '') for extra in EXTRA_DECK_TYPES)
 
 
-def filter_spells_traps(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Keep only Blue-Eyes spells/traps or explicit includes."""
-    filtered = []
-    for c in cards:
-        ctype = c.get('type', '')
-        name  = c.get('name')
-        arche = c.get('archetype')
-        if ('Spell' in ctype or 'Trap' in ctype) and (arche == 'Blue-Eyes' or name in EXPLICIT_INCLUDES):
-            filtered.append(c)
-    return filtered
+def is_desired_monster(c: Dict[str, Any]) -> bool:
+    return 'Monster' in c.get('type', '') and c.get('race') in DESIRED_RACES
 
 
-def filter_exclude_subtypes(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Exclude cards whose type contains any EXCLUDE_SUBTYPES."""
-    return [c for c in cards
-            if not any(sub in c.get('type', '') for sub in EXCLUDE_SUBTYPES)]
+def is_blue_eyes_spell_trap(c: Dict[str, Any]) -> bool:
+    ctype = c.get('type', '')
+    return (('Spell' in ctype or 'Trap' in ctype)
+            and (c.get('archetype') == 'Blue-Eyes' or c.get('name') in EXPLICIT_INCLUDES))
 
 
-def filter_banned(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Exclude cards forbidden in TCG banlist."""
-    return [c for c in cards
-            if c.get('banlist_info', {}).get('ban_tcg') != 'Forbidden']
+def has_excluded_subtype(c: Dict[str, Any]) -> bool:
+    return any(sub in c.get('type', '') for sub in EXCLUDE_SUBTYPES)
 
 
-def save_cards(cards: List[Dict[str, Any]], path: str) -> None:
-    """Save a list of card dicts to a JSON file."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(cards, f, ensure_ascii=False, indent=2)
+def is_banned(c: Dict[str, Any]) -> bool:
+    return c.get('banlist_info', {}).get('ban_tcg') == 'Forbidden'
 
 
 if __name__ == '__main__':
-    all_cards    = fetch_cards(API_ALL_URL)
-    main_deck    = filter_main_deck(all_cards)
-    be_spells    = fetch_cards(API_BE_SPELLS)
-    be_traps     = fetch_cards(API_BE_TRAPS)
-    monsters     = filter_monsters(main_deck)
-    spells_traps = filter_spells_traps(be_spells + be_traps)
-    combined     = filter_exclude_subtypes(monsters + spells_traps)
-    for name in EXPLICIT_INCLUDES:
-        if not any(c.get('name') == name for c in combined):
-            card = next((c for c in all_cards if c.get('name') == name), None)
-            if card:
-                combined.append(card)
-    final_cards  = filter_banned(combined)
-    save_cards(final_cards, os.path.join('data', 'selected_main_deck_cards.json'))
-    print(f"Final pool: {len(final_cards)} cards saved.")
+    # The pool is built in one streaming pass over the full dump
+    from src.pipeline import main
+    main()
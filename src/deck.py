@@ -0,0 +1,303 @@
+import random
+from typing import Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+from src.card_index import CardIndex
+
+# Main-deck size every repaired deck is brought to
+DECK_SIZE = 40
+
+# Shared generator for all array-based deck operators
+_rng = np.random.default_rng()
+
+
+def get_rng() -> np.random.Generator:
+    return _rng
+
+
+def seed_rngs(seed: Optional[int]) -> None:
+    """Seed both `random` and the shared NumPy generator."""
+    global _rng
+    random.seed(seed)
+    _rng = np.random.default_rng(seed)
+
+
+class Deck(Mapping):
+    """
+    Compact deck: a uint8 count vector over the dense positions of a CardIndex.
+    Behaves as a read-only {card_id: count} mapping of the cards it contains,
+    so name/ID based code (formatting, rule lookups) works on it unchanged.
+    """
+    __slots__ = ('index', 'counts')
+
+    def __init__(self, index: CardIndex, counts: np.ndarray):
+        self.index = index
+        self.counts = np.asarray(counts, dtype=np.uint8)
+
+    @classmethod
+    def empty(cls, index: CardIndex) -> 'Deck':
+        return cls(index, np.zeros(len(index), dtype=np.uint8))
+
+    @classmethod
+    def from_mapping(cls, index: CardIndex, deck: Mapping[int, int]) -> 'Deck':
+        """Build from a {card_id: count} mapping; raises KeyError on unknown IDs."""
+        if isinstance(deck, Deck) and deck.index is index:
+            return deck
+        return cls(index, index.to_counts(deck))
+
+    @classmethod
+    def from_slots(cls, index: CardIndex, slots: np.ndarray) -> 'Deck':
+        """Build from a flat array of card positions (one entry per copy)."""
+        return cls(index, np.bincount(slots, minlength=len(index)))
+
+    # -- Mapping interface (card_id -> count, cards present only) --
+    def __getitem__(self, cid: int) -> int:
+        i = self.index.pos.get(cid)
+        if i is None or self.counts[i] == 0:
+            raise KeyError(cid)
+        return int(self.counts[i])
+
+    def __iter__(self) -> Iterator[int]:
+        ids = self.index.ids
+        for i in np.flatnonzero(self.counts):
+            yield int(ids[i])
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.counts))
+
+    def items(self):
+        nz = np.flatnonzero(self.counts)
+        return list(zip(self.index.ids[nz].tolist(), self.counts[nz].tolist()))
+
+    def values(self):
+        return self.counts[self.counts > 0].tolist()
+
+    def __repr__(self) -> str:
+        return f"Deck({self.to_dict()})"
+
+    # -- Array helpers --
+    def total(self) -> int:
+        return int(self.counts.sum(dtype=np.int64))
+
+    def key(self) -> bytes:
+        """Canonical, hashable fingerprint of the counts."""
+        return self.counts.tobytes()
+
+    def slots(self) -> np.ndarray:
+        """Flattened card positions, one per copy, in index order."""
+        return np.repeat(np.arange(len(self.counts)), self.counts)
+
+    def copy(self) -> 'Deck':
+        return Deck(self.index, self.counts.copy())
+
+    def to_dict(self) -> Dict[int, int]:
+        """Plain {card_id: count} dict, for JSON / .ydk output."""
+        return self.index.from_counts(self.counts)
+
+
+def _sample_distinct(rng: np.random.Generator, n: int, k: int) -> List[int]:
+    """k distinct ints from range(n) in O(k) (Floyd's algorithm)."""
+    if k > n // 4:
+        return rng.choice(n, k, replace=False).tolist()
+    chosen: Set[int] = set()
+    out = []
+    for j, u in zip(range(n - k, n), rng.random(k).tolist()):
+        t = int(u * (j + 1))  # uniform on 0..j
+        if t in chosen:
+            t = j
+        chosen.add(t)
+        out.append(t)
+    return out
+
+
+def _fill_uniform(counts: np.ndarray, index: CardIndex, rng: np.random.Generator,
+                  need: int) -> None:
+    """
+    Add `need` copies in place, uniformly over the unused copy units of the
+    pool (one unit per copy a card's banlist limit still allows).
+
+    The units a deck already uses are known from its counts, so the r-th free
+    unit is found by offsetting r past the used units below it: no rejected
+    draws, and work proportional to the deck rather than the pool.
+    """
+    unit_card, first_unit, _ = index.capacity_units()
+    total = int(counts.sum())
+    nz = np.flatnonzero(counts)
+    c = counts[nz]
+    # Used units (sorted): each card's first c units, minus their rank
+    start = np.cumsum(c) - c
+    shifted = np.repeat(first_unit[nz] - start, c)
+    ranks = _sample_distinct(rng, len(unit_card) - total, need)
+    units = np.searchsorted(shifted, ranks, side='right') + ranks
+    for i in unit_card[units].tolist():
+        counts[i] += 1
+
+
+def repair(
+    counts: np.ndarray,
+    index: CardIndex,
+    rng: Optional[np.random.Generator] = None,
+    deck_size: int = DECK_SIZE,
+    prefer: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Turn any count vector into a valid `deck_size`-card deck:
+    clip every count to [0, banlist limit], then drop random copies or add
+    copies from the remaining capacity. Added copies come from the cards
+    where `prefer` (a per-card vector, e.g. the parents' summed counts) is
+    non-zero while they have room, then from the whole pool.
+    Never retries. Returns int64 counts.
+    """
+    rng = rng or get_rng()
+    _, _, limits = index.capacity_units()
+    counts = np.minimum(np.maximum(np.asarray(counts, dtype=np.int64), 0), limits)
+    total = int(counts.sum())
+
+    if total > deck_size:
+        slots = np.repeat(np.arange(len(index)), counts)
+        return np.bincount(slots[_sample_distinct(rng, total, deck_size)],
+                           minlength=len(index))
+
+    need = deck_size - total
+    if need and prefer is not None:
+        cards = np.flatnonzero(prefer)
+        units = np.repeat(cards, limits[cards] - counts[cards])
+        take = min(need, len(units))
+        if take:
+            for i in units[_sample_distinct(rng, len(units), take)].tolist():
+                counts[i] += 1
+            need -= take
+    if need:
+        _fill_uniform(counts, index, rng, need)
+    return counts
+
+
+def repair_batch(
+    counts: np.ndarray,
+    index: CardIndex,
+    rng: Optional[np.random.Generator] = None,
+    deck_size: int = DECK_SIZE,
+    prefer: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    repair() for every row of a (decks x pool) count matrix at once, with
+    the same distribution.
+
+    Rows that are already legal decks come back unchanged. The others are
+    flattened to (row, card) entries of their present and preferred cards,
+    clipped, and then: over-size rows drop uniformly drawn held copies,
+    short rows take uniformly drawn free copies of preferred cards, and
+    rows still short are topped up from the whole pool. Each draw is
+    row-wise Floyd sampling of unit ranks, mapped to entries by one
+    searchsorted, so the work grows with the entries, not per deck in
+    Python. Returns int64 counts.
+    """
+    rng = rng or get_rng()
+    _, _, limits = index.capacity_units()
+    counts = np.atleast_2d(np.asarray(counts))
+    out = counts.astype(np.int64)
+    # Rows that are already legal decks are returned unchanged, as by repair()
+    within = ~np.any((counts < 0) | (counts > limits), axis=1)
+    sizes = out.sum(axis=1)
+    if prefer is None:
+        # Short rows within the limits only need the uniform top-up
+        _fill_uniform_batch(out, index, rng, np.where(within & (sizes < deck_size),
+                                                      deck_size - sizes, 0))
+        broken = np.flatnonzero(~within | (sizes > deck_size))
+    else:
+        broken = np.flatnonzero(~within | (sizes != deck_size))
+    if len(broken):
+        out[broken] = _repair_rows(counts[broken], index, rng, deck_size,
+                                   None if prefer is None else np.atleast_2d(prefer)[broken])
+    return out
+
+
+def distinct_ranks(rng: np.random.Generator, n: np.ndarray,
+                    k: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k[r] distinct ints from range(n[r]) for every row r (Floyd's algorithm,
+    one vectorized step per column), as flat (row, rank) arrays.
+    """
+    width = int(k.max(initial=0))
+    ranks = np.full((len(k), width), -1, dtype=np.int64)
+    u = rng.random((len(k), width))
+    for step in range(width):
+        j = n - k + step  # step draws from 0..j; on a repeat it takes j itself
+        t = (u[:, step] * (j + 1)).astype(np.int64)
+        if step:
+            t = np.where((ranks[:, :step] == t[:, None]).any(axis=1), j, t)
+        ranks[:, step] = np.where(step < k, t, -1)
+    rows, cols = np.nonzero(ranks >= 0)
+    return rows, ranks[rows, cols]
+
+
+def _pick_units(units: np.ndarray, rows: np.ndarray, k: np.ndarray,
+                rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw k[r] of row r's units without replacement, where flat entry e
+    (of row rows[e], rows sorted) holds units[e] units; returns how many
+    were drawn from each entry.
+    """
+    cum = np.cumsum(units)
+    total = np.bincount(rows, weights=units, minlength=len(k)).astype(np.int64)
+    r, rank = distinct_ranks(rng, total, np.minimum(k, total))
+    entry = np.searchsorted(cum, (np.cumsum(total) - total)[r] + rank, side='right')
+    return np.bincount(entry, minlength=len(units))
+
+
+def _repair_rows(counts: np.ndarray, index: CardIndex, rng: np.random.Generator,
+                 deck_size: int, prefer: Optional[np.ndarray]) -> np.ndarray:
+    """The body of repair_batch, for rows that need repairing."""
+    _, _, limits = index.capacity_units()
+    n = len(counts)
+    cand = counts > 0
+    if prefer is not None:
+        preferred = np.atleast_2d(np.asarray(prefer)) > 0
+        cand |= preferred
+
+    # (row, card) entries in row order, with their clipped copies
+    rows, cards = np.divmod(np.flatnonzero(cand), counts.shape[1])
+    lim = limits[cards]
+    held = np.minimum(np.maximum(counts[rows, cards], 0), lim).astype(np.int64)
+    sizes = np.bincount(rows, weights=held, minlength=n).astype(np.int64)
+    held -= _pick_units(held, rows, np.maximum(sizes - deck_size, 0), rng)
+    if prefer is not None:
+        room = np.where(preferred[rows, cards], lim - held, 0)
+        held += _pick_units(room, rows, np.maximum(deck_size - sizes, 0), rng)
+
+    out = np.zeros(counts.shape, dtype=np.int64)
+    out[rows, cards] = held
+    totals = np.bincount(rows, weights=held, minlength=n).astype(np.int64)
+    _fill_uniform_batch(out, index, rng, deck_size - totals)
+    return out
+
+
+def _fill_uniform_batch(counts: np.ndarray, index: CardIndex, rng: np.random.Generator,
+                        need: np.ndarray) -> None:
+    """
+    _fill_uniform() for every row of a count matrix: add need[r] copies to
+    row r in place, uniformly over the row's unused copy units. Ranks come
+    from distinct_ranks, and one searchsorted over the rows' used units
+    (offset per row) turns them into units.
+    """
+    unit_card, first_unit, _ = index.capacity_units()
+    rows = np.flatnonzero(need > 0)
+    if not len(rows):
+        return
+    sub = counts[rows]
+    r_rows, ranks = distinct_ranks(rng, len(unit_card) - sub.sum(axis=1), need[rows])
+
+    # Used units (sorted per row), minus their rank, as in _fill_uniform
+    nz_rows, nz_cards = np.nonzero(sub)
+    c = sub[nz_rows, nz_cards]
+    start = np.cumsum(c) - c
+    row_start = np.cumsum(np.bincount(nz_rows, weights=c, minlength=len(rows)).astype(np.int64))
+    row_start = np.concatenate([[0], row_start[:-1]])
+    start -= row_start[nz_rows]
+    shifted = np.repeat(first_unit[nz_cards] - start, c)
+    shift_rows = np.repeat(nz_rows, c)
+    span = len(unit_card) + 1
+    pos = np.searchsorted(shifted + shift_rows * span, ranks + r_rows * span, side='right')
+    units = pos - row_start[r_rows] + ranks
+    np.add.at(counts, (rows[r_rows], unit_card[units]), 1)
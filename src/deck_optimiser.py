@@ -1,12 +1,46 @@
 #!/usr/bi
 import os
+import sys
 import json
 import random
 import argparse
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
 
+import numpy as np
+
+from src.card_index import card_index_for
 from src.database import load_card_db
-from src.fitness import fitness
+from src.deck import (
+    Deck,
+    distinct_ranks,
+    get_rng,
+    repair,
+    repair_batch,
+    seed_rngs,
+)
+from src.fitness import (
+    CRN_REFRESH,
+    CRN_TRIALS,
+    EvalContext,
+    fitness,
+    fitness_many,
+    set_common_random_numbers,
+    set_exact_hand_rates,
+    set_rules,
+)
+from src.hand_sim import deck_slots
+from src.checkpoint import (
+    CHECKPOINT_EVERY,
+    Checkpointer,
+    load_checkpoint,
+    make_checkpointer,
+    restore_checkpoint,
+)
+from src.parallel import ParallelEvaluator, make_evaluator
+from src.racing import RACE_BATCH, RACE_CAP, Racer, make_racer
+from src.rules import load_rules
+from src.surrogate import SCREEN_FACTOR, Surrogate, make_surrogate
+from src.telemetry import NULL_TELEMETRY, Telemetry, make_telemetry
 
 # == PARAMETERS ==
 NP = 16                   # ⬅ UPDATED: population size
@@ -14,9 +48,19 @@ DECK_SIZE = 40
 F = 1.2
 CR = 1.0           # ⬅ UPDATED: crossover rate
 
+# Below this many trials per generation the per-deck operators beat the batched ones
+# (de.evolve.np8 runs faster per deck, de.evolve.np16 faster batched)
+MIN_BATCH_TRIALS = 16
+
 MIN_INITIAL_FITNESS = 5.0  # ⬅ UPDATED
 MIN_FITNESS         = 10.0  # ⬅ UPDATED
 
+# == OUTPUT ==
+VERBOSITY_LEVELS = ('quiet', 'summary', 'top', 'full')
+VERBOSITY = 'summary'   # per-generation output: one summary line
+TOP_K     = 5           # decks listed per generation at 'top' verbosity
+MAX_LISTED = 100        # cap on decks listed per generation / in results
+
 # == FILE PATHS ==
 CARD_DB_PATH = os.path.join("data", "blue_eyes_clean.json")
 SEEDS_PATH   = os.path.join("data", "seed_decks.json")
@@ -26,10 +70,67 @@ def parse_args():
     p = argparse.ArgumentParser(description="Run DE optimizer for Yu-Gi-Oh! decks")
     p.add_argument('-g', '--gens', type=int, default=2,
                    help='Number of generations to run (default=2)')
+    p.add_argument('--monte-carlo', action='store_true',
+                   help='Estimate hand probabilities by Monte Carlo instead of exactly')
+    p.add_argument('--rules', default=None, metavar='PATH',
+                   help='JSON rule file to score decks with (default: built-in rules)')
+    p.add_argument('--crn', action='store_true',
+                   help='With --monte-carlo, score every deck on one shared set of hands')
+    p.add_argument('--crn-trials', type=int, default=CRN_TRIALS,
+                   help=f'Shared hands per deck size (default={CRN_TRIALS})')
+    p.add_argument('--crn-refresh', type=int, default=CRN_REFRESH,
+                   help=f'Generations between redraws of the shared hands (default={CRN_REFRESH})')
+    p.add_argument('--race', action='store_true',
+                   help='With --monte-carlo, decide each comparison by racing')
+    p.add_argument('--race-batch', type=int, default=RACE_BATCH,
+                   help=f'Hands per deck per racing round (default={RACE_BATCH})')
+    p.add_argument('--race-cap', type=int, default=RACE_CAP,
+                   help=f'Most hands per deck in one race (default={RACE_CAP})')
+    p.add_argument('--surrogate', action='store_true',
+                   help='Breed extra offspring and evaluate only those a surrogate model ranks best')
+    p.add_argument('--screen-factor', type=int, default=SCREEN_FACTOR,
+                   help=f'Candidates bred per evaluated offspring with --surrogate (default={SCREEN_FACTOR})')
+    p.add_argument('--interactions', action='store_true',
+                   help='Add pairwise rule-aggregate interactions to the surrogate')
+    p.add_argument('--workers', type=int, default=1,
+                   help='Worker processes for trial evaluation (default=1, in-process)')
+    p.add_argument('--seed', type=int, default=None,
+                   help='Master RNG seed; runs with the same seed and worker count reproduce')
+    p.add_argument('--telemetry', default=None, metavar='PATH',
+                   help='Stream per-generation timings and metrics to PATH as JSON Lines')
+    p.add_argument('-v', '--verbosity', choices=VERBOSITY_LEVELS, default=VERBOSITY,
+                   help='Per-generation output: quiet, summary line (default), '
+                        'top-k decks, or full population listing')
+    p.add_argument('--top-k', type=int, default=TOP_K,
+                   help=f'Decks listed per generation at "top" verbosity (default={TOP_K})')
+    p.add_argument('--checkpoint', default=None, metavar='PATH',
+                   help='Periodically save the run state to PATH (.npz)')
+    p.add_argument('--checkpoint-every', type=int, default=None, metavar='N',
+                   help=f'Generations between checkpoints (default={CHECKPOINT_EVERY})')
+    p.add_argument('--checkpoint-seconds', type=float, default=None, metavar='T',
+                   help='Also checkpoint once T seconds have passed since the last save')
+    p.add_argument('--resume', action='store_true',
+                   help='Continue from the --checkpoint file instead of starting over')
     return p.parse_args()
 
 
-def format_deck(deck: Dict[int,int], card_db: Dict[int, Dict]) -> str:
+def format_population(
+    decks: List[Deck],
+    scores: List[float],
+    card_db: Dict[int, Dict],
+    limit: int = MAX_LISTED
+) -> str:
+    """
+    Listing of up to `limit` decks with their already-computed scores,
+    in the order given.
+    """
+    parts = []
+    for idx, (deck, score) in enumerate(zip(decks[:limit], scores), 1):
+        parts.append(f"Deck {idx:2d}: Fitness={score:.2f}\n{format_deck(deck, card_db)}\n\n")
+    return "".join(parts)
+
+
+def format_deck(deck: Mapping[int,int], card_db: Dict[int, Dict]) -> str:
     """
     Return a multi-line string listing each card as:
       Card Name (ID) xCount
@@ -42,44 +143,29 @@ def format_deck(deck: Dict[int,int], card_db: Dict[int, Dict]) -> str:
 
 
 def sanitize_seed_deck(
-    deck: Dict[int,int],
+    deck: Mapping[int,int],
     card_db: Dict[int, Dict],
     deck_size: int = DECK_SIZE
-) -> Dict[int,int]:
+) -> Deck:
     """
     1) Replace any card not in card_db with random valid cards.
     2) Enforce banlist limits on counts.
     3) Trim or pad to exactly `deck_size` cards.
     """
-    sanitized: Dict[int,int] = {}
-    valid_ids = list(card_db.keys())
+    index = card_index_for(card_db)
 
-    # 1 & 2: keep only IDs in card_db, cap by banlist; replace invalid ones
-    for cid, cnt in deck.items():
-        if cid in card_db:
-            limit = card_db[cid]['banlist_limit']
-            sanitized[cid] = min(cnt, limit)
-        else:
-            # replace each invalid copy
-            for _ in range(cnt):
-                new_cid = random.choice(valid_ids)
-                lim = card_db[new_cid]['banlist_limit']
-                sanitized[new_cid] = min(sanitized.get(new_cid, 0) + 1, lim)
-
-    # 3a: adjust to exact deck_size
-    pool = [cid for cid, cnt in sanitized.items() for _ in range(cnt)]
-    if len(pool) > deck_size:
-        pool = random.sample(pool, deck_size)
-    while len(pool) < deck_size:
-        cid = random.choice(valid_ids)
-        if pool.count(cid) < card_db[cid]['banlist_limit']:
-            pool.append(cid)
-
-    # rebuild count dict
-    final: Dict[int,int] = {}
-    for cid in pool:
-        final[cid] = final.get(cid, 0) + 1
-    return final
+    # 1: keep only IDs in card_db; unknown copies are refilled by the repair
+    if isinstance(deck, Deck) and deck.index is index:
+        counts = deck.counts
+    else:
+        counts = np.zeros(len(index), dtype=np.int64)
+        for cid, cnt in deck.items():
+            i = index.pos.get(cid)
+            if i is not None:
+                counts[i] = cnt
+
+    # 2 & 3: cap by banlist, trim or pad to exactly deck_size
+    return Deck(index, repair(counts, index, get_rng(), deck_size))
 
 
 def load_seed_decks(path: str) -> List[Dict[int, int]]:
@@ -87,175 +173,363 @@ def load_seed_decks(path: str) -> List[Dict[int, int]]:
         print(f"[WARN] Seed file not found at: {path}. Continuing without seeds.")
         return []
     with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def generate_random_deck(card_db: Dict[int, Dict], deck_size: int = DECK_SIZE) -> Dict[int, int]:
-    pool: List[int] = []
-    for cid, info in card_db.items():
-        pool.extend([cid] * info['banlist_limit'])
-    chosen = random.sample(pool, deck_size)
-    deck: Dict[int, int] = {}
-    for cid in chosen:
-        deck[cid] = deck.get(cid, 0) + 1
-    return deck
-
-
-def mutate(a: Dict[int,int], b: Dict[int,int], c: Dict[int,int], card_db: Dict[int, Dict]) -> Dict[int,int]:
-    mutant: Dict[int,int] = {}
-    all_ids = set(a) | set(b) | set(c)
-    for cid in all_ids:
-        ac, bc, cc = a.get(cid,0), b.get(cid,0), c.get(cid,0)
-        count = round(ac + F * (bc - cc))
-        limit = card_db[cid]['banlist_limit']
-        mutant[cid] = max(0, min(count, limit))
-    # adjust to exact size
-    pool = [cid for cid, cnt in mutant.items() for _ in range(cnt)]
-    if len(pool) > DECK_SIZE:
-        pool = random.sample(pool, DECK_SIZE)
-    while len(pool) < DECK_SIZE:
-        pool.append(random.choice(list(mutant.keys())))
-    # Card swap mutation: with some probability, swap a random card for a new one
-    if random.random() < 0.5:  # 50% chance for swap mutation
-        idx_to_replace = random.randrange(DECK_SIZE)
-        valid_ids = list(card_db.keys())
-        new_cid = random.choice(valid_ids)
-        pool[idx_to_replace] = new_cid
-    new_deck = {}
-    for cid in pool:
-        new_deck[cid] = new_deck.get(cid, 0) + 1
-    return new_deck
-
-
-def crossover(target: Dict[int,int], mutant: Dict[int,int], card_db: Dict[int, Dict]) -> Dict[int,int]:
-    t_list = [cid for cid,cnt in target.items() for _ in range(cnt)]
-    m_list = [cid for cid,cnt in mutant.items() for _ in range(cnt)]
-    # pad/truncate to DECK_SIZE
-    t_list = t_list[:DECK_SIZE] + [random.choice(t_list)]*(DECK_SIZE-len(t_list))
-    m_list = m_list[:DECK_SIZE] + [random.choice(m_list)]*(DECK_SIZE-len(m_list))
-    trial_list = []
-    j_rand = random.randrange(DECK_SIZE)
-    for j in range(DECK_SIZE):
-        if random.random() < CR or j == j_rand:
-            trial_list.append(m_list[j])
-        else:
-            trial_list.append(t_list[j])
-    # GA-style mutation: with small probability, replace a random card
-    if random.random() < 0.2:  # 20% chance
-        idx_to_replace = random.randrange(DECK_SIZE)
-        valid_ids = list(card_db.keys())
-        trial_list[idx_to_replace] = random.choice(valid_ids)
-    trial = {}
-    for cid in trial_list:
-        trial[cid] = trial.get(cid, 0) + 1
-    return trial
+        # JSON object keys are strings; card IDs are ints everywhere else
+        return [{int(cid): cnt for cid, cnt in deck.items()} for deck in json.load(f)]
 
 
-def select_next(pairs: List[Tuple[Dict[int,int],Dict[int,int]]]) -> List[Dict[int,int]]:
+def generate_random_deck(card_db: Dict[int, Dict], deck_size: int = DECK_SIZE) -> Deck:
+    index = card_index_for(card_db)
+    pool = np.repeat(np.arange(len(index)), index.limits)
+    return Deck.from_slots(index, get_rng().choice(pool, deck_size, replace=False))
+
+
+def mutate(a: Deck, b: Deck, c: Deck, card_db: Dict[int, Dict]) -> Deck:
+    index = card_index_for(card_db)
+    rng = get_rng()
+    ac = a.counts.astype(np.int64)
+    bc = b.counts.astype(np.int64)
+    cc = c.counts.astype(np.int64)
+    mutant = np.rint(ac + F * (bc - cc)).astype(np.int64)
+    # clip to banlist limits and adjust to exact size, topping up from the parents
+    mutant = repair(mutant, index, rng, DECK_SIZE, prefer=ac | bc | cc)
+    # Card swap mutation: with some probability, swap a random card for a new one
+    if rng.random() < 0.5:  # 50% chance for swap mutation
+        slots = np.repeat(np.arange(len(index)), mutant)
+        mutant[slots[rng.integers(DECK_SIZE)]] -= 1
+        mutant = repair(mutant, index, rng, DECK_SIZE)
+    return Deck(index, mutant)
+
+
+def _fixed_slots(deck: Deck, rng: np.random.Generator) -> np.ndarray:
+    """Flattened slots truncated, or padded with one repeated random card, to DECK_SIZE."""
+    slots = deck.slots()
+    if len(slots) >= DECK_SIZE:
+        return slots[:DECK_SIZE]
+    pad = np.full(DECK_SIZE - len(slots), rng.choice(slots))
+    return np.concatenate([slots, pad])
+
+
+def crossover(target: Deck, mutant: Deck, card_db: Dict[int, Dict]) -> Deck:
+    index = card_index_for(card_db)
+    rng = get_rng()
+    t_slots = _fixed_slots(target, rng)
+    m_slots = _fixed_slots(mutant, rng)
+    take_mutant = rng.random(DECK_SIZE) < CR
+    take_mutant[rng.integers(DECK_SIZE)] = True  # j_rand
+    trial_slots = np.where(take_mutant, m_slots, t_slots)
+    # GA-style mutation: with small probability, replace a random card
+    if rng.random() < 0.2:  # 20% chance
+        trial_slots[rng.integers(DECK_SIZE)] = rng.integers(len(index))
+    counts = np.bincount(trial_slots, minlength=len(index))
+    return Deck(index, repair(counts, index, rng, DECK_SIZE,
+                              prefer=target.counts | mutant.counts))
+
+
+def pick_donors(n: int, targets: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """(len(targets), 3) distinct population indices (a, b, c), none the target."""
+    m = len(targets)
+    _, donors = distinct_ranks(rng, np.full(m, n - 1), np.full(m, 3))
+    donors = donors.reshape(m, 3)
+    # Ranks over the n-1 non-targets: skip past the target
+    donors += donors >= np.asarray(targets)[:, None]
+    # Floyd's draw order is not exchangeable, so shuffle the a/b/c roles
+    return np.take_along_axis(donors, np.argsort(rng.random((m, 3)), axis=1), axis=1)
+
+def mutate_batch(counts: np.ndarray, donors: np.ndarray, card_db: Dict[int, Dict]) -> np.ndarray:
+    """
+    mutate() for every row of `donors` at once: a + F*(b - c) over the
+    population count matrix, repaired in bulk, then the 50% card swap.
+    """
+    index = card_index_for(card_db)
+    rng = get_rng()
+    ac, bc, cc = (counts[donors[:, k]].astype(np.int16) for k in range(3))
+    mutant = np.rint(ac + np.float32(F) * (bc - cc)).astype(np.int16)
+    # clip to banlist limits and adjust to exact size, topping up from the parents
+    mutant = repair_batch(mutant, index, rng, DECK_SIZE, prefer=ac | bc | cc)
+    # Card swap mutation: drop one random copy from half the mutants, refill uniformly
+    swap = np.flatnonzero(rng.random(len(mutant)) < 0.5)
+    if len(swap):
+        copy = rng.integers(DECK_SIZE, size=len(swap))[:, None]
+        mutant[swap, (np.cumsum(mutant[swap], axis=1) <= copy).sum(axis=1)] -= 1
+        mutant = repair_batch(mutant, index, rng, DECK_SIZE)
+    return mutant
+
+
+def crossover_batch(targets: np.ndarray, mutants: np.ndarray,
+                    card_db: Dict[int, Dict]) -> np.ndarray:
+    """
+    crossover() for every (target, mutant) row pair at once: one binomial
+    CR mask with a forced j_rand slot per row, the 20% random-card
+    mutation, and one bulk repair.
+    """
+    index = card_index_for(card_db)
+    rng = get_rng()
+    n = len(targets)
+    # DECK_SIZE-slot views; slots a short deck lacks (-1) are refilled by the repair
+    both, _ = deck_slots(np.concatenate([targets, mutants]))
+    both = np.pad(both, ((0, 0), (0, max(DECK_SIZE - both.shape[1], 0))),
+                  constant_values=-1)[:, :DECK_SIZE]
+    take_mutant = rng.random((n, DECK_SIZE)) < CR
+    take_mutant[np.arange(n), rng.integers(DECK_SIZE, size=n)] = True  # j_rand
+    trial_slots = np.where(take_mutant, both[n:], both[:n])
+    # GA-style mutation: with small probability, replace a random card
+    hit = np.flatnonzero(rng.random(n) < 0.2)
+    trial_slots[hit, rng.integers(DECK_SIZE, size=len(hit))] = rng.integers(len(index), size=len(hit))
+    filled = trial_slots >= 0
+    flat = (trial_slots + np.arange(n)[:, None] * len(index))[filled]
+    counts = np.bincount(flat, minlength=n * len(index)).reshape(n, -1)
+    return repair_batch(counts, index, rng, DECK_SIZE, prefer=targets | mutants)
+
+
+def select_next(
+    pairs: List[Tuple[Deck, Deck]],
+    evaluate: Callable[[List[Deck]], List[float]] = fitness_many,
+    racer: Optional[Racer] = None
+) -> List[Deck]:
+    if racer is not None:
+        # Race each target against its trial instead of fixed-size estimates
+        return [trial if tr_fit > t_fit else target
+                for (target, trial), (t_fit, tr_fit)
+                in ((pair, racer.scores(pair)) for pair in pairs)]
+    target_scores = evaluate([target for target, _ in pairs])
+    trial_scores = evaluate([trial for _, trial in pairs])
     new_pop = []
-    for target, trial in pairs:
-        new_pop.append(trial if fitness(trial) > fitness(target) else target)
+    for (target, trial), t_fit, tr_fit in zip(pairs, target_scores, trial_scores):
+        new_pop.append(trial if tr_fit > t_fit else target)
     return new_pop
 
 def de_evolve(
         card_db: Dict[int, Dict],
-        init_pop: List[Dict[int, int]],
+        init_pop: List[Deck],
         gens: int,
-        output_file: str,
-        milestones: List[int] = None
-) -> Tuple[List[Dict[int, int]], Dict[int, float]]:
+        output_file: Optional[str],
+        milestones: List[int] = None,
+        evaluator: Optional[ParallelEvaluator] = None,
+        verbosity: str = VERBOSITY,
+        telemetry: Optional[Telemetry] = None,
+        top_k: int = TOP_K,
+        checkpointer: Optional[Checkpointer] = None,
+        resume: Optional[Dict] = None,
+        racer: Optional[Racer] = None,
+        surrogate: Optional[Surrogate] = None,
+        screen_factor: int = SCREEN_FACTOR
+) -> Tuple[List[Deck], Dict[int, float]]:
     """
     Evolves init_pop for `gens` generations.
     Records best fitness at every generation in history.
-    Writes results to the specified output file.
+    Writes results to the specified output file (skipped if None).
+    Trials are scored in batches, by `evaluator` when given.
+    Per-generation metrics stream to `telemetry` when given.
+    `verbosity` is one of VERBOSITY_LEVELS; each generation's output is
+    written to stdout in one buffered call, using the generation's scores.
+    State is saved through `checkpointer` when given; a loaded checkpoint
+    passed as `resume` continues after its generation (init_pop is ignored).
+    With a `racer`, each target and trial are compared by racing.
+    Trials are bred for the whole population at once (mutate_batch,
+    crossover_batch) from MIN_BATCH_TRIALS trials per generation up.
+    With a `surrogate`, `screen_factor` trials are bred per target and only
+    the best predicted one is evaluated.
     Returns (final_population, history).
     """
+    if verbosity not in VERBOSITY_LEVELS:
+        raise ValueError(f"verbosity must be one of {VERBOSITY_LEVELS}, got {verbosity!r}")
+    tel = telemetry or NULL_TELEMETRY
+    ctx = EvalContext.for_card_db(card_db)
+    index = card_index_for(card_db)
+    if evaluator is not None:
+        evaluate = evaluator.evaluate
+    else:
+        evaluate = lambda decks: fitness_many(decks, ctx)
     pop = init_pop
     history = {}
-    for gen in range(1, gens + 1):
-        pairs = []
-        for i in range(len(pop)):
-            idxs = list(range(len(pop)))
-            idxs.remove(i)
-            a, b, c = [pop[j] for j in random.sample(idxs, 3)]
-            mutant = mutate(a, b, c, card_db)
-            trial = crossover(pop[i], mutant, card_db)
-            pairs.append((pop[i], trial))
+    start = 1
+    if resume is not None:
+        pop = list(resume['pop'])
+        history = dict(resume['history'])
+        start = resume['gen'] + 1
+    elif surrogate is not None:
+        surrogate.observe(pop, evaluate(pop))
+    for gen in range(start, gens + 1):
+        ctx.start_generation(gen)
+        tel.start_generation(ctx.cache)
+        # Trials for the whole population (screen_factor per target)
+        per_target = screen_factor if surrogate else 1
+        targets = np.repeat(np.arange(len(pop)), per_target)
+        donors = pick_donors(len(pop), targets, get_rng())
+        if len(targets) >= MIN_BATCH_TRIALS:
+            counts = np.array([d.counts for d in pop])
+            with tel.phase('mutation'):
+                mutants = mutate_batch(counts, donors, card_db)
+            with tel.phase('crossover'):
+                candidates = [Deck(index, t)
+                              for t in crossover_batch(counts[targets], mutants, card_db)]
+        else:
+            candidates = []
+            for i, (a, b, c) in zip(targets.tolist(), donors.tolist()):
+                with tel.phase('mutation'):
+                    mutant = mutate(pop[a], pop[b], pop[c], card_db)
+                with tel.phase('crossover'):
+                    candidates.append(crossover(pop[i], mutant, card_db))
+        if surrogate is not None:
+            with tel.phase('screening'):
+                candidates = [group[surrogate.screen(group, 1)[0]]
+                              for group in (candidates[i:i + per_target]
+                                            for i in range(0, len(candidates), per_target))]
+        pairs = list(zip(pop, candidates))
+        parents = pop
+        trials = [trial for _, trial in pairs]
+
+        if racer is None or surrogate is not None:
+            with tel.phase('evaluation'):
+                trial_scores = evaluate(trials)
+            if surrogate is not None:
+                with tel.phase('screening'):
+                    surrogate.record(trials, trial_scores)
+                    surrogate.observe(trials, trial_scores)
 
         # Selection
-        pop = select_next(pairs)
+        with tel.phase('selection'):
+            pop = select_next(pairs, evaluate, racer)
 
         # Rescue low-fitness decks
-        for i, deck in enumerate(pop):
-            if fitness(deck) < MIN_FITNESS:
-                others = [j for j in range(len(pop)) if j != i]
-                a, b, c = [pop[j] for j in random.sample(others, 3)]
-                pop[i] = mutate(a, b, c, card_db)
-
-        # After selection and rescue, inject random decks for exploration
-        if gen % 5 == 0:  # every 5 generations (increased frequency)
-            idx = random.randrange(len(pop))
-            pop[idx] = generate_random_deck(card_db)
+        with tel.phase('rescue'):
+            for i, score in enumerate(evaluate(pop)):
+                if score < MIN_FITNESS:
+                    others = [j for j in range(len(pop)) if j != i]
+                    a, b, c = [pop[j] for j in random.sample(others, 3)]
+                    pop[i] = mutate(a, b, c, card_db)
+
+            # After selection and rescue, inject random decks for exploration
+            if gen % 5 == 0:  # every 5 generations (increased frequency)
+                idx = random.randrange(len(pop))
+                pop[idx] = generate_random_deck(card_db)
+        with tel.phase('evaluation'):
+            scores = evaluate(pop)
 
         # Print this generation
-        print(f"\n=== Generation {gen} ===")
-        for idx, deck in enumerate(pop[:100], 1):  # Limit to top 100 decks
-            print(f"Deck {idx:2d}: Fitness={fitness(deck):.2f}")
-            print(format_deck(deck, card_db))
-            print()
+        if verbosity != 'quiet':
+            with tel.phase('io'):
+                finite = [sc for sc in scores if sc != float('-inf')]
+                avg = sum(finite) / len(finite) if finite else float('-inf')
+                out = [f"Gen {gen:5d}: Best={max(scores):.2f}, Avg={avg:.2f}\n"]
+                if verbosity == 'top':
+                    order = sorted(range(len(pop)), key=lambda j: scores[j], reverse=True)[:top_k]
+                    out.append(format_population([pop[j] for j in order],
+                                                 [scores[j] for j in order], card_db))
+                elif verbosity == 'full':
+                    out.append(format_population(pop, scores, card_db))
+                sys.stdout.write("".join(out))
 
         # Record best fitness at every generation
-        best_score = max(fitness(deck) for deck in pop)
+        best_score = max(scores)
         history[gen] = best_score
-
-    # Write results to the output file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        count = 0
-        for idx, deck in enumerate(pop):
-            fit = fitness(deck)
-            if fit > 0:
-                count += 1
-                if count > 100:
-                    break
-                f.write(f"Deck {count:2d}: Fitness={fit:.2f}\n")
-                f.write(format_deck(deck, card_db))
-                f.write("\n\n")
+        tel.end_generation(gen, pop, scores, offspring=trials, parents=parents,
+                           cache=ctx.cache)
+        if checkpointer is not None:
+            with tel.phase('io'):
+                checkpointer.maybe_save(gen, pop, history, ctx, evaluator, final=gen == gens,
+                                        surrogate=surrogate, racer=racer)
+
+    # Stream results to the output file, reusing the final scores
+    if start > gens:
+        scores = evaluate(pop)
+    if output_file is not None:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            count = 0
+            for deck, fit in zip(pop, scores):
+                if fit > 0:
+                    count += 1
+                    if count > MAX_LISTED:
+                        break
+                    f.write(f"Deck {count:2d}: Fitness={fit:.2f}\n")
+                    f.write(format_deck(deck, card_db))
+                    f.write("\n\n")
 
     # Record final generation if not already in history
     if gens not in history:
-        history[gens] = max(fitness(deck) for deck in pop)
+        history[gens] = max(scores)
 
     return pop, history
 
 
-def main():
-    args = parse_args()
-    card_db = load_card_db(CARD_DB_PATH)
-    seeds = load_seed_decks(SEEDS_PATH)
-
-    # Sanitize seeds
+def build_initial_population(
+    card_db: Dict[int, Dict],
+    seeds: List[Dict[int, int]],
+    size: int = NP
+) -> List[Deck]:
+    """
+    Sanitized seeds with fitness ≥ MIN_INITIAL_FITNESS, topped up with
+    random decks that clear the same bar.
+    """
     sanitized = [sanitize_seed_deck(s, card_db) for s in seeds]
-
-    # Build initial population with fitness ≥ MIN_INITIAL_FITNESS
-    pop: List[Dict[int, int]] = []
+    pop: List[Deck] = []
     for deck in sanitized:
-        if fitness(deck) >= MIN_INITIAL_FITNESS and len(pop) < NP:
+        if fitness(deck) >= MIN_INITIAL_FITNESS and len(pop) < size:
             pop.append(deck)
-    while len(pop) < NP:
+    while len(pop) < size:
         candidate = generate_random_deck(card_db)
         if fitness(candidate) >= MIN_INITIAL_FITNESS:
             pop.append(candidate)
+    return pop
+
+
+def main():
+    args = parse_args()
+    if args.monte_carlo:
+        set_exact_hand_rates(False)
+    if args.rules:
+        set_rules(load_rules(args.rules))
+    if args.seed is not None:
+        seed_rngs(args.seed)
+    if args.crn:
+        set_common_random_numbers(args.crn_trials, args.crn_refresh)
+    card_db = load_card_db(CARD_DB_PATH)
+    seeds = load_seed_decks(SEEDS_PATH)
+    if args.resume and not args.checkpoint:
+        raise SystemExit("--resume needs --checkpoint PATH")
+    resume = None
+    if args.resume and os.path.exists(args.checkpoint):
+        resume = load_checkpoint(args.checkpoint, card_index_for(card_db))
+        print(f"Resuming from '{args.checkpoint}' after generation {resume['gen']}")
+    elif args.resume:
+        print(f"[WARN] No checkpoint at '{args.checkpoint}'; starting a new run.")
+
+    pop = resume['pop'] if resume else build_initial_population(card_db, seeds)
 
     # Gen-0 output
-    print("=== Initial Population ===")
-    for idx, deck in enumerate(pop, 1):
-        print(f"Deck {idx:2d}: Fitness={fitness(deck):.2f}")
-        print(format_deck(deck, card_db))
-        print()
+    if resume is None and args.verbosity != 'quiet':
+        init_scores = fitness_many(pop)
+        print("=== Initial Population ===")
+        if args.verbosity == 'full':
+            sys.stdout.write(format_population(pop, init_scores, card_db))
+        else:
+            print(f"{len(pop)} decks, Best={max(init_scores):.2f}")
 
     # Evolve & capture final population
     output_file = "results_de_evolution.txt"
-    final_pop, history = de_evolve(card_db, pop, args.gens, output_file)
+    eval_seed = resume['eval_seed'] if resume and resume['eval_seed'] is not None else args.seed
+    evaluator = make_evaluator(args.workers, CARD_DB_PATH, eval_seed)
+    telemetry = make_telemetry(args.telemetry, 'de', append=resume is not None)
+    checkpointer = make_checkpointer(args.checkpoint, 'de', args.checkpoint_every,
+                                     args.checkpoint_seconds)
+    racer = make_racer(EvalContext.for_card_db(card_db), args.race, args.race_batch,
+                       args.race_cap)
+    surrogate = make_surrogate(EvalContext.for_card_db(card_db), args.surrogate,
+                               args.interactions)
+    if resume is not None:
+        restore_checkpoint(resume, EvalContext.for_card_db(card_db), evaluator, surrogate,
+                           racer)
+    try:
+        final_pop, history = de_evolve(card_db, pop, args.gens, output_file,
+                                       evaluator=evaluator, verbosity=args.verbosity,
+                                       telemetry=telemetry, top_k=args.top_k,
+                                       checkpointer=checkpointer, resume=resume,
+                                       racer=racer, surrogate=surrogate,
+                                       screen_factor=args.screen_factor)
+    finally:
+        telemetry.close()
+        if evaluator is not None:
+            evaluator.close()
 
     # Print best deck overall
     best_deck = max(final_pop, key=lambda d: fitness(d))
@@ -265,6 +539,11 @@ def main():
     print(format_deck(best_deck, card_db))
 
     print(f"\nResults written to '{output_file}'")
+    print(EvalContext.for_card_db(card_db).cache.summary())
+    if racer is not None:
+        print(racer.summary())
+    if surrogate is not None:
+        print(surrogate.summary())
 
     # Plot performance if history is available
     if history:
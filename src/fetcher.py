@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+# == FETCH PARAMETERS ==
+API_BASE    = "https://db.ygoprodeck.com/api/v7/"
+CACHE_DIR   = os.path.join("data", "http_cache")
+POOL_SIZE   = 4          # pooled connections per host
+TIMEOUT     = 60         # seconds per request
+RETRIES     = 3          # retries on connection errors / 5xx
+CHUNK_SIZE  = 1 << 16    # bytes per streamed read
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+def local_name(url: str) -> str:
+    """
+    File name of `url` inside a local-directory stand-in, e.g.
+    .../cardinfo.php?type=trap card&archetype=Blue-Eyes ->
+    cardinfo__archetype-Blue-Eyes__type-trap_card.json
+    """
+    parts = urlsplit(url)
+    stem = os.path.splitext(os.path.basename(parts.path))[0] or 'index'
+    query = sorted(parse_qsl(parts.query))
+    name = '__'.join([stem] + [f"{k}-{v}" for k, v in query])
+    safe = ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in name)
+    return safe + '.json'
+
+
+def _is_local(source: Optional[str]) -> bool:
+    return source is not None and not urlsplit(source).scheme.startswith('http')
+
+
+class CardFetcher:
+    """
+    GETs API payloads through a pooled requests.Session, keeping each body on
+    disk with its ETag / Last-Modified. Later fetches send a conditional GET
+    and reuse the stored body on 304, so rebuilds do not re-download the dump.
+
+    `source` swaps the upstream for a stand-in: an http(s) base URL replaces
+    API_BASE (e.g. a local HTTP server), while a directory serves files named
+    by local_name(url) with no network at all. `offline` answers from the
+    cache only and fails if a URL was never fetched.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, source: Optional[str] = None,
+                 offline: bool = False, refresh: bool = False):
+        self.cache_dir = cache_dir
+        self.source = source
+        self.offline = offline
+        self.refresh = refresh
+        self._session = None
+        self.stats = {'downloaded': 0, 'not_modified': 0, 'cached': 0, 'local': 0}
+
+    def __enter__(self) -> 'CardFetcher':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests  # only needed when talking to a server
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(total=RETRIES, backoff_factor=0.5,
+                          status_forcelist=(500, 502, 503, 504), allowed_methods=('GET',))
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE,
+                                  max_retries=retry)
+            self._session = requests.Session()
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    # -- cache files --
+    def _paths(self, url: str):
+        base = os.path.join(self.cache_dir, _cache_key(url))
+        return base + '.body', base + '.meta.json'
+
+    def _read_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        body_path, meta_path = self._paths(url)
+        if not (os.path.isfile(body_path) and os.path.isfile(meta_path)):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if meta.get('url') == url else None
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        _, meta_path = self._paths(url)
+        tmp = meta_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, meta_path)
+
+    def _resolve(self, url: str) -> str:
+        if self.source and not _is_local(self.source) and url.startswith(API_BASE):
+            return self.source.rstrip('/') + '/' + url[len(API_BASE):]
+        return url
+
+    # -- public API --
+    def fetch_path(self, url: str) -> str:
+        """Path of a local file holding the body of `url`, fetching it if needed."""
+        if _is_local(self.source):
+            path = os.path.join(self.source, local_name(url))
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"No local stand-in for {url} (expected {path})")
+            self.stats['local'] += 1
+            return path
+
+        body_path, _ = self._paths(url)
+        meta = self._read_meta(url)
+        if self.offline:
+            if meta is None:
+                raise FileNotFoundError(f"{url} is not in the cache at {self.cache_dir}")
+            self.stats['cached'] += 1
+            return body_path
+
+        headers = {}
+        if meta is not None and not self.refresh:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with self.session.get(self._resolve(url), headers=headers,
+                              stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 304 and meta is not None:
+                self.stats['not_modified'] += 1
+                meta['checked_at'] = time.time()
+                self._write_meta(url, meta)
+                return body_path
+            response.raise_for_status()
+
+            # Stream to a temp file, then swap it in atomically
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                os.replace(tmp, body_path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self._write_meta(url, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'checked_at': time.time(),
+            })
+        self.stats['downloaded'] += 1
+        return body_path
+
+    def fetch_json(self, url: str) -> Any:
+        with open(self.fetch_path(url), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def fetch_cards(self, url: str) -> List[Dict[str, Any]]:
+        """The 'data' list of an API response."""
+        return self.fetch_json(url).get('data', [])
+
+    def fetch_to_file(self, url: str, path: str) -> str:
+        """Copy the body of `url` to `path` (e.g. to build a local stand-in)."""
+        src = self.fetch_path(url)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(src, path)
+        return path
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"Fetcher: {s['downloaded']} downloaded, {s['not_modified']} not modified, "
+                f"{s['cached']} from cache, {s['local']} from local stand-in")
+
+
+def main():
+    from src.database import API_ALL_URL, API_BE_SPELLS, API_BE_TRAPS
+
+    p = argparse.ArgumentParser(description="Mirror the card API into a local stand-in directory")
+    p.add_argument('out_dir', help='Directory to write the responses to')
+    p.add_argument('--cache-dir', default=CACHE_DIR,
+                   help=f'Response cache directory (default={CACHE_DIR})')
+    p.add_argument('--offline', action='store_true',
+                   help='Use cached responses only')
+    args = p.parse_args()
+
+    with CardFetcher(args.cache_dir, offline=args.offline) as fetcher:
+        for url in (API_ALL_URL, API_BE_SPELLS, API_BE_TRAPS):
+            path = fetcher.fetch_to_file(url, os.path.join(args.out_dir, local_name(url)))
+            print(f"{url} -> {path}")
+        print(fetcher.summary())
+
+
+if __name__ == '__main__':
+    main()
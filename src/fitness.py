@@ -1,18 +1,17 @@
-from math import comb
-import random
-from typing import Dict, Set
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
-from src.database import is_card_count_valid, load_card_db
+import numpy as np
 
-
-card_db_global = load_card_db()
-
-
-BLUE_EYES_IDS: Set[int] = {
-    
-}
+from src.card_index import CardIndex, card_index_for
+from src.database import load_card_db
+from src.deck import Deck, get_rng
+from src.hand_sim import draw_positions
+from src.rules import CompiledRules, load_rules
 
 
+# Combo starters for hand_sim's playable-hand conditions
 PLAYABLE_HAND_IDS: Set[int] = {
     80326401  ,# Wishes for Eyes of Blue ID
     8240199, # Sage with Eyes of Blue ID
@@ -31,221 +30,401 @@ PLAYABLE_HAND_IDS: Set[int] = {
 }
 
 
-MAIDEN_ID = 17947697       # Maiden of white 
-WISHES_ID = 80326401        # Wishes for Eyes of Blue 
-True_Light_ID = 62089826  # True Light ID
+# Cards that keep a combo going once a starter is in hand (hand_sim's
+# "starter AND extender" condition)
+EXTENDER_IDS: Set[int] = {
+    71039903,  # The White Stone of Ancients
+    38517737,  # Blue-Eyes Alternative White Dragon
+    45467446,  # Dragon Spirit of White
+}
 
-# Deck-building rule weights, thresholds, and points
-MIN_MONSTERS = 25      # minimum # monsters
-MAX_MONSTERS = 30  # maximum # monsters
-REQ_BE_MONSTERS = 8    # minimum # Blue-Eyes monsters
-MAX_DECK_SIZE = 40     # deck must not exceed 40 cards
-HAND_THRESHOLD = 0.70  # >=70% chance playable (single)
-JOINT_THRESHOLD = 0.0  # any chance to draw both IDs
 
-# Points assigned to each rule
-PTS_MONSTERS = 2
-PTS_BE_MONSTERS = 3
-PTS_DECK_SIZE = 1
-PTS_HAND_PLAYABLE = 7
-PTS_JOINT_BONUS = 10
+HAND_SIZE = 5  # opening hand size
 
-# Number of Monte Carlo trials for hand probability
-N_HAND_TRIALS = 200
+# The deck-building rules (thresholds, points, card lists) live in this
+# rule file only; see builtin_rules() and src/rules.py.
+BUILTIN_RULES_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'rules', 'blue_eyes.json')
 
-# --- SEARCH-ENGINE CONSISTENCY (e.g. Trade-In, Melody, Cards of Consonance) ---
-SEARCH_IDS: Set[int] = {
-    38120068,  # Trade-In
-    48800175,  # Melody of Awakening Dragon
-    39701395,  # Cards of Consonance (example)
-}
-SEARCH_WEIGHT = 5
-SEARCH_THRESHOLD = 0.60  # award points if P ≥ 60%
+# Exact hypergeometric hand probabilities by default for new evaluation
+# contexts; set_exact_hand_rates(False) samples the probability rules
+# marked 'sampled' instead (e.g. to cross-check the closed forms).
+EXACT_HAND_RATES = True
 
-def compute_search_rate(deck: Dict[int,int]) -> float:
+
+def is_deck_valid(deck: Dict[int, int], ctx: 'EvalContext' = None) -> bool:
     """
-    Exact hypergeometric: P(draw ≥1 search card in opening 5).
+    Quick banlist and size check against the context's card pool and rules.
     """
-    total = MAX_DECK_SIZE
-    k = sum(deck.get(cid,0) for cid in SEARCH_IDS)
-    if k == 0:
-        return 0.0
-    # hypergeometric C(total-k,5)/C(total,5)
-    return 1 - comb(total - k, 5) / comb(total, 5)
-
+    return resolve_context(deck, ctx).rules.deck_aggregates(deck) is not None
 
-# --- SPELL/TRAP BACKROW BALANCE BONUS ---
-MIN_BACKROW = 10
-MAX_BACKROW = 15
-BACKROW_BONUS = 1
 
-def compute_backrow_bonus(deck: Dict[int,int]) -> int:
+def compute_deck_score(deck: Dict[int, int], ctx: 'EvalContext' = None) -> float:
     """
-    Reward a balanced number of Spell/Trap cards.
+    Evaluate deck against the context's rules; kept for callers of the
+    former hard-coded scorer, same as evaluate_fitness.
     """
-    backrow = sum(
-        cnt for cid,cnt in deck.items()
-        if card_db_global[cid]['type'] in ('Spell Card', 'Trap Card')
-    )
-    return BACKROW_BONUS if MIN_BACKROW <= backrow <= MAX_BACKROW else 0
-
+    return evaluate_fitness(deck, ctx)
 
-# --- SYNERGY PAIR / TRIO BONUSES ---
-SYNERGY_COMBOS = [
-    ({89631139, 30576089}, 3),   # BEWD + Sage with Eyes
-    ({89631139, 48800175}, 4),   # BEWD + Melody
-    ({30576089, 71039903}, 2),   # Sage + Stone
-    # add more as needed…
-]
 
-def compute_synergy_bonus(deck: Dict[int,int]) -> int:
+def evaluate_fitness(deck: Dict[int, int], ctx: 'EvalContext' = None) -> float:
     """
-    For each defined combo (set of IDs), award points if all are present.
+    Uncached fitness = sum of rule-based scores; invalid decks get -inf.
     """
-    bonus = 0
-    deck_ids = set(deck.keys())
-    for combo_ids, pts in SYNERGY_COMBOS:
-        if combo_ids.issubset(deck_ids):
-            bonus += pts
-    return bonus
+    ctx = resolve_context(deck, ctx)
+    return ctx.rules.score_deck(deck, ctx.exact, ctx.hand_bank)
+
+
+# --- MEMOIZED FITNESS ---
+FITNESS_CACHE_SIZE = 100_000  # max # decks remembered by the shared cache
 
+DeckKey = Tuple[Tuple[int, int], ...]
 
-# --- TWO-CARD COMBO PROBABILITY BONUS (exact) ---
-COMBO_A = 48800175  # Melody of Awakening Dragon
-COMBO_B = 89631139  # Blue-Eyes White Dragon
-COMBO_WEIGHT = 4
 
-def compute_combo_probability(deck: Dict[int,int]) -> float:
+def deck_fingerprint(deck: Dict[int, int]) -> Any:
     """
-    Exact hypergeometric: P(both A and B in opening 5).
+    Canonical, hashable key for a deck: the raw count vector of a Deck,
+    otherwise its sorted (card_id, count) pairs.
     """
-    total = MAX_DECK_SIZE
-    a_count = deck.get(COMBO_A, 0)
-    b_count = deck.get(COMBO_B, 0)
-    # sum over exactly one of each in the hand:
-    # [C(a_count,1)*C(b_count,1)*C(total-2,3)] / C(total,5)
-    if a_count == 0 or b_count == 0:
-        return 0.0
-    num = comb(a_count,1) * comb(b_count,1) * comb(total-2, 3)
-    den = comb(total, 5)
-    return num / den
+    if isinstance(deck, Deck):
+        return deck.key()
+    return tuple(sorted(deck.items()))
 
-def is_deck_valid(deck: Dict[int, int]) -> bool:
+
+class FitnessCache:
     """
-    Quick banlist and size check.
+    Bounded LRU cache mapping deck fingerprints to fitness scores,
+    with hit/miss counters.
     """
-    total = sum(deck.values())
-    if total > MAX_DECK_SIZE:
-        return False
-    for cid, cnt in deck.items():
-        if not is_card_count_valid(cid, cnt, card_db_global):
-            return False
-    return True
 
-
-def estimate_playable_hand_rate(deck: Dict[int, int], n_trials: int = N_HAND_TRIALS) -> float:
+    def __init__(self, maxsize: int = FITNESS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[Any, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def get(self, key: Any) -> Optional[float]:
+        score = self._scores.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._scores.move_to_end(key)
+        return score
+
+    def put(self, key: Any, score: float) -> None:
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.maxsize:
+            self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        self._scores.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        """Drop all entries, keeping the counters."""
+        self._scores.clear()
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'size': len(self._scores),
+            'maxsize': self.maxsize,
+        }
+
+    def summary(self) -> str:
+        return (f"Fitness cache: {self.hits} hits / {self.misses} misses "
+                f"({self.hit_rate():.1%} hit rate, {len(self._scores)} decks stored)")
+
+
+def set_exact_hand_rates(exact: bool) -> None:
     """
-    Monte Carlo: fraction of 5-card hands containing
-    at least one ID from PLAYABLE_HAND_IDS.
+    Switch between exact and Monte Carlo hand probabilities, for new and
+    existing contexts. Clears their caches since scores depend on the mode.
     """
-    pool = []
-    for cid, cnt in deck.items():
-        pool.extend([cid] * cnt)
+    global EXACT_HAND_RATES
+    EXACT_HAND_RATES = exact
+    for ctx in _CONTEXTS.values():
+        ctx.exact = exact
+        ctx.cache.clear()
+
 
-    success = 0
-    for _ in range(n_trials):
-        hand = random.sample(pool, 5)
-        if any(c in PLAYABLE_HAND_IDS for c in hand):
-            success += 1
-    return success / n_trials
+# --- COMMON RANDOM NUMBERS ---
+# Monte Carlo scores drawn independently per deck make paired comparisons
+# (DE selection, GA tournaments) noisy. With a hand bank, every deck is
+# tested on the same hands, so differences in score come from the decks,
+# not the draws, and fewer trials are needed.
+CRN_TRIALS = 100    # shared hands per deck size
+CRN_REFRESH = 10    # generations between redraws of the shared hands
 
 
-def estimate_joint_playable_hand_rate(deck: Dict[int, int], n_trials: int = N_HAND_TRIALS) -> float:
+class HandBank:
     """
-    Monte Carlo: fraction of 5-card hands containing
-    both MAIDEN_ID and WISHES_ID.
+    Shared opening hands for Monte Carlo scoring (common random numbers):
+    `n_trials` hands of slot positions per deck size, applied to each
+    deck's copies laid out in a fixed card order. The hands of epoch e are
+    a pure function of (seed, e, deck and hand size), so worker processes and
+    resumed runs rebuild the same ones. Generation g uses epoch
+    g // refresh_every.
     """
-    pool = []
-    for cid, cnt in deck.items():
-        pool.extend([cid] * cnt)
 
-    success = 0
-    for _ in range(n_trials):
-        hand = random.sample(pool, 5)
-        if MAIDEN_ID in hand and WISHES_ID in hand:
-            success += 1
-    return success / n_trials
+    def __init__(self, n_trials: int = CRN_TRIALS, refresh_every: int = CRN_REFRESH,
+                 seed: Optional[int] = None, epoch: int = 0):
+        self.n_trials = n_trials
+        self.refresh_every = refresh_every
+        self.seed = int(get_rng().integers(1 << 63)) if seed is None else seed
+        self.epoch = epoch
+        self._positions: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def state(self) -> Tuple[int, int, int, int]:
+        return self.n_trials, self.refresh_every, self.seed, self.epoch
+
+    def set_state(self, state: Sequence[int]) -> None:
+        """Adopt another bank's state() (e.g. from a checkpoint or the parent process)."""
+        if tuple(state) != self.state():
+            self.n_trials, self.refresh_every, self.seed, self.epoch = state
+            self._positions.clear()
+
+    def positions(self, deck_size: int, hand_size: int = HAND_SIZE) -> np.ndarray:
+        """(n_trials, hand_size) slot positions shared by all decks of this size."""
+        pos = self._positions.get((deck_size, hand_size))
+        if pos is None:
+            if deck_size < hand_size:
+                raise ValueError(f"Cannot draw {hand_size} cards from a {deck_size}-card deck")
+            rng = np.random.default_rng((self.seed, self.epoch, deck_size, hand_size))
+            pos = draw_positions(np.array([deck_size]), hand_size, self.n_trials, rng)[0]
+            self._positions[deck_size, hand_size] = pos
+        return pos
+
+    def set_epoch(self, epoch: int) -> bool:
+        """Switch to the hands of `epoch`; returns whether they changed."""
+        if epoch == self.epoch:
+            return False
+        self.epoch = epoch
+        self._positions.clear()
+        return True
 
+    def set_generation(self, gen: int) -> bool:
+        return self.set_epoch(gen // self.refresh_every if self.refresh_every else 0)
 
-def compute_deck_score(deck: Dict[int, int]) -> float:
-    """
-    Evaluate deck against build rules; returns total rule-based score.
-    """
-    score = 0.0
 
-    # 1) Monster count rule
-    monster_count = sum(
-        cnt for cid, cnt in deck.items()
-        if card_db_global[cid]['type'] == 'Monster'
-    )
-    if monster_count >= MIN_MONSTERS:
-        score += PTS_MONSTERS
+# Hand bank shared by new and existing contexts; None = independent draws
+HAND_BANK: Optional[HandBank] = None
 
-    # 2) Blue-Eyes monster count rule
-    be_count = sum(deck.get(cid, 0) for cid in BLUE_EYES_IDS)
-    if be_count >= REQ_BE_MONSTERS:
-        score += PTS_BE_MONSTERS
 
-    # 3) Deck size rule
-    total = sum(deck.values())
-    if total <= MAX_DECK_SIZE:
-        score += PTS_DECK_SIZE
+def set_common_random_numbers(n_trials: Optional[int] = CRN_TRIALS,
+                              refresh_every: int = CRN_REFRESH,
+                              seed: Optional[int] = None) -> Optional[HandBank]:
+    """
+    Score Monte Carlo hands against one shared HandBank (n_trials=None
+    turns it off), for new and existing contexts. Clears their caches.
+    """
+    global HAND_BANK
+    HAND_BANK = None if n_trials is None else HandBank(n_trials, refresh_every, seed)
+    for ctx in _CONTEXTS.values():
+        ctx.hand_bank = HAND_BANK
+        ctx.cache.clear()
+    return HAND_BANK
 
-    # 4) Playable hand rate rule
-    p_rate = estimate_playable_hand_rate(deck)
-    if p_rate >= HAND_THRESHOLD:
-        score += PTS_HAND_PLAYABLE
 
-    # 5) Joint playable hand rate rule
-    joint_rate = estimate_joint_playable_hand_rate(deck)
-    if joint_rate > JOINT_THRESHOLD:
-        score += PTS_JOINT_BONUS
+def fitness(deck: Dict[int, int], ctx: 'EvalContext' = None) -> float:
+    """
+    Overall fitness = sum of rule-based scores; invalid decks get -inf.
+    Scores are memoized in the context's cache. Decks carry their card
+    pool, so `ctx` is only needed for plain dicts outside the default pool.
+    """
+    ctx = resolve_context(deck, ctx)
+    key = deck_fingerprint(deck)
+    score = ctx.cache.get(key)
+    if score is None:
+        # Whole populations should go through fitness_many / fitness_batch
+        score = evaluate_fitness(deck, ctx)
+        ctx.cache.put(key, score)
+    return score
 
-    # 6) Search card rate rule
-    search_rate = compute_search_rate(deck)
-    if search_rate >= SEARCH_THRESHOLD:
-        score += SEARCH_WEIGHT
 
-    # 7) Spell/Trap backrow balance bonus
-    score += compute_backrow_bonus(deck)
+# Below this many uncached decks the scalar path beats fitness_batch
+MIN_BATCH_ROWS = 8
 
-    # 8) Synergy combos bonus
-    score += compute_synergy_bonus(deck)
 
-    # 9) Two-card combo probability bonus
-    score += COMBO_WEIGHT * compute_combo_probability(deck)
+def fitness_many(
+    decks: Sequence[Dict[int, int]],
+    ctx: 'EvalContext' = None,
+    score_missing: Optional[Callable[[List[Dict[int, int]]], Sequence[float]]] = None
+) -> List[float]:
+    """
+    fitness() for a list of decks from one pool. Cached decks are looked up;
+    the rest are scored together by `score_missing` (by default fitness_batch
+    for Decks in exact mode, evaluate_fitness otherwise) and cached.
+    """
+    if not decks:
+        return []
+    ctx = resolve_context(decks[0], ctx)
+    scores: List[Optional[float]] = []
+    missing: List[int] = []
+    keys = []
+    for i, deck in enumerate(decks):
+        key = deck_fingerprint(deck)
+        score = ctx.cache.get(key)
+        keys.append(key)
+        scores.append(score)
+        if score is None:
+            missing.append(i)
+    if missing:
+        pending = [decks[i] for i in missing]
+        if score_missing is None:
+            new_scores = _score_locally(pending, ctx)
+        else:
+            new_scores = score_missing(pending)
+        for i, score in zip(missing, new_scores):
+            score = float(score)
+            scores[i] = score
+            ctx.cache.put(keys[i], score)
+    return scores
+
+
+def _score_locally(decks: List[Dict[int, int]], ctx: 'EvalContext') -> List[float]:
+    if (ctx.exact and len(decks) >= MIN_BATCH_ROWS
+            and all(isinstance(d, Deck) and d.index is ctx.index for d in decks)):
+        counts = np.array([d.counts for d in decks])
+        return fitness_batch(counts, ctx).tolist()
+    return [evaluate_fitness(d, ctx) for d in decks]
+
+
+# --- DECLARATIVE RULES ---
+# A context compiles its rule spec (see src/rules.py) once into dense
+# columns; evaluate_fitness, fitness_batch and the incremental scorer all
+# run the compiled rules.
+def builtin_rules() -> Dict[str, Any]:
+    """The default rule spec, read from BUILTIN_RULES_PATH."""
+    return load_rules(BUILTIN_RULES_PATH)
+
+
+# Custom rule spec for new and existing contexts; None = builtin_rules()
+RULES: Optional[Dict[str, Any]] = None
+
+
+def set_rules(spec: Optional[Dict[str, Any]]) -> None:
+    """
+    Score with a rule spec (e.g. from rules.load_rules) instead of the
+    built-in rules, for new and existing contexts; None restores them.
+    Clears their caches since scores depend on the rules.
+    """
+    global RULES
+    RULES = spec
+    for ctx in _CONTEXTS.values():
+        ctx.set_rules(spec)
 
-    # --- Custom point allocations ---
-    # 2 pts if Trade-In (38120068) is in the deck
-    if deck.get(38120068, 0) > 0:
-        score += 2
-    # 5 pts if True Light (62089826) is in the deck
-    if deck.get(62089826, 0) > 0:
-        score += 5
-    # 1 pt for each Blue-Eyes White Dragon (89631139)
-    score += deck.get(89631139, 0) * 1
-    # 1 pt for each Wishes for Eyes of Blue (80326401)
-    score += deck.get(80326401, 0) * 1
-    # 1 pt for each Maiden of White (17947697)
-    score += deck.get(17947697, 0) * 1
 
-    return score
+# --- VECTORIZED BATCH FITNESS ---
+def fitness_batch(counts: np.ndarray, ctx: 'EvalContext' = None) -> np.ndarray:
+    """
+    Score a whole population at once.
+    `counts` is a (population x card-pool) count matrix whose columns follow
+    `ctx.index` (by default the default card pool).
+    Hand probabilities are always exact here; invalid decks get -inf.
+    """
+    return (ctx or default_context()).rules.score_counts(counts)
 
 
-def fitness(deck: Dict[int, int]) -> float:
+# --- EVALUATION CONTEXT ---
+class EvalContext:
     """
-    Overall fitness = sum of rule-based scores; invalid decks get -inf.
+    Everything a fitness evaluation depends on: the card DB and its dense
+    index, the scoring rules compiled against them, the hand-probability
+    mode (and shared hand bank) and a fitness cache of its own.
+    Built lazily, one per card pool (see for_card_db / for_index).
     """
-    if not is_deck_valid(deck):
-        return float('-inf')
-    return compute_deck_score(deck)
+
+    def __init__(self, index: CardIndex, card_db: Optional[Dict[int, Dict[str, Any]]] = None,
+                 exact: Optional[bool] = None, cache_size: int = FITNESS_CACHE_SIZE,
+                 rules: Optional[Dict[str, Any]] = None):
+        self.index = index
+        self._card_db = card_db
+        self.rule_spec = RULES if rules is None else rules
+        self._rules: Optional[CompiledRules] = None
+        self.exact = EXACT_HAND_RATES if exact is None else exact
+        self.hand_bank = HAND_BANK
+        self.cache = FitnessCache(cache_size)
+
+    @property
+    def card_db(self) -> Dict[int, Dict[str, Any]]:
+        if self._card_db is None:
+            self._card_db = self.index.to_card_db()
+        return self._card_db
+
+    @property
+    def rules(self) -> CompiledRules:
+        """The rule spec (custom or built-in) compiled against this index."""
+        if self._rules is None:
+            self._rules = CompiledRules(self.rule_spec or builtin_rules(), self.index)
+        return self._rules
+
+    def set_rules(self, spec: Optional[Dict[str, Any]]) -> None:
+        self.rule_spec = spec
+        self._rules = None
+        self.cache.clear()
+
+    def start_generation(self, gen: int) -> None:
+        """
+        Called by the optimizers before generation `gen`: moves the hand
+        bank to its epoch and drops cached scores drawn on the old hands.
+        """
+        if self.hand_bank is not None and self.hand_bank.set_generation(gen) and not self.exact:
+            self.cache.invalidate()
+
+    @classmethod
+    def for_index(cls, index: CardIndex,
+                  card_db: Optional[Dict[int, Dict[str, Any]]] = None) -> 'EvalContext':
+        """Shared context for a card index."""
+        ctx = _CONTEXTS.get(id(index))
+        if ctx is None or ctx.index is not index:
+            ctx = cls(index, card_db)
+            _CONTEXTS[id(index)] = ctx
+        return ctx
+
+    @classmethod
+    def for_card_db(cls, card_db: Dict[int, Dict[str, Any]]) -> 'EvalContext':
+        """Shared context for a card DB dict (as returned by load_card_db)."""
+        return cls.for_index(card_index_for(card_db), card_db)
+
+
+_CONTEXTS: Dict[int, EvalContext] = {}
+_default_context: Optional[EvalContext] = None
+
+
+def default_context() -> EvalContext:
+    """Context for the default card DB, loaded on first use."""
+    global _default_context
+    if _default_context is None:
+        _default_context = EvalContext.for_card_db(load_card_db())
+    return _default_context
+
+
+def resolve_context(deck: Any = None, ctx: Optional[EvalContext] = None) -> EvalContext:
+    """`ctx` if given, else the context of the deck's own pool, else the default."""
+    if ctx is not None:
+        return ctx
+    if isinstance(deck, Deck):
+        return EvalContext.for_index(deck.index)
+    return default_context()
+
+
+def __getattr__(name: str) -> Any:
+    # Backwards-compatible, lazily loaded aliases for the default context
+    if name == 'card_db_global':
+        return default_context().card_db
+    if name == 'fitness_cache':
+        return default_context().cache
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
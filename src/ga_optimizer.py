@@ -1,32 +1,45 @@
-import os
-import json
-import random
-import argparse
-from typing import Dict, List, Tuple
-from src.database import load_card_db
-from src.fitness import fitness
-from src.deck_optimiser import (
-    sanitize_seed_deck,
-    load_seed_decks,
-    generate_random_deck,
-    format_deck
-)
-
-# == GA PARAMETERS ==
-NP        = 14           # population size
-GENS      = 500        # default # generations
-TOUR_SIZE = 3            # tournament selection size
-MUT_RATE  = 0.1          # per-gene mutation rate (10% of cards)
-ELITE     = 2            # number of top individuals to carry over
-
 #!/usr/bin/env python3
 import os
 import random
 import argparse
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
+from src.card_index import card_index_for
 from src.database import load_card_db
-from src.fitness import fitness
+from src.deck import (
+    DECK_SIZE,
+    Deck,
+    distinct_ranks,
+    get_rng,
+    repair,
+    repair_batch,
+    seed_rngs,
+)
+from src.fitness import (
+    CRN_REFRESH,
+    CRN_TRIALS,
+    EvalContext,
+    fitness,
+    fitness_many,
+    set_common_random_numbers,
+    set_exact_hand_rates,
+    set_rules,
+)
+from src.hand_sim import deck_slots
+from src.checkpoint import (
+    CHECKPOINT_EVERY,
+    Checkpointer,
+    load_checkpoint,
+    make_checkpointer,
+    restore_checkpoint,
+)
+from src.parallel import ParallelEvaluator, make_evaluator
+from src.racing import RACE_BATCH, RACE_CAP, Racer, make_racer
+from src.rules import load_rules
+from src.surrogate import SCREEN_FACTOR, Surrogate, make_surrogate
+from src.telemetry import NULL_TELEMETRY, Telemetry, make_telemetry
 from src.deck_optimiser import (
     sanitize_seed_deck,
     load_seed_decks,
@@ -45,115 +58,293 @@ def parse_args():
     p = argparse.ArgumentParser(description="Run GA optimizer for Yu-Gi-Oh! decks")
     p.add_argument('-g', '--gens', type=int, default=GENS,
                    help='Number of generations to run')
+    p.add_argument('--monte-carlo', action='store_true',
+                   help='Estimate hand probabilities by Monte Carlo instead of exactly')
+    p.add_argument('--rules', default=None, metavar='PATH',
+                   help='JSON rule file to score decks with (default: built-in rules)')
+    p.add_argument('--crn', action='store_true',
+                   help='With --monte-carlo, score every deck on one shared set of hands')
+    p.add_argument('--crn-trials', type=int, default=CRN_TRIALS,
+                   help=f'Shared hands per deck size (default={CRN_TRIALS})')
+    p.add_argument('--crn-refresh', type=int, default=CRN_REFRESH,
+                   help=f'Generations between redraws of the shared hands (default={CRN_REFRESH})')
+    p.add_argument('--race', action='store_true',
+                   help='With --monte-carlo, decide each tournament by racing')
+    p.add_argument('--race-batch', type=int, default=RACE_BATCH,
+                   help=f'Hands per deck per racing round (default={RACE_BATCH})')
+    p.add_argument('--race-cap', type=int, default=RACE_CAP,
+                   help=f'Most hands per deck in one race (default={RACE_CAP})')
+    p.add_argument('--surrogate', action='store_true',
+                   help='Breed extra offspring and evaluate only those a surrogate model ranks best')
+    p.add_argument('--screen-factor', type=int, default=SCREEN_FACTOR,
+                   help=f'Candidates bred per evaluated offspring with --surrogate (default={SCREEN_FACTOR})')
+    p.add_argument('--interactions', action='store_true',
+                   help='Add pairwise rule-aggregate interactions to the surrogate')
+    p.add_argument('--workers', type=int, default=1,
+                   help='Worker processes for child evaluation (default=1, in-process)')
+    p.add_argument('--seed', type=int, default=None,
+                   help='Master RNG seed; runs with the same seed and worker count reproduce')
+    p.add_argument('--telemetry', default=None, metavar='PATH',
+                   help='Stream per-generation timings and metrics to PATH as JSON Lines')
+    p.add_argument('--checkpoint', default=None, metavar='PATH',
+                   help='Periodically save the run state to PATH (.npz)')
+    p.add_argument('--checkpoint-every', type=int, default=None, metavar='N',
+                   help=f'Generations between checkpoints (default={CHECKPOINT_EVERY})')
+    p.add_argument('--checkpoint-seconds', type=float, default=None, metavar='T',
+                   help='Also checkpoint once T seconds have passed since the last save')
+    p.add_argument('--resume', action='store_true',
+                   help='Continue from the --checkpoint file instead of starting over')
     return p.parse_args()
 
-def tournament_selection(pop: List[Dict[int,int]], k: int) -> Dict[int,int]:
+def tournament_selection(pop: List[Deck], k: int, racer: Optional[Racer] = None) -> Deck:
     aspirants = random.sample(pop, k)
+    if racer is not None:
+        scores = racer.scores(aspirants)
+        return aspirants[max(range(k), key=scores.__getitem__)]
     return max(aspirants, key=fitness)
 
-def uniform_crossover(p1: Dict[int,int], p2: Dict[int,int]) -> Dict[int,int]:
-    # Flatten each parent into a 40-slot list
-    slots1 = [cid for cid,cnt in p1.items() for _ in range(cnt)]
-    slots2 = [cid for cid,cnt in p2.items() for _ in range(cnt)]
+def uniform_crossover(p1: Deck, p2: Deck) -> Deck:
+    rng = get_rng()
+    # Flattened DECK_SIZE-slot views of each parent (-1 marks a missing slot)
+    slots1 = p1.slots()
+    slots2 = p2.slots()
+    padded1 = np.full(DECK_SIZE, -1)
+    padded2 = np.full(DECK_SIZE, -1)
+    padded1[:min(DECK_SIZE, len(slots1))] = slots1[:DECK_SIZE]
+    padded2[:min(DECK_SIZE, len(slots2))] = slots2[:DECK_SIZE]
     # Build child slot-by-slot
-    child_slots = []
-    for i in range(40):
-        if random.random() < 0.5 and i < len(slots1):
-            child_slots.append(slots1[i])
-        elif i < len(slots2):
-            child_slots.append(slots2[i])
-        else:
-            child_slots.append(random.choice(slots1 + slots2))
-    # Collapse back to counts
-    child = {}
-    for cid in child_slots:
-        child[cid] = child.get(cid,0) + 1
-    return child
-
-def mutate_deck(deck: Dict[int,int], card_db: Dict[int,Dict]) -> Dict[int,int]:
-    # Flatten
-    slots = [cid for cid,cnt in deck.items() for _ in range(cnt)]
+    take1 = (rng.random(DECK_SIZE) < 0.5) & (padded1 >= 0)
+    child_slots = np.where(take1, padded1, padded2)
+    missing = child_slots < 0
+    if missing.any():
+        child_slots[missing] = rng.choice(np.concatenate([slots1, slots2]), int(missing.sum()))
+    return Deck.from_slots(p1.index, child_slots)
+
+def mutate_deck(deck: Deck, card_db: Dict[int,Dict]) -> Deck:
+    index = card_index_for(card_db)
+    rng = get_rng()
+    slots = deck.slots()
     # Random slot-swaps
-    for i in range(len(slots)):
-        if random.random() < MUT_RATE:
-            slots[i] = random.choice(list(card_db.keys()))
-    # Rebuild counts, enforcing banlist limits
-    newd = {}
-    for cid in slots:
-        lim = card_db[cid]['banlist_limit']
-        newd[cid] = min(newd.get(cid,0) + 1, lim)
-    # Fix deck size to exactly 40
-    flat = [cid for cid,cnt in newd.items() for _ in range(cnt)]
-    if len(flat) > 40:
-        flat = random.sample(flat, 40)
-    while len(flat) < 40:
-        flat.append(random.choice(list(card_db.keys())))
-    final = {}
-    for cid in flat:
-        final[cid] = final.get(cid,0) + 1
-    return final
+    hit = rng.random(len(slots)) < MUT_RATE
+    slots[hit] = rng.integers(len(index), size=int(hit.sum()))
+    # Enforce banlist limits and fix deck size to exactly DECK_SIZE
+    counts = repair(np.bincount(slots, minlength=len(index)), index, rng, DECK_SIZE)
+    return Deck(index, counts)
+
+def breed_batch(
+    pop: List[Deck],
+    scores: Sequence[float],
+    n_children: int,
+    card_db: Dict[int, Dict],
+    tel: Telemetry = NULL_TELEMETRY
+) -> List[Deck]:
+    """
+    Tournament selection, uniform crossover, slot mutation and repair for a
+    whole generation of children at once. Tournament aspirants, crossover
+    masks and mutation masks are each one random array, and the children
+    are repaired together by repair_batch. Parent slots a crossover leaves
+    empty are refilled from the parents' cards by the repair.
+    """
+    index = card_index_for(card_db)
+    rng = get_rng()
+    counts = np.array([d.counts for d in pop])
+    scores = np.asarray(scores, dtype=np.float64)
+
+    # a) TOUR_SIZE distinct aspirants per parent; the fittest wins
+    with tel.phase('selection'):
+        m = 2 * n_children
+        _, aspirants = distinct_ranks(rng, np.full(m, len(pop)), np.full(m, TOUR_SIZE))
+        aspirants = aspirants.reshape(m, TOUR_SIZE)
+        winners = aspirants[np.arange(m), np.argmax(scores[aspirants], axis=1)]
+        p1, p2 = winners[:n_children], winners[n_children:]
+
+    # b) Uniform crossover over DECK_SIZE-slot views (-1 marks a missing slot)
+    with tel.phase('crossover'):
+        slots, _ = deck_slots(counts)
+        slots = np.pad(slots, ((0, 0), (0, max(DECK_SIZE - slots.shape[1], 0))),
+                       constant_values=-1)[:, :DECK_SIZE]
+        take1 = (rng.random((n_children, DECK_SIZE)) < 0.5) & (slots[p1] >= 0)
+        child_slots = np.where(take1, slots[p1], slots[p2])
+
+    with tel.phase('mutation'):
+        # c) Random slot-swaps
+        hit = rng.random((n_children, DECK_SIZE)) < MUT_RATE
+        child_slots[hit] = rng.integers(len(index), size=int(hit.sum()))
+
+        # d) Enforce banlist limits and fix deck size to exactly DECK_SIZE
+        filled = child_slots >= 0
+        flat = (child_slots + np.arange(n_children)[:, None] * len(index))[filled]
+        child_counts = np.bincount(flat, minlength=n_children * len(index)).astype(np.uint8)
+        child_counts = repair_batch(child_counts.reshape(n_children, -1), index, rng, DECK_SIZE,
+                                    prefer=counts[p1] | counts[p2])
+    return [Deck(index, c) for c in child_counts]
 
 def run_ga(
     card_db: Dict[int,Dict],
     seeds: List[Dict[int,int]],
-    gens: int
-) -> Tuple[List[Dict[int,int]], List[float]]:
+    gens: int,
+    evaluator: Optional[ParallelEvaluator] = None,
+    verbose: bool = True,
+    pop_size: int = NP,
+    telemetry: Optional[Telemetry] = None,
+    checkpointer: Optional[Checkpointer] = None,
+    resume: Optional[Dict] = None,
+    racer: Optional[Racer] = None,
+    surrogate: Optional[Surrogate] = None,
+    screen_factor: int = SCREEN_FACTOR
+) -> Tuple[List[Deck], List[float]]:
     """
-    Runs the GA for `gens` generations.
+    Runs the GA for `gens` generations on `pop_size` decks.
+    Children are scored in batches, by `evaluator` when given.
+    Per-generation metrics stream to `telemetry` when given.
+    State is saved through `checkpointer` when given; a loaded checkpoint
+    passed as `resume` continues after its generation (seeds are ignored).
+    Children are bred for the whole generation at once (breed_batch),
+    except with a `racer`, which decides each tournament by racing.
+    With a `surrogate`, `screen_factor` times as many children are bred and
+    only the best predicted ones are evaluated.
     Returns (final_population, avg_fitnesses_per_generation).
     """
-    # 1) Sanitize seeds + initial population
-    sanitized = [sanitize_seed_deck(s, card_db) for s in seeds]
-    pop = sanitized[:NP]
-    while len(pop) < NP:
-        pop.append(generate_random_deck(card_db))
+    tel = telemetry or NULL_TELEMETRY
+    ctx = EvalContext.for_card_db(card_db)
+    if evaluator is not None:
+        evaluate = evaluator.evaluate
+    else:
+        evaluate = lambda decks: fitness_many(decks, ctx)
+    avg_fitnesses: List[float] = []
+    start = 1
+    if resume is not None:
+        pop = list(resume['pop'])
+        avg_fitnesses = list(resume['history'])
+        start = resume['gen'] + 1
+    else:
+        # 1) Sanitize seeds + initial population
+        sanitized = [sanitize_seed_deck(s, card_db) for s in seeds]
+        pop = sanitized[:pop_size]
+        while len(pop) < pop_size:
+            pop.append(generate_random_deck(card_db))
 
-    print("=== GA Initial Population ===")
-    for i, d in enumerate(pop,1):
-        print(f"Deck {i:2d}: Fitness={fitness(d):.2f}")
-    print()
+        init_scores = evaluate(pop)
+        if surrogate is not None:
+            surrogate.observe(pop, init_scores)
+        if verbose:
+            print("=== GA Initial Population ===")
+            for i, score in enumerate(init_scores, 1):
+                print(f"Deck {i:2d}: Fitness={score:.2f}")
+            print()
 
     # 2) Evolution loop
-    avg_fitnesses: List[float] = []
-    for gen in range(1, gens+1):
+    for gen in range(start, gens+1):
+        ctx.start_generation(gen)
+        tel.start_generation(ctx.cache)
         # a) Elitism
-        pop = sorted(pop, key=fitness, reverse=True)
+        with tel.phase('selection'):
+            pop = sorted(pop, key=fitness, reverse=True)
         next_pop = pop[:ELITE]
 
-        # b) Generate the rest
-        while len(next_pop) < NP:
-            p1 = tournament_selection(pop, TOUR_SIZE)
-            p2 = tournament_selection(pop, TOUR_SIZE)
-            child = uniform_crossover(p1, p2)
-            child = mutate_deck(child, card_db)
-            # ⬅ enforce banlist & deck-size
-            child = sanitize_seed_deck(child, card_db)
-            next_pop.append(child)
+        # b) Generate the rest (screen_factor times as many with a surrogate)
+        n_children = pop_size - len(next_pop)
+        n_bred = n_children * (screen_factor if surrogate else 1)
+        children = []
+        if racer is None:
+            children = breed_batch(pop, [fitness(d) for d in pop], n_bred, card_db, tel)
+        while len(children) < n_bred:
+            with tel.phase('selection'):
+                p1 = tournament_selection(pop, TOUR_SIZE, racer)
+                p2 = tournament_selection(pop, TOUR_SIZE, racer)
+            with tel.phase('crossover'):
+                child = uniform_crossover(p1, p2)
+            with tel.phase('mutation'):
+                # repairs banlist limits & deck size
+                child = mutate_deck(child, card_db)
+            children.append(child)
+        if surrogate is not None:
+            with tel.phase('screening'):
+                children = [children[i] for i in surrogate.screen(children, n_children)]
+        next_pop.extend(children)
+        parents = pop
         pop = next_pop
+        with tel.phase('evaluation'):
+            scores = evaluate(pop)
+        if surrogate is not None:
+            with tel.phase('screening'):
+                surrogate.record(children, scores[-n_children:])
+                surrogate.observe(children, scores[-n_children:])
 
         # c) Record average fitness
-        avg = sum(fitness(d) for d in pop) / len(pop)
+        avg = sum(scores) / len(pop)
         avg_fitnesses.append(avg)
 
         # d) Logging
-        if gen <= 5 or gen % (gens//10 if gens>=10 else 1) == 0:
-            best = fitness(pop[0])
-            print(f"Gen {gen:5d}: Best={best:.2f}, Avg={avg:.2f}")
+        if verbose and (gen <= 5 or gen % (gens//10 if gens>=10 else 1) == 0):
+            with tel.phase('io'):
+                best = scores[0]
+                print(f"Gen {gen:5d}: Best={best:.2f}, Avg={avg:.2f}")
+        tel.end_generation(gen, pop, scores, offspring=pop[ELITE:], parents=parents,
+                           cache=ctx.cache)
+        if checkpointer is not None:
+            with tel.phase('io'):
+                checkpointer.maybe_save(gen, pop, avg_fitnesses, ctx, evaluator,
+                                        final=gen == gens, surrogate=surrogate,
+                                        racer=racer)
 
     # 3) Final best deck
     best_deck = pop[0]
-    print("\n=== GA Best Deck ===")
-    print(f"Fitness = {fitness(best_deck):.2f}")
-    print(format_deck(best_deck, card_db))
+    if verbose:
+        print("\n=== GA Best Deck ===")
+        print(f"Fitness = {fitness(best_deck):.2f}")
+        print(format_deck(best_deck, card_db))
+        print(ctx.cache.summary())
+        if racer is not None:
+            print(racer.summary())
+        if surrogate is not None:
+            print(surrogate.summary())
 
     return pop, avg_fitnesses
 
 def main():
     args    = parse_args()
-    card_db = load_card_db(os.path.join("data","blue_eyes_clean.json"))
+    if args.monte_carlo:
+        set_exact_hand_rates(False)
+    if args.rules:
+        set_rules(load_rules(args.rules))
+    if args.seed is not None:
+        seed_rngs(args.seed)
+    if args.crn:
+        set_common_random_numbers(args.crn_trials, args.crn_refresh)
+    db_path = os.path.join("data","blue_eyes_clean.json")
+    card_db = load_card_db(db_path)
     seeds   = load_seed_decks(os.path.join("data","seed_decks.json"))
+    if args.resume and not args.checkpoint:
+        raise SystemExit("--resume needs --checkpoint PATH")
+    resume = None
+    if args.resume and os.path.exists(args.checkpoint):
+        resume = load_checkpoint(args.checkpoint, card_index_for(card_db))
+        print(f"Resuming from '{args.checkpoint}' after generation {resume['gen']}")
+    elif args.resume:
+        print(f"[WARN] No checkpoint at '{args.checkpoint}'; starting a new run.")
 
-    final_pop, avg_fitnesses = run_ga(card_db, seeds, args.gens)
+    eval_seed = resume['eval_seed'] if resume and resume['eval_seed'] is not None else args.seed
+    evaluator = make_evaluator(args.workers, db_path, eval_seed)
+    telemetry = make_telemetry(args.telemetry, 'ga', append=resume is not None)
+    checkpointer = make_checkpointer(args.checkpoint, 'ga', args.checkpoint_every,
+                                     args.checkpoint_seconds)
+    racer = make_racer(EvalContext.for_card_db(card_db), args.race, args.race_batch,
+                       args.race_cap)
+    surrogate = make_surrogate(EvalContext.for_card_db(card_db), args.surrogate,
+                               args.interactions)
+    if resume is not None:
+        restore_checkpoint(resume, EvalContext.for_card_db(card_db), evaluator, surrogate,
+                           racer)
+    try:
+        final_pop, avg_fitnesses = run_ga(card_db, seeds, args.gens, evaluator,
+                                          telemetry=telemetry, checkpointer=checkpointer,
+                                          resume=resume, racer=racer, surrogate=surrogate,
+                                          screen_factor=args.screen_factor)
+    finally:
+        telemetry.close()
+        if evaluator is not None:
+            evaluator.close()
 
     # ─── Plot average fitness over generations ───
     try:
@@ -0,0 +1,215 @@
+import argparse
+import os
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.card_index import CardIndex
+from src.deck import get_rng
+
+# == SIMULATION PARAMETERS ==
+GOING_FIRST  = 5          # opening hand size on the play
+GOING_SECOND = 6          # opening hand size on the draw
+N_SIM_HANDS  = 1_000_000  # default hands per deck for the CLI
+CHUNK_HANDS  = 1 << 18    # (deck, hand) pairs drawn per step (bounds memory)
+
+
+# == Drawing hands ==
+#
+# A hand is a set of distinct slot positions of a deck, one slot per copy.
+# Floyd's subset sampling, run column by column over arrays of (deck, hand)
+# pairs, draws hands without replacement for every deck and trial at once:
+# hand_size vectorized steps, no per-hand Python loop.
+
+def draw_positions(sizes: np.ndarray, hand_size: int, n_hands: int,
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    (n_decks, n_hands, hand_size) distinct slot positions per hand, drawn
+    uniformly from the first sizes[d] slots of each deck. A deck smaller
+    than a hand gets positions 0..hand_size-1 (all of it, plus padding).
+    """
+    rng = rng or get_rng()
+    sizes = np.asarray(sizes, dtype=np.int64)
+    u = rng.random((len(sizes), n_hands, hand_size))
+    out = np.empty(u.shape, dtype=np.int64)
+    for k in range(hand_size):
+        # Step k draws from 0..j; on a repeat it takes j itself
+        j = (sizes - hand_size + k)[:, None]
+        t = (u[..., k] * (j + 1)).astype(np.int64)
+        if k:
+            t = np.where((out[..., :k] == t[..., None]).any(axis=-1), j, t)
+        out[..., k] = t
+    small = sizes < hand_size
+    if small.any():
+        out[small] = np.arange(hand_size)
+    return out
+
+
+def sample_hands(pool: np.ndarray, hand_size: int, n_hands: int,
+                 rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    (n_hands, hand_size) hands drawn without replacement from the 1-D
+    `pool` (one entry per copy, any labels), like n_hands random.sample calls.
+    """
+    pool = np.asarray(pool)
+    if hand_size > len(pool):
+        raise ValueError(f"Cannot draw {hand_size} cards from a {len(pool)}-card deck")
+    pos = draw_positions(np.array([len(pool)]), hand_size, n_hands, rng)[0]
+    return pool[pos]
+
+
+def deck_slots(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Card positions of each deck of a count matrix, one per copy, as an
+    (n_decks, max deck size) matrix padded with -1, plus the deck sizes.
+    """
+    counts = np.atleast_2d(np.asarray(counts))
+    sizes = counts.sum(axis=1, dtype=np.int64)
+    width = int(sizes.max()) if len(sizes) else 0
+    slots = np.full((len(counts), width), -1, dtype=np.int64)
+    nz = np.flatnonzero(counts)
+    copies = counts.ravel()[nz].astype(np.int64)
+    rows = np.repeat(nz // counts.shape[1], copies)
+    cols = np.arange(rows.size) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    slots[rows, cols] = np.repeat(nz % counts.shape[1], copies)
+    return slots, sizes
+
+
+# == Hand conditions ==
+class HandCondition:
+    """
+    A test on opening hands: at least `n` cards from each required group
+    and no card from any excluded group. Groups are boolean masks over card
+    positions; evaluate() works on whole arrays of hands at once.
+    """
+
+    def __init__(self, require: Sequence[Tuple[np.ndarray, int]] = (),
+                 exclude: Sequence[np.ndarray] = ()):
+        # A trailing False entry makes the -1 padding slot never match
+        self.require = [(np.append(np.asarray(mask, dtype=bool), False), n) for mask, n in require]
+        self.exclude = [np.append(np.asarray(mask, dtype=bool), False) for mask in exclude]
+
+    @classmethod
+    def any_of(cls, mask: np.ndarray, n: int = 1) -> 'HandCondition':
+        """At least `n` cards of the group."""
+        return cls(require=[(mask, n)])
+
+    @classmethod
+    def all_of(cls, *masks: np.ndarray) -> 'HandCondition':
+        """At least one card of every group (e.g. a starter AND an extender)."""
+        return cls(require=[(m, 1) for m in masks])
+
+    @classmethod
+    def none_of(cls, mask: np.ndarray) -> 'HandCondition':
+        """No card of the group (e.g. a brick: nothing playable)."""
+        return cls(exclude=[mask])
+
+    def evaluate(self, hands: np.ndarray) -> np.ndarray:
+        """Boolean result per hand for an (..., hand_size) array of card positions."""
+        ok = np.ones(hands.shape[:-1], dtype=bool)
+        for member, n in self.require:
+            ok &= np.count_nonzero(member[hands], axis=-1) >= n
+        for member in self.exclude:
+            ok &= ~member[hands].any(axis=-1)
+        return ok
+
+
+def standard_conditions(index: CardIndex, starters: Iterable[int],
+                        extenders: Iterable[int]) -> Dict[str, HandCondition]:
+    """Playable (a starter), starter AND extender, and brick (no starter) hands."""
+    starter = index.mask(starters)
+    extender = index.mask(extenders)
+    return {
+        'playable': HandCondition.any_of(starter),
+        'starter_extender': HandCondition.all_of(starter, extender),
+        'brick': HandCondition.none_of(starter),
+    }
+
+
+# == Simulation ==
+def hand_rates(
+    counts: np.ndarray,
+    conditions: Mapping[str, HandCondition],
+    hand_size: int = GOING_FIRST,
+    n_hands: int = N_SIM_HANDS,
+    rng: Optional[np.random.Generator] = None,
+    chunk_hands: int = CHUNK_HANDS
+) -> Dict[str, np.ndarray]:
+    """
+    Fraction of `n_hands` random opening hands meeting each condition, per
+    deck of a (decks x card-pool) count matrix. Hands are drawn and tested
+    in chunks of about `chunk_hands` (deck, hand) pairs, so memory stays bounded.
+    """
+    rng = rng or get_rng()
+    slots, sizes = deck_slots(counts)
+    if slots.shape[1] < hand_size:
+        slots = np.pad(slots, ((0, 0), (0, hand_size - slots.shape[1])), constant_values=-1)
+    n_decks = len(slots)
+    hits = {name: np.zeros(n_decks, dtype=np.int64) for name in conditions}
+    per_chunk = max(1, chunk_hands // max(n_decks, 1))
+    rows = np.arange(n_decks)[:, None, None]
+    done = 0
+    while done < n_hands:
+        m = min(per_chunk, n_hands - done)
+        hands = slots[rows, draw_positions(sizes, hand_size, m, rng)]
+        for name, cond in conditions.items():
+            hits[name] += np.count_nonzero(cond.evaluate(hands), axis=-1)
+        done += m
+    return {name: h / n_hands for name, h in hits.items()}
+
+
+def opening_rates(
+    counts: np.ndarray,
+    conditions: Mapping[str, HandCondition],
+    n_hands: int = N_SIM_HANDS,
+    rng: Optional[np.random.Generator] = None
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """hand_rates going first (5 cards) and going second (6 cards)."""
+    return {
+        'first': hand_rates(counts, conditions, GOING_FIRST, n_hands, rng),
+        'second': hand_rates(counts, conditions, GOING_SECOND, n_hands, rng),
+    }
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Simulate opening hands of the seed decks")
+    p.add_argument('-n', '--hands', type=int, default=N_SIM_HANDS,
+                   help=f'Hands per deck and turn order (default={N_SIM_HANDS})')
+    p.add_argument('--seed', type=int, default=None,
+                   help='RNG seed')
+    return p.parse_args()
+
+
+def main():
+    import time
+
+    from src.database import load_card_db
+    from src.card_index import card_index_for
+    from src.deck import seed_rngs
+    from src.deck_optimiser import load_seed_decks, sanitize_seed_deck
+    from src.fitness import EXTENDER_IDS, PLAYABLE_HAND_IDS
+
+    args = parse_args()
+    if args.seed is not None:
+        seed_rngs(args.seed)
+    card_db = load_card_db(os.path.join("data", "blue_eyes_clean.json"))
+    index = card_index_for(card_db)
+    decks = [sanitize_seed_deck(d, card_db)
+             for d in load_seed_decks(os.path.join("data", "seed_decks.json"))]
+    counts = np.array([d.counts for d in decks])
+    conditions = standard_conditions(index, PLAYABLE_HAND_IDS, EXTENDER_IDS)
+
+    start = time.perf_counter()
+    rates = opening_rates(counts, conditions, args.hands)
+    elapsed = time.perf_counter() - start
+    for order, by_name in rates.items():
+        print(f"\n=== Going {order} ({GOING_FIRST if order == 'first' else GOING_SECOND} cards) ===")
+        for d in range(len(decks)):
+            cells = ', '.join(f"{name}={by_name[name][d]:.4f}" for name in conditions)
+            print(f"Seed deck {d + 1}: {cells}")
+    total = 2 * len(decks) * args.hands
+    print(f"\n{total} hands in {elapsed:.2f}s ({total / elapsed:,.0f} hands/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from src.deck import Deck
+from src.fitness import EvalContext, resolve_context
+
+# (remove_id, add_id); either side may be None for a pure add / removal
+Edit = Tuple[Optional[int], Optional[int]]
+
+
+class IncrementalScorer:
+    """
+    Fitness of one deck kept up to date under small edits.
+
+    Holds the deck's rule aggregates (one per card selector of the context's
+    compiled rules, see src/rules.py) plus the number of cards
+    over their banlist limit. Applying (remove_id, add_id) edits touches only
+    the edited cards' feature entries, so rescoring costs O(edits) instead of
+    a pass over the whole deck. Scores equal fitness() in exact mode; Monte
+    Carlo hand rates are not supported.
+    """
+
+    def __init__(self, deck: Mapping[int, int], ctx: Optional[EvalContext] = None):
+        ctx = resolve_context(deck, ctx)
+        if not ctx.exact:
+            raise ValueError("IncrementalScorer needs exact hand probabilities")
+        self.ctx = ctx
+        self.rules = ctx.rules
+        self._rows = self.rules.sparse_rows()
+        self._limits = self.rules.limits.tolist()
+        self._pos = ctx.index.pos
+
+        if isinstance(deck, Deck) and deck.index is ctx.index:
+            counts = deck.counts
+        else:
+            counts = ctx.index.to_counts(deck)
+        self.counts = counts.astype(np.int64).tolist()
+        self.agg = self.rules.aggregates(counts).astype(np.int64).tolist()
+        self.over_limit = sum(c > lim or c < 0 for c, lim in zip(self.counts, self._limits))
+        self.score = self._score(self.agg, self.over_limit)
+
+    def _score(self, agg: List[int], over_limit: int) -> float:
+        if over_limit or agg[self.rules.total_col] > self.rules.max_deck_size:
+            return float('-inf')
+        return self.rules.score_row(agg)
+
+    def _step(self, agg: List[int], counts: Dict[int, int], i: int, sign: int) -> int:
+        """Move one copy of card position `i` in or out; returns the over-limit change."""
+        for col, val in self._rows[i]:
+            agg[col] += sign * val
+        before = counts.get(i, self.counts[i])
+        after = before + sign
+        counts[i] = after
+        lim = self._limits[i]
+        return (after > lim or after < 0) - (before > lim or before < 0)
+
+    def _delta(self, edits: Iterable[Edit]):
+        agg = list(self.agg)
+        counts: Dict[int, int] = {}
+        over = self.over_limit
+        for remove_id, add_id in edits:
+            if remove_id is not None:
+                over += self._step(agg, counts, self._pos[remove_id], -1)
+            if add_id is not None:
+                over += self._step(agg, counts, self._pos[add_id], +1)
+        return agg, counts, over
+
+    def peek(self, edits: Iterable[Edit]) -> float:
+        """Score after `edits`, leaving the deck unchanged."""
+        agg, _, over = self._delta(edits)
+        return self._score(agg, over)
+
+    def apply(self, edits: Iterable[Edit]) -> float:
+        """Apply `edits` to the deck and return its new score."""
+        agg, counts, over = self._delta(edits)
+        for i, c in counts.items():
+            self.counts[i] = c
+        self.agg, self.over_limit = agg, over
+        self.score = self._score(agg, over)
+        return self.score
+
+    def deck(self) -> Deck:
+        """The current deck (raises if an edit left a negative count)."""
+        if any(c < 0 for c in self.counts):
+            raise ValueError("Deck has a negative card count")
+        return Deck(self.ctx.index, np.array(self.counts, dtype=np.uint8))
+
+
+def deck_edits(parent: Deck, child: Deck) -> List[Edit]:
+    """(remove_id, add_id) edits turning `parent` into `child`."""
+    ids = parent.index.ids
+    diff = child.counts.astype(np.int64) - parent.counts.astype(np.int64)
+    removed = np.repeat(ids, np.maximum(-diff, 0)).tolist()
+    added = np.repeat(ids, np.maximum(diff, 0)).tolist()
+    n = max(len(removed), len(added))
+    removed += [None] * (n - len(removed))
+    added += [None] * (n - len(added))
+    return list(zip(removed, added))
@@ -0,0 +1,190 @@
+import argparse
+import multiprocessing as mp
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.card_index import card_index_for
+from src.database import load_card_db
+from src.deck import Deck, seed_rngs
+from src.deck_optimiser import (
+    build_initial_population,
+    de_evolve,
+    format_deck,
+    load_seed_decks,
+)
+from src.fitness import fitness_many, set_exact_hand_rates, set_rules
+from src.ga_optimizer import run_ga
+from src.parallel import derive_seed
+from src.rules import load_rules
+
+# == ISLAND PARAMETERS ==
+N_ISLANDS     = 4        # independent populations, one process each
+MIGRATE_EVERY = 10       # generations between migrations
+N_MIGRANTS    = 2        # top decks sent to the next island
+TOPOLOGY      = 'ring'   # 'ring' or 'random'
+
+CARD_DB_PATH = os.path.join("data", "blue_eyes_clean.json")
+SEEDS_PATH   = os.path.join("data", "seed_decks.json")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Run island-model DE/GA for Yu-Gi-Oh! decks")
+    p.add_argument('--engine', choices=('de', 'ga'), default='de',
+                   help='Optimizer run on every island (default=de)')
+    p.add_argument('-g', '--gens', type=int, default=100,
+                   help='Generations per island (default=100)')
+    p.add_argument('-k', '--islands', type=int, default=N_ISLANDS,
+                   help=f'Number of islands / processes (default={N_ISLANDS})')
+    p.add_argument('-m', '--migrate-every', type=int, default=MIGRATE_EVERY,
+                   help=f'Generations between migrations (default={MIGRATE_EVERY})')
+    p.add_argument('--migrants', type=int, default=N_MIGRANTS,
+                   help=f'Top decks each island sends per migration (default={N_MIGRANTS})')
+    p.add_argument('--topology', choices=('ring', 'random'), default=TOPOLOGY,
+                   help='Migration topology (default=ring)')
+    p.add_argument('--seed', type=int, default=None,
+                   help='Master RNG seed; every island derives its own stream from it')
+    p.add_argument('--monte-carlo', action='store_true',
+                   help='Estimate hand probabilities by Monte Carlo instead of exactly')
+    p.add_argument('--rules', default=None,
+                   help='JSON rule file to score decks with (default: built-in rules)')
+    return p.parse_args()
+
+
+def migration_target(rank: int, n_islands: int, epoch: int, topology: str, seed: int) -> int:
+    """
+    Island that receives `rank`'s migrants after `epoch`. The random topology
+    shifts every island by the same seeded offset, so each island still
+    receives exactly one batch per migration.
+    """
+    if topology == 'ring':
+        shift = 1
+    else:
+        shift = 1 + random.Random(derive_seed(seed, epoch)).randrange(n_islands - 1)
+    return (rank + shift) % n_islands
+
+
+def _island_main(rank: int, engine: str, gens: int, config: Dict, inboxes: List, results) -> None:
+    """Evolve one island, exchanging migrants every `migrate_every` generations."""
+    set_exact_hand_rates(config['exact'])
+    set_rules(config['rules'])
+    seed_rngs(derive_seed(config['seed'], rank))
+    card_db = load_card_db(config['card_db_path'])
+    index = card_index_for(card_db)
+    seeds = load_seed_decks(config['seeds_path'])
+
+    if engine == 'de':
+        pop = build_initial_population(card_db, seeds)
+    else:
+        pop = seeds
+
+    n_islands = len(inboxes)
+    done = 0
+    epoch = 0
+    while done < gens:
+        step = min(config['migrate_every'], gens - done)
+        if engine == 'de':
+            pop, _ = de_evolve(card_db, pop, step, None, verbosity='quiet')
+        else:
+            pop, _ = run_ga(card_db, pop, step, verbose=False)
+        done += step
+
+        scores = np.array(fitness_many(pop))
+        order = np.argsort(-scores, kind='stable')
+        results.put(('gen', rank, done, float(scores.max()), float(scores.mean())))
+
+        if done < gens and n_islands > 1:
+            migrants = [pop[i].counts for i in order[:config['migrants']]]
+            target = migration_target(rank, n_islands, epoch, config['topology'], config['seed'])
+            inboxes[target].put(migrants)
+            incoming = inboxes[rank].get()
+            # Replace the worst decks with the newcomers
+            pop = list(pop)
+            for slot, counts in zip(order[::-1], incoming):
+                pop[slot] = Deck(index, counts)
+        epoch += 1
+
+    best = int(order[0])
+    results.put(('done', rank, float(scores[best]), pop[best].counts))
+
+
+def run_islands(
+    engine: str,
+    gens: int,
+    n_islands: int = N_ISLANDS,
+    migrate_every: int = MIGRATE_EVERY,
+    migrants: int = N_MIGRANTS,
+    topology: str = TOPOLOGY,
+    seed: int = None,
+    exact: bool = True,
+    card_db_path: str = CARD_DB_PATH,
+    seeds_path: str = SEEDS_PATH,
+    rules: Optional[Dict] = None
+) -> Tuple[Dict[int, List[Tuple[int, float, float]]], Dict[int, Tuple[float, np.ndarray]]]:
+    """
+    Runs `n_islands` independent populations in separate processes.
+    Returns (per-island [(generation, best, avg)] history,
+             per-island (best fitness, best deck counts)).
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    config = {
+        'card_db_path': card_db_path,
+        'seeds_path': seeds_path,
+        'migrate_every': migrate_every,
+        'migrants': migrants,
+        'topology': topology,
+        'seed': seed,
+        'exact': exact,
+        'rules': rules,
+    }
+    inboxes = [mp.Queue() for _ in range(n_islands)]
+    results = mp.Queue()
+    procs = [
+        mp.Process(target=_island_main, args=(rank, engine, gens, config, inboxes, results))
+        for rank in range(n_islands)
+    ]
+    for proc in procs:
+        proc.start()
+
+    history: Dict[int, List[Tuple[int, float, float]]] = {r: [] for r in range(n_islands)}
+    bests: Dict[int, Tuple[float, np.ndarray]] = {}
+    while len(bests) < n_islands:
+        msg = results.get()
+        if msg[0] == 'gen':
+            _, rank, gen, best, avg = msg
+            history[rank].append((gen, best, avg))
+            print(f"Island {rank} | Gen {gen:5d}: Best={best:.2f}, Avg={avg:.2f}")
+        else:
+            _, rank, best, counts = msg
+            bests[rank] = (best, counts)
+    for proc in procs:
+        proc.join()
+    return history, bests
+
+
+def main():
+    args = parse_args()
+    card_db = load_card_db(CARD_DB_PATH)
+    history, bests = run_islands(
+        args.engine, args.gens, args.islands, args.migrate_every,
+        args.migrants, args.topology, args.seed, exact=not args.monte_carlo,
+        rules=load_rules(args.rules) if args.rules else None
+    )
+
+    print("\n=== Per-Island Results ===")
+    for rank in sorted(bests):
+        gen, best, avg = history[rank][-1]
+        print(f"Island {rank}: Best={best:.2f}, Avg={avg:.2f}")
+
+    rank = max(bests, key=lambda r: bests[r][0])
+    best, counts = bests[rank]
+    print(f"\n=== Best Deck (island {rank}) ===")
+    print(f"Fitness = {best:.2f}")
+    print(format_deck(Deck(card_index_for(card_db), counts), card_db))
+
+
+if __name__ == '__main__':
+    main()
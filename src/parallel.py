@@ -0,0 +1,116 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import src.fitness as fitness_module
+from src.database import load_card_index
+from src.deck import Deck, seed_rngs
+from src.fitness import (
+    EvalContext,
+    HandBank,
+    evaluate_fitness,
+    fitness_batch,
+    fitness_many,
+)
+
+# Per-worker evaluation context, set once by _init_worker
+_worker_ctx = None
+
+
+def _init_worker(card_db_path: str, exact: bool, rules: Optional[Dict[str, Any]] = None) -> None:
+    """Map the compiled card index once per worker process."""
+    global _worker_ctx
+    _worker_ctx = EvalContext(load_card_index(card_db_path), exact=exact, rules=rules)
+
+
+def _score_chunk(counts: np.ndarray, seed: int,
+                 bank_state: Optional[Tuple[int, int, int, int]] = None) -> List[float]:
+    """
+    Score one chunk of count vectors with an RNG stream derived from `seed`,
+    on the parent's shared hands when `bank_state` (HandBank.state()) is given.
+    """
+    seed_rngs(seed)
+    if bank_state is None:
+        _worker_ctx.hand_bank = None
+    elif _worker_ctx.hand_bank is None:
+        n_trials, refresh_every, bank_seed, epoch = bank_state
+        _worker_ctx.hand_bank = HandBank(n_trials, refresh_every, bank_seed, epoch)
+    else:
+        _worker_ctx.hand_bank.set_state(bank_state)
+    if _worker_ctx.exact:
+        return fitness_batch(counts, _worker_ctx).tolist()
+    index = _worker_ctx.index
+    return [evaluate_fitness(index.from_counts(row), _worker_ctx) for row in counts]
+
+
+def derive_seed(master_seed: int, *stream: int) -> int:
+    """Deterministic 64-bit seed for a sub-stream of `master_seed`."""
+    key = ":".join(str(x) for x in (master_seed,) + stream)
+    return random.Random(key).getrandbits(64)
+
+
+class ParallelEvaluator:
+    """
+    Scores batches of decks in a ProcessPoolExecutor.
+    Each batch is split into one chunk per worker. Chunk c of batch b draws
+    from an RNG stream seeded by (master_seed, b, c), so results do not
+    depend on which process runs which chunk. Scores go through the
+    shared fitness cache, so only uncached decks are shipped to workers.
+    """
+
+    def __init__(self, workers: int, card_db_path: str, seed: int,
+                 chunk_size: Optional[int] = None):
+        self.workers = workers
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.batches = 0  # batch counter, part of each chunk's stream id
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(card_db_path, fitness_module.EXACT_HAND_RATES, fitness_module.RULES),
+        )
+
+    def __enter__(self) -> 'ParallelEvaluator':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._pool.shutdown()
+
+    def evaluate(self, decks: Sequence[Deck]) -> List[float]:
+        """Fitness of each deck, like fitness_many()."""
+        return fitness_many(decks, score_missing=self._score_remote)
+
+    def _score_remote(self, decks: List[Deck]) -> List[float]:
+        counts = np.array([d.counts for d in decks])
+        size = self.chunk_size or math.ceil(len(decks) / self.workers)
+        batch = self.batches
+        self.batches += 1
+        bank = fitness_module.HAND_BANK
+        bank_state = bank.state() if bank is not None else None
+        futures = [
+            self._pool.submit(_score_chunk, counts[start:start + size],
+                              derive_seed(self.seed, batch, chunk), bank_state)
+            for chunk, start in enumerate(range(0, len(decks), size))
+        ]
+        scores: List[float] = []
+        for future in futures:
+            scores.extend(future.result())
+        return scores
+
+
+def make_evaluator(workers: int, card_db_path: str, seed: Optional[int]):
+    """
+    ParallelEvaluator for workers > 1, otherwise None (in-process fitness).
+    Without a seed, a master seed is drawn from `random`.
+    """
+    if workers <= 1:
+        return None
+    if seed is None:
+        seed = random.getrandbits(32)
+    return ParallelEvaluator(workers, card_db_path, seed)
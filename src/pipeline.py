@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Set
+
+from src.card_index import CardIndex
+from src.database import (
+    API_ALL_URL,
+    CLEAN_FIELDS,
+    DEFAULT_DB_PATH,
+    EXCLUDE_ARCHETYPES,
+    EXPLICIT_INCLUDES,
+    card_entry,
+    has_excluded_subtype,
+    is_banned,
+    is_blue_eyes_spell_trap,
+    is_desired_monster,
+    is_main_deck,
+    write_card_index,
+)
+from src.fetcher import CACHE_DIR, CardFetcher
+
+CHUNK_SIZE = 1 << 16   # characters read per step while parsing
+
+_WS = ' \t\r\n'
+
+Card = Dict[str, Any]
+
+
+# == Incremental JSON reading ==
+class _Reader:
+    """Character buffer over a text file that drops what has been consumed."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read one more chunk; False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file), not consumed."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"Expected {ch!r} in card JSON, got {got!r}")
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number may be cut off at the buffer boundary; make sure it ended
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_cards(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Card]:
+    """
+    Yield the cards of a JSON file one at a time without loading it whole.
+    Accepts a top-level array or an API response object ({"data": [...]}).
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        r = _Reader(f, chunk_size)
+        if r.peek() == '{':
+            # Walk the object's keys until the "data" array
+            r.expect('{')
+            while True:
+                if r.peek() == '}':
+                    return
+                key = r.value(decoder)
+                r.expect(':')
+                if key == 'data':
+                    break
+                r.value(decoder)
+                if r.peek() == ',':
+                    r.expect(',')
+        r.expect('[')
+        if r.peek() == ']':
+            return
+        while True:
+            yield r.value(decoder)
+            if r.peek() == ',':
+                r.expect(',')
+            else:
+                r.expect(']')
+                return
+
+
+# == Pipeline stages ==
+def select_pool(cards: Iterable[Card], includes: Sequence[str] = EXPLICIT_INCLUDES) -> Iterator[Card]:
+    """
+    The database.py pool rules in one pass over the full dump: main-deck
+    monsters of the desired races, Blue-Eyes spells/traps, minus excluded
+    subtypes, plus the first card named in `includes` (looked up by name).
+    """
+    wanted: Set[str] = set(includes)
+    for c in cards:
+        keep = ((is_main_deck(c) and is_desired_monster(c)) or is_blue_eyes_spell_trap(c)) \
+            and not has_excluded_subtype(c)
+        name = c.get('name')
+        if name in wanted:
+            wanted.discard(name)
+            keep = True
+        if keep:
+            yield c
+
+
+def drop_banned(cards: Iterable[Card]) -> Iterator[Card]:
+    return (c for c in cards if not is_banned(c))
+
+
+def drop_archetypes(cards: Iterable[Card], archetypes=EXCLUDE_ARCHETYPES) -> Iterator[Card]:
+    return (c for c in cards if c.get('archetype') not in archetypes)
+
+
+def project(cards: Iterable[Card], fields: Sequence[str] = CLEAN_FIELDS) -> Iterator[Card]:
+    return ({k: c.get(k) for k in fields} for c in cards)
+
+
+def clean_pool(cards: Iterable[Card]) -> Iterator[Card]:
+    """Full build: pool selection, banlist, archetype exclusion and projection."""
+    return project(drop_archetypes(drop_banned(select_pool(cards))))
+
+
+# == Output ==
+def write_pool(cards: Iterable[Card], path: str, compile_index: bool = True) -> int:
+    """
+    Stream `cards` into a JSON array at `path` (same layout as json.dump
+    with indent=2), then write its compiled index. Returns the card count.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    card_db: Dict[int, Dict[str, Any]] = {}
+    n = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for card in cards:
+            f.write(',\n  ' if n else '\n  ')
+            f.write(json.dumps(card, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+            card_db[int(card['id'])] = card_entry(card)
+            n += 1
+        f.write('\n]' if n else ']')
+    os.replace(tmp_path, path)
+    if compile_index:
+        write_card_index(path, CardIndex.from_card_db(card_db))
+    return n
+
+
+def build_pool(dump_path: str, out_path: str = DEFAULT_DB_PATH) -> int:
+    """Stream the API dump at `dump_path` into the clean pool at `out_path`."""
+    return write_pool(clean_pool(iter_json_cards(dump_path)), out_path)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Build the clean card pool in one streaming pass")
+    p.add_argument('--input', default=None,
+                   help='Local card dump (JSON array or API response); default: fetch the API')
+    p.add_argument('--out', default=os.path.normpath(DEFAULT_DB_PATH),
+                   help='Clean pool JSON to write (its .idx.npz is written beside it)')
+    p.add_argument('--source', default=None,
+                   help='Local directory or base URL standing in for the API')
+    p.add_argument('--cache-dir', default=CACHE_DIR,
+                   help=f'Response cache directory (default={CACHE_DIR})')
+    p.add_argument('--offline', action='store_true',
+                   help='Use cached responses only, never the network')
+    p.add_argument('--refresh', action='store_true',
+                   help='Ignore ETag / Last-Modified and download again')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    dump_path: Optional[str] = args.input
+    if dump_path is None:
+        with CardFetcher(args.cache_dir, args.source, args.offline, args.refresh) as fetcher:
+            dump_path = fetcher.fetch_path(API_ALL_URL)
+            print(fetcher.summary())
+    n = build_pool(dump_path, args.out)
+    print(f"Clean pool: {n} cards written to '{args.out}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from math import sqrt
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.deck import Deck, get_rng
+from src.fitness import EvalContext, resolve_context
+from src.hand_sim import draw_positions
+
+# == RACING PARAMETERS ==
+RACE_BATCH = 50     # hands drawn per deck per round
+RACE_CAP   = 2000   # most hands per deck in one race
+RACE_Z     = 2.0    # width of the confidence bounds, in standard errors
+RACE_MEMORY = 4096  # deck profiles whose drawn hands are kept between races
+
+
+class _Entrant:
+    """One deck in a race: its fixed score part and running hand counts."""
+
+    def __init__(self, deck: Mapping[int, int], ctx: EvalContext, terms: List[Tuple]):
+        rules = ctx.rules
+        agg = rules.deck_aggregates(deck)
+        self.valid = agg is not None
+        if not self.valid:
+            return
+        pos = rules.index.pos
+        self.slots = np.array(sorted(pos[cid] for cid, cnt in deck.items() for _ in range(cnt)))
+        self.base = rules.score_row(agg, skip_sampled=True)
+        # Terms whose groups are all present; the rest have probability exactly 0
+        self.live = [all(agg[c] > 0 for c in t[1]) and len(self.slots) >= rules.hand_size
+                     for t in terms]
+        self.hits = [0] * len(terms)
+        self.n = 0
+        # Hand rates depend only on how many copies share each pattern of
+        # group membership, so decks with equal profiles score identically
+        cols = sorted({c for t in terms for c in t[1]})
+        member = rules.columns[self.slots][:, cols] > 0 if cols else np.zeros((0, 0), bool)
+        patterns, copies = np.unique(member, axis=0, return_counts=True)
+        self.profile = (self.base, len(self.slots), patterns.tobytes(), copies.tobytes())
+
+
+class Racer:
+    """
+    Sequential comparison of decks whose scores depend on Monte Carlo hand
+    rates. Instead of a fixed number of hands per deck, hands are drawn in
+    rounds of `batch` (the same slot positions for every entrant of a
+    round). After each round every sampled rule gets a confidence interval
+    of +-z standard errors; a rule whose interval lies on one side of its
+    threshold is settled, the rest bound each deck's score to an interval.
+    Decks whose best case is below another's worst case drop out, and the
+    race stops once one deck is left or every remaining deck is settled or
+    has `cap` hands. Hands drawn for a deck profile are kept for its later
+    races (up to `memory` profiles), so a deck is never sampled twice to
+    the same precision.
+    """
+
+    def __init__(self, ctx: Optional[EvalContext] = None, batch: int = RACE_BATCH,
+                 cap: int = RACE_CAP, z: float = RACE_Z, memory: int = RACE_MEMORY):
+        self.ctx = ctx
+        self.batch = batch
+        self.cap = cap
+        self.z = z
+        self.memory = memory
+        self.races = 0
+        self.hands = 0
+        self._memo: "OrderedDict[Tuple, _Entrant]" = OrderedDict()
+        self._rules = None
+
+    def _rate_bounds(self, e: _Entrant, i: int) -> Tuple[float, float, float]:
+        """(estimate, lower, upper) of sampled term i of entrant e."""
+        if not e.live[i]:
+            return 0.0, 0.0, 0.0
+        if e.n == 0:
+            return 0.0, 0.0, 1.0
+        p = e.hits[i] / e.n
+        eps = self.z * sqrt((p * (1 - p) + 1 / e.n) / e.n)
+        # A single hit proves the probability is positive
+        lo = max(p - eps, 1e-12 if e.hits[i] else 0.0)
+        return p, lo, min(p + eps, 1.0)
+
+    def _bounds(self, e: _Entrant, terms: List[Tuple], rules) -> Tuple[float, float, float]:
+        """(estimate, worst case, best case) of an entrant's score."""
+        if not e.valid:
+            inf = float('-inf')
+            return inf, inf, inf
+        est = low = high = e.base
+        for i, term in enumerate(terms):
+            p, p_lo, p_hi = self._rate_bounds(e, i)
+            est += rules.term_points(term, p)
+            # Points are monotone in p, so the extremes are at the interval ends
+            a, b = rules.term_points(term, p_lo), rules.term_points(term, p_hi)
+            low += min(a, b)
+            high += max(a, b)
+        return est, low, high
+
+    def _entrant(self, deck: Mapping[int, int], ctx: EvalContext, terms: List[Tuple]) -> _Entrant:
+        """The deck's entrant, carrying the hands already drawn for its profile."""
+        e = _Entrant(deck, ctx, terms)
+        if not e.valid:
+            return e
+        known = self._memo.get(e.profile)
+        if known is not None:
+            self._memo.move_to_end(e.profile)
+            return known
+        self._memo[e.profile] = e
+        if len(self._memo) > self.memory:
+            self._memo.popitem(last=False)
+        return e
+
+    def scores(self, decks: Sequence[Mapping[int, int]]) -> List[float]:
+        """
+        Estimated scores of `decks` when the race stopped. The order of the
+        estimates agrees with the race's decision: every deck that dropped
+        out scores below the remaining ones.
+        """
+        ctx = resolve_context(decks[0] if decks else None, self.ctx)
+        rules = ctx.rules
+        if rules is not self._rules:
+            self._memo.clear()
+            self._rules = rules
+        terms = rules.sampled_terms()
+        entrants = [self._entrant(d, ctx, terms) for d in decks]
+        self.races += 1
+        rng = get_rng()
+        # Decks with the same profile cannot be told apart; race one of each
+        first: Dict[int, int] = {}
+        same = list(range(len(decks)))
+        for i, e in enumerate(entrants):
+            if e.valid:
+                same[i] = first.setdefault(id(e), i)
+        racing = sorted(first.values())
+        final: Dict[int, float] = {}
+        while True:
+            bounds = {i: self._bounds(entrants[i], terms, rules) for i in racing}
+            best_low = max((b[1] for b in bounds.values()), default=float('-inf'))
+            for i in list(racing):
+                if bounds[i][2] < best_low:
+                    racing.remove(i)
+                    final[i] = bounds[i][0]
+            # Only decks with unsettled rules need more hands
+            todo = [i for i in racing
+                    if bounds[i][1] != bounds[i][2] and entrants[i].n < self.cap]
+            if len(racing) <= 1 or not todo:
+                break
+            self._draw_round([entrants[i] for i in todo], terms, rules, rng)
+        for i in racing:
+            final[i] = bounds[i][0]
+        return [final.get(same[i], float('-inf')) for i in range(len(decks))]
+
+    def _draw_round(self, entrants: List[_Entrant], terms: List[Tuple], rules,
+                    rng: np.random.Generator) -> None:
+        """Draw `batch` more hands for each entrant, shared per deck size."""
+        positions: Dict[int, np.ndarray] = {}
+        for e in entrants:
+            size = len(e.slots)
+            pos = positions.get(size)
+            if pos is None:
+                pos = draw_positions(np.array([size]), rules.hand_size, self.batch, rng)[0]
+                positions[size] = pos
+            hands = e.slots[pos]
+            for t, term in enumerate(terms):
+                if e.live[t]:
+                    ok = np.ones(self.batch, dtype=bool)
+                    for c in term[1]:
+                        ok &= (rules.columns[hands, c] > 0).any(axis=1)
+                    e.hits[t] += int(np.count_nonzero(ok))
+            e.n += self.batch
+            self.hands += self.batch
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Counters and the remembered hands, for checkpoints: each profile as
+        the count vector of the deck that opened it (its slots, in memo
+        order) with its per-rule hit counts and hands drawn.
+        """
+        entries = list(self._memo.values())
+        n_cards = len(resolve_context(None, self.ctx).index)
+        n_terms = len(entries[0].hits) if entries else 0
+        return {
+            'races': self.races,
+            'hands': self.hands,
+            'counts': np.array([np.bincount(e.slots, minlength=n_cards) for e in entries],
+                               dtype=np.uint8).reshape(len(entries), n_cards),
+            'hits': np.array([e.hits for e in entries], dtype=np.int64).reshape(len(entries), n_terms),
+            'n': np.array([e.n for e in entries], dtype=np.int64),
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """Adopt another racer's state() (e.g. from a checkpoint)."""
+        ctx = resolve_context(None, self.ctx)
+        rules = ctx.rules
+        terms = rules.sampled_terms()
+        self._memo.clear()
+        self._rules = rules
+        for counts, hits, n in zip(state['counts'], state['hits'], state['n']):
+            e = _Entrant(Deck(ctx.index, counts), ctx, terms)
+            e.hits = [int(h) for h in hits]
+            e.n = int(n)
+            self._memo[e.profile] = e
+        self.races = int(state['races'])
+        self.hands = int(state['hands'])
+
+    def summary(self) -> str:
+        per = self.hands / self.races if self.races else 0.0
+        return f"Racing: {self.races} races, {self.hands} hands ({per:.0f} per race)"
+
+
+def make_racer(ctx: EvalContext, enabled: bool, batch: int = RACE_BATCH,
+               cap: int = RACE_CAP) -> Optional[Racer]:
+    """Racer for Monte Carlo contexts when racing is enabled, otherwise None."""
+    if not enabled or ctx.exact:
+        return None
+    return Racer(ctx, batch, cap)
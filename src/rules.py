@@ -0,0 +1,428 @@
+import json
+from itertools import combinations
+from math import comb
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.card_index import CardIndex
+from src.deck import Deck
+from src.hand_sim import sample_hands
+
+# Monte Carlo trials per sampled probability rule
+N_SAMPLED_HANDS = 200
+
+# Bounds standing in for a missing min / max on count rules
+_NO_MIN = -(1 << 62)
+_NO_MAX = 1 << 62
+
+
+# == Rule files ==
+#
+# A rule file is a JSON object:
+#   {"name": str, "hand_size": 5, "max_deck_size": 40, "rules": [rule, ...]}
+# Rules are scored in order. Each has a "kind", "points" and optional "note":
+#   count        {"cards": sel, "min": n, "max": n}   points if min <= count <= max
+#   probability  {"all_of": [sel, ...]}               P(every group in the opening hand)
+#                {"one_each": [sel, ...]}             prod(k_i) C(D-g, H-g) / C(D, H)
+#                optional "deck_size" (default: the deck's own size), thresholds
+#                "min" (P >= min) / "above" (P > above), "scale" (points * P)
+#                and "sampled" (estimated by drawing hands in Monte Carlo mode)
+#   synergy      {"cards": [id, ...]}                 points if every card is present
+#   per_card     {"presence": [[id, pts], ...],       pts if the card is present
+#                 "per_copy": [[id, pts], ...]}       pts for each copy
+# A card selector `sel` is {"ids": [...]}, {"types": [...]} (exact type
+# strings) or {"all": true}.
+
+def _check_selector(sel: Any, where: str) -> None:
+    if not isinstance(sel, dict) or len(set(sel) & {'ids', 'types', 'all'}) != 1:
+        raise ValueError(f"{where}: card selector needs exactly one of 'ids', 'types', 'all'")
+
+
+def validate_rules(spec: Dict[str, Any]) -> None:
+    """Raise ValueError on a malformed rule spec."""
+    if not isinstance(spec.get('rules'), list):
+        raise ValueError("Rule file needs a 'rules' list")
+    for n, rule in enumerate(spec['rules']):
+        where = f"rule {n} ({rule.get('name', rule.get('kind'))})"
+        kind = rule.get('kind')
+        if kind == 'count':
+            _check_selector(rule.get('cards'), where)
+            if 'min' not in rule and 'max' not in rule:
+                raise ValueError(f"{where}: count rule needs 'min' and/or 'max'")
+        elif kind == 'probability':
+            events = [e for e in ('all_of', 'one_each') if e in rule]
+            if len(events) != 1 or not rule[events[0]]:
+                raise ValueError(f"{where}: probability rule needs one non-empty "
+                                 f"'all_of' or 'one_each' list")
+            for sel in rule[events[0]]:
+                _check_selector(sel, where)
+            if rule.get('sampled') and (events[0] != 'all_of' or 'deck_size' in rule):
+                raise ValueError(f"{where}: only 'all_of' rules on the deck's own size "
+                                 f"can be sampled")
+        elif kind == 'synergy':
+            if not rule.get('cards'):
+                raise ValueError(f"{where}: synergy rule needs a 'cards' list")
+        elif kind == 'per_card':
+            if not rule.get('presence') and not rule.get('per_copy'):
+                raise ValueError(f"{where}: per_card rule needs 'presence' and/or 'per_copy'")
+            continue
+        else:
+            raise ValueError(f"{where}: unknown rule kind {kind!r}")
+        if 'points' not in rule:
+            raise ValueError(f"{where}: missing 'points'")
+
+
+def load_rules(path: str) -> Dict[str, Any]:
+    """Read and validate a JSON rule file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    validate_rules(spec)
+    return spec
+
+
+def _selector_key(sel: Dict[str, Any]) -> Tuple:
+    if 'all' in sel:
+        return ('all',)
+    if 'ids' in sel:
+        return ('ids',) + tuple(sorted(int(c) for c in sel['ids']))
+    return ('types',) + tuple(sorted(sel['types']))
+
+
+def _selector_mask(sel: Dict[str, Any], index: CardIndex) -> np.ndarray:
+    if 'all' in sel:
+        return np.ones(len(index), dtype=bool)
+    if 'ids' in sel:
+        return index.mask(int(c) for c in sel['ids'])
+    return index.type_mask(*sel['types'])
+
+
+# == Compiled rules ==
+class CompiledRules:
+    """
+    A rule spec compiled against one card index: every card selector
+    becomes a dense column of `columns`, so a population's rule aggregates
+    are a single `counts @ columns` product. score() then evaluates all
+    rules over those aggregates in one vectorized pass, and score_row() is
+    its plain-Python twin for single decks (equal results).
+    """
+
+    def __init__(self, spec: Dict[str, Any], index: CardIndex):
+        validate_rules(spec)
+        self.spec = spec
+        self.index = index
+        self.name = spec.get('name', 'rules')
+        self.hand_size = int(spec.get('hand_size', 5))
+        self.max_deck_size = int(spec.get('max_deck_size', 40))
+        self.limits = index.limits.astype(np.int64)
+
+        keys: Dict[Tuple, int] = {}
+        masks: List[np.ndarray] = []
+
+        def column(sel: Dict[str, Any]) -> int:
+            key = _selector_key(sel)
+            if key not in keys:
+                keys[key] = len(masks)
+                masks.append(_selector_mask(sel, index))
+            return keys[key]
+
+        self.total_col = column({'all': True})
+        sizes = [self.max_deck_size]
+        self.terms: List[Tuple] = []
+        for rule in spec['rules']:
+            kind, pts = rule['kind'], rule.get('points')
+            if kind == 'count':
+                self.terms.append(('count', column(rule['cards']),
+                                   rule.get('min', _NO_MIN), rule.get('max', _NO_MAX), pts))
+            elif kind == 'probability':
+                event = 'all_of' if 'all_of' in rule else 'one_each'
+                cols = [column(sel) for sel in rule[event]]
+                size = rule.get('deck_size')
+                if size is not None:
+                    sizes.append(int(size))
+                self.terms.append((event, cols, size, rule.get('min'), rule.get('above'),
+                                   bool(rule.get('scale')), bool(rule.get('sampled')), pts))
+            elif kind == 'synergy':
+                cols = [column({'ids': [cid]}) for cid in sorted(rule['cards'])]
+                self.terms.append(('synergy', cols, pts))
+            else:
+                for cid, p in rule.get('presence', []):
+                    self.terms.append(('presence', column({'ids': [cid]}), p))
+                for cid, p in rule.get('per_copy', []):
+                    self.terms.append(('per_copy', column({'ids': [cid]}), p))
+
+        self.columns = np.stack(masks, axis=1).astype(np.float64)
+        self.groups = [np.flatnonzero(m) for m in masks]
+
+        # Hypergeometric tables: C(n, H) for every deck size that can occur
+        h = self.hand_size
+        top = max(sizes)
+        self._hands = [comb(n, h) for n in range(top + 1)]
+        self._hands_f = np.array(self._hands, dtype=np.float64)
+        self._hands_den = np.array([c or 1 for c in self._hands], dtype=np.float64)
+        self._rest = {g: np.array([comb(max(n - g, 0), max(h - g, 0)) if n >= g else 0
+                                   for n in range(top + 1)], dtype=np.int64)
+                      for g in {len(t[1]) for t in self.terms if t[0] == 'one_each'}}
+        self._sparse: Optional[List[List[Tuple[int, int]]]] = None
+        self._icolumns: Optional[np.ndarray] = None
+        self._row_terms: Optional[List[Tuple]] = None
+
+    # -- batch kernel --
+    def aggregates(self, counts: np.ndarray) -> np.ndarray:
+        return np.asarray(counts, dtype=np.float64) @ self.columns
+
+    def valid(self, counts: np.ndarray) -> np.ndarray:
+        """Banlist limits and maximum deck size, per row."""
+        counts = np.asarray(counts)
+        within_limits = np.all((counts >= 0) & (counts <= self.limits), axis=-1)
+        return within_limits & (counts.sum(axis=-1) <= self.max_deck_size)
+
+    def _miss(self, t: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """P(none of `k` copies in a hand drawn from `t` cards)."""
+        p = self._hands_f[np.maximum(t - k, 0)] / self._hands_den[t]
+        small = t < self.hand_size
+        if small.any():
+            p = np.where(small, (k == 0).astype(np.float64), p)
+        return p
+
+    def _probability(self, term: Tuple, iagg: np.ndarray, total: np.ndarray) -> np.ndarray:
+        event, cols, size = term[0], term[1], term[2]
+        ks = [iagg[..., c] for c in cols]
+        t = np.minimum(total, self.max_deck_size) if size is None else np.full_like(total, size)
+        if event == 'one_each':
+            num = ks[0]
+            for k in ks[1:]:
+                num = num * k
+            return num * self._rest[len(cols)][t] / self._hands_den[t]
+        p = 1.0
+        for r in range(1, len(ks) + 1):
+            for subset in combinations(ks, r):
+                miss = self._miss(t, sum(subset))
+                p = p - miss if r % 2 else p + miss
+        present = np.all(np.stack(ks) > 0, axis=0)
+        return np.where(present, p, 0.0)
+
+    def score(self, agg: np.ndarray) -> np.ndarray:
+        """Scores of rows of aggregates (exact hand probabilities)."""
+        iagg = np.asarray(agg).astype(np.int64)
+        total = iagg[..., self.total_col]
+        score = np.zeros(total.shape, dtype=np.float64)
+        for term in self.terms:
+            kind = term[0]
+            if kind == 'count':
+                _, col, lo, hi, pts = term
+                c = iagg[..., col]
+                score += pts * ((c >= lo) & (c <= hi))
+            elif kind == 'synergy':
+                score += term[2] * np.all(iagg[..., term[1]] > 0, axis=-1)
+            elif kind == 'presence':
+                score += term[2] * (iagg[..., term[1]] > 0)
+            elif kind == 'per_copy':
+                score += iagg[..., term[1]] * term[2]
+            else:
+                _, _, _, lo, above, scale, _, pts = term
+                p = self._probability(term, iagg, total)
+                ok = True
+                if lo is not None:
+                    ok = ok & (p >= lo)
+                if above is not None:
+                    ok = ok & (p > above)
+                score += pts * p * ok if scale else pts * ok
+        return score
+
+    def score_counts(self, counts: np.ndarray) -> np.ndarray:
+        """Scores of rows of a count matrix; invalid decks get -inf."""
+        counts = np.atleast_2d(counts)
+        scores = self.score(self.aggregates(counts))
+        return np.where(self.valid(counts), scores, float('-inf'))
+
+    # -- single decks --
+    def sparse_rows(self) -> List[List[Tuple[int, int]]]:
+        """Per card position, its non-zero (column, value) entries."""
+        if self._sparse is None:
+            cols = self.columns.astype(np.int64)
+            self._sparse = [[(int(j), int(cols[i, j])) for j in np.flatnonzero(cols[i])]
+                            for i in range(cols.shape[0])]
+        return self._sparse
+
+    def _miss_row(self, t: int, k: int) -> float:
+        if t < self.hand_size:
+            return float(k == 0)
+        return self._hands[max(t - k, 0)] / self._hands[t]
+
+    def row_terms(self) -> List[Tuple]:
+        """
+        The terms for score_row with the hypergeometric parts tabulated by
+        (deck size, copies): single-group all_of thresholds become a lookup,
+        the rest read miss probabilities from a table. Same values as score().
+        """
+        if self._row_terms is None:
+            top = len(self._hands) - 1
+            # Overlapping groups can count a card twice, hence the 2x width
+            miss = [[self._miss_row(t, k) for k in range(2 * top + 1)] for t in range(top + 1)]
+            self._miss_tab = miss
+            self._rest_row = {g: rest.tolist() for g, rest in self._rest.items()}
+            self._den_row = self._hands_den.tolist()
+            terms: List[Tuple] = []
+            for term in self.terms:
+                if term[0] == 'all_of' and len(term[1]) == 1 and not term[5]:
+                    _, cols, size, lo, above, _, _, pts = term
+                    ps = [[1 - m[k] if k > 0 else 0.0 for k in range(top + 1)] for m in miss]
+                    ok = [[(lo is None or p >= lo) and (above is None or p > above) for p in row]
+                          for row in ps]
+                    terms.append(('all_of_tab', cols[0], size, ok, pts, term))
+                else:
+                    terms.append(term)
+            self._row_terms = terms
+        return self._row_terms
+
+    def _probability_row(self, term: Tuple, agg: Sequence[int], total: int) -> float:
+        event, cols, size = term[0], term[1], term[2]
+        ks = [agg[c] for c in cols]
+        t = min(total, self.max_deck_size) if size is None else size
+        if event == 'one_each':
+            num = 1
+            for k in ks:
+                num *= k
+            return num * self._rest_row[len(cols)][t] / self._den_row[t]
+        if min(ks) <= 0:
+            return 0.0
+        miss = self._miss_tab[t]
+        if len(ks) == 2:
+            a, b = ks
+            return 1.0 - miss[a] - miss[b] + miss[a + b]
+        p = 1.0
+        for r in range(1, len(ks) + 1):
+            for subset in combinations(ks, r):
+                p = p - miss[sum(subset)] if r % 2 else p + miss[sum(subset)]
+        return p
+
+    def _sampled_row(self, term: Tuple, slots: List[int],
+                     positions: Optional[np.ndarray] = None) -> float:
+        """
+        Monte Carlo estimate of an all_of rule by drawing hands from the
+        deck, or by testing the shared hand `positions` of its slots.
+        """
+        if positions is None:
+            hands = sample_hands(np.asarray(slots), self.hand_size, N_SAMPLED_HANDS)
+        else:
+            hands = np.asarray(slots)[positions]
+        ok = np.ones(len(hands), dtype=bool)
+        for c in term[1]:
+            ok &= (self.columns[hands, c] > 0).any(axis=1)
+        return np.count_nonzero(ok) / len(hands)
+
+    def sampled_terms(self) -> List[Tuple]:
+        """The probability terms estimated by drawing hands in Monte Carlo mode."""
+        return [t for t in self.terms if t[0] in ('all_of', 'one_each') and t[6]]
+
+    @staticmethod
+    def term_points(term: Tuple, p: float) -> float:
+        """Points a probability term awards at probability `p`."""
+        _, _, _, lo, above, scale, _, pts = term
+        ok = (lo is None or p >= lo) and (above is None or p > above)
+        if scale:
+            return pts * p * ok
+        return pts if ok else 0.0
+
+    def score_row(self, agg: Sequence[int], slots: Optional[List[int]] = None,
+                  positions: Optional[np.ndarray] = None, skip_sampled: bool = False) -> float:
+        """
+        Score of one valid deck from its integer aggregates, in plain Python.
+        With `slots` (the deck's card positions, one per copy), sampled
+        probability rules are estimated by drawing hands instead, or on the
+        shared hand `positions` when given. `skip_sampled` leaves them out.
+        """
+        total = agg[self.total_col]
+        score = 0.0
+        for term in self.row_terms():
+            kind = term[0]
+            if kind == 'all_of_tab':
+                _, col, size, ok, pts, term = term
+                if skip_sampled and term[6]:
+                    continue
+                if slots is None or not term[6]:
+                    t = min(total, self.max_deck_size) if size is None else size
+                    if ok[t][agg[col]]:
+                        score += pts
+                    continue
+                kind = term[0]
+            if kind == 'count':
+                _, col, lo, hi, pts = term
+                if lo <= agg[col] <= hi:
+                    score += pts
+            elif kind == 'synergy':
+                for c in term[1]:
+                    if agg[c] <= 0:
+                        break
+                else:
+                    score += term[2]
+            elif kind == 'presence':
+                if agg[term[1]] > 0:
+                    score += term[2]
+            elif kind == 'per_copy':
+                score += agg[term[1]] * term[2]
+            else:
+                _, _, _, lo, above, scale, sampled, pts = term
+                if sampled and skip_sampled:
+                    continue
+                if sampled and slots is not None:
+                    p = (self._sampled_row(term, slots, positions)
+                         if len(slots) >= self.hand_size else 0.0)
+                else:
+                    p = self._probability_row(term, agg, total)
+                ok = (lo is None or p >= lo) and (above is None or p > above)
+                if scale:
+                    score += pts * p * ok
+                elif ok:
+                    score += pts
+        return score
+
+    def count_aggregates(self, counts: np.ndarray) -> Optional[List[int]]:
+        """Integer aggregates of one count vector over this index, or None if it is invalid."""
+        nz = np.flatnonzero(counts)
+        held = counts[nz].astype(np.int64)
+        if (held > self.limits[nz]).any():
+            return None
+        if self._icolumns is None:
+            self._icolumns = self.columns.astype(np.int64)
+        agg = (held @ self._icolumns[nz]).tolist()
+        if agg[self.total_col] > self.max_deck_size:
+            return None
+        return agg
+
+    def deck_aggregates(self, deck: Mapping[int, int]) -> Optional[List[int]]:
+        """Integer aggregates of a {card_id: count} deck, or None if it is invalid."""
+        if isinstance(deck, Deck) and deck.index is self.index:
+            return self.count_aggregates(deck.counts)
+        pos = self.index.pos
+        rows = self.sparse_rows()
+        agg = [0] * self.columns.shape[1]
+        for cid, cnt in deck.items():
+            i = pos.get(cid)
+            if i is None or not 1 <= cnt <= self.limits[i]:
+                return None
+            for col, val in rows[i]:
+                agg[col] += val * cnt
+        if agg[self.total_col] > self.max_deck_size:
+            return None
+        return agg
+
+    def score_deck(self, deck: Mapping[int, int], exact: bool = True, bank=None) -> float:
+        """
+        Fitness of one deck; invalid decks get -inf. In Monte Carlo mode a
+        fitness.HandBank `bank` supplies shared hands for the sampled rules.
+        """
+        agg = self.deck_aggregates(deck)
+        if agg is None:
+            return float('-inf')
+        slots = positions = None
+        if not exact:
+            if isinstance(deck, Deck) and deck.index is self.index:
+                slots = deck.slots().tolist()
+            else:
+                pos = self.index.pos
+                slots = sorted(pos[cid] for cid, cnt in deck.items() for _ in range(cnt))
+            if bank is not None and len(slots) >= self.hand_size:
+                positions = bank.positions(len(slots), self.hand_size)
+        return self.score_row(agg, slots, positions)
@@ -0,0 +1,195 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.deck import Deck, get_rng
+from src.fitness import EvalContext
+
+# == SURROGATE PARAMETERS ==
+SCREEN_FACTOR = 10     # candidates generated per offspring slot
+RIDGE         = 1.0    # L2 penalty of the ridge fit
+DECAY         = 0.98   # weight kept by older observations per update
+MIN_OBSERVED  = 64     # finite scores seen before predictions are trusted
+CARD_WEIGHT   = 1.0    # decayed sum of squared counts below which a card loses its column
+
+
+def spearman(a: Sequence[float], b: Sequence[float]) -> float:
+    """Spearman rank correlation (ties get their average rank); nan if undefined."""
+    ra, rb = _ranks(np.asarray(a, dtype=np.float64)), _ranks(np.asarray(b, dtype=np.float64))
+    if len(ra) < 2 or ra.std() == 0 or rb.std() == 0:
+        return float('nan')
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _ranks(x: np.ndarray) -> np.ndarray:
+    _, inverse, counts = np.unique(x, return_inverse=True, return_counts=True)
+    # Average rank of each distinct value, 0-based
+    first = np.cumsum(counts) - counts
+    return (first + (counts - 1) / 2)[inverse]
+
+
+class Surrogate:
+    """
+    Online ridge regression predicting fitness from a deck's count vector.
+
+    Features are the rule aggregates of the context's compiled rules
+    (counts of each card selector, a fixed linear map of the counts); with
+    `interactions`, also the pairwise products of those aggregates, a
+    compact pairwise model over the counts; and the counts of the cards
+    the observed decks keep using. A card gets its column the first time it
+    is observed (its earlier feature values were all 0, so the normal
+    equations grow by zero rows and columns and stay exact), and loses it
+    once its decayed weight drops below `card_weight`, e.g. a card a
+    mutation tried once. The model's size follows the cards the population
+    uses, not the whole pool.
+    The fit keeps only the normal equations X'X and X'y, updated per batch
+    with older observations down-weighted by `decay`, so training is
+    O(features^2) per deck and the model follows the population as it moves.
+    Invalid decks (-inf) are not learned from.
+    """
+
+    def __init__(self, ctx: EvalContext, interactions: bool = False, ridge: float = RIDGE,
+                 decay: float = DECAY, min_observed: int = MIN_OBSERVED,
+                 card_weight: float = CARD_WEIGHT):
+        self.ctx = ctx
+        self.rules = ctx.rules
+        self.interactions = interactions
+        self.ridge = ridge
+        self.decay = decay
+        self.min_observed = min_observed
+        self.card_weight = card_weight
+        n_agg = self.rules.columns.shape[1]
+        self._pairs = np.triu_indices(n_agg) if interactions else None
+        self._fixed = 1 + n_agg + (len(self._pairs[0]) if interactions else 0)
+        # Card positions with a feature column, in column order
+        self._cards = np.zeros(0, dtype=np.int64)
+        self._seen = np.zeros(len(ctx.index), dtype=bool)
+        self._xtx = np.zeros((self._fixed, self._fixed))
+        self._xty = np.zeros(self._fixed)
+        self._weights: Optional[np.ndarray] = None
+        self.observed = 0
+        self.correlations: List[float] = []
+
+    def features(self, counts: np.ndarray) -> np.ndarray:
+        counts = np.atleast_2d(np.asarray(counts, dtype=np.float64))
+        agg = self.rules.aggregates(counts) / self.rules.max_deck_size
+        parts = [np.ones((len(counts), 1)), agg]
+        if self._pairs is not None:
+            parts.append(agg[:, self._pairs[0]] * agg[:, self._pairs[1]])
+        parts.append(counts[:, self._cards])
+        return np.hstack(parts)
+
+    def _add_cards(self, counts: np.ndarray) -> None:
+        """Give the cards first seen in `counts` their (all-zero so far) columns."""
+        new = np.flatnonzero(counts.any(axis=0) & ~self._seen)
+        if not len(new):
+            return
+        self._seen[new] = True
+        self._cards = np.concatenate([self._cards, new])
+        dim = len(self._xty) + len(new)
+        xtx = np.zeros((dim, dim))
+        xtx[:len(self._xty), :len(self._xty)] = self._xtx
+        self._xtx = xtx
+        self._xty = np.concatenate([self._xty, np.zeros(len(new))])
+
+    def _drop_cards(self) -> None:
+        """Remove the columns of cards whose decayed weight fell below card_weight."""
+        weight = np.diagonal(self._xtx)[self._fixed:]
+        stale = weight < self.card_weight
+        if not stale.any():
+            return
+        self._seen[self._cards[stale]] = False
+        self._cards = self._cards[~stale]
+        keep = np.concatenate([np.ones(self._fixed, dtype=bool), ~stale])
+        self._xtx = self._xtx[np.ix_(keep, keep)]
+        self._xty = self._xty[keep]
+
+    @property
+    def ready(self) -> bool:
+        return self.observed >= self.min_observed
+
+    def observe(self, decks: Sequence[Deck], scores: Sequence[float]) -> None:
+        """Add evaluated decks to the fit."""
+        scores = np.asarray(scores, dtype=np.float64)
+        keep = np.isfinite(scores)
+        if not keep.any():
+            return
+        counts = np.array([d.counts for d, k in zip(decks, keep) if k])
+        self._add_cards(counts)
+        x = self.features(counts)
+        self._xtx *= self.decay
+        self._xty *= self.decay
+        self._xtx += x.T @ x
+        self._xty += x.T @ scores[keep]
+        self._drop_cards()
+        self.observed += int(keep.sum())
+        self._weights = None
+
+    def predict(self, decks: Sequence[Deck]) -> np.ndarray:
+        if self._weights is None:
+            penalty = self.ridge * np.eye(len(self._xty))
+            penalty[0, 0] = 0.0  # leave the intercept unpenalised
+            self._weights = np.linalg.solve(self._xtx + penalty, self._xty)
+        return self.features(np.array([d.counts for d in decks])) @ self._weights
+
+    def screen(self, candidates: Sequence[Deck], keep: int,
+               rng: Optional[np.random.Generator] = None) -> List[int]:
+        """
+        Positions of the `keep` candidates with the best predicted fitness;
+        a random `keep` of them until the model has seen enough decks.
+        """
+        if len(candidates) <= keep:
+            return list(range(len(candidates)))
+        if not self.ready:
+            rng = rng or get_rng()
+            return sorted(rng.choice(len(candidates), keep, replace=False).tolist())
+        pred = self.predict(candidates)
+        return sorted(np.argsort(-pred, kind='stable')[:keep].tolist())
+
+    def record(self, decks: Sequence[Deck], scores: Sequence[float]) -> float:
+        """
+        Rank correlation of predicted with true fitness on freshly
+        evaluated decks (before they are observed); kept for summary().
+        """
+        if not self.ready:
+            return float('nan')
+        scores = np.asarray(scores, dtype=np.float64)
+        finite = np.isfinite(scores)
+        rho = spearman(self.predict([d for d, f in zip(decks, finite) if f]), scores[finite])
+        if rho == rho:
+            self.correlations.append(rho)
+        return rho
+
+    def state(self) -> Dict[str, Any]:
+        """The learned fit, for checkpoints (the weights follow from it)."""
+        return {'xtx': self._xtx.copy(), 'xty': self._xty.copy(), 'cards': self._cards.copy(),
+                'observed': self.observed, 'correlations': list(self.correlations)}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """Adopt another surrogate's state() (e.g. from a checkpoint)."""
+        xtx = np.asarray(state['xtx'], dtype=np.float64)
+        cards = np.asarray(state['cards'], dtype=np.int64)
+        if len(xtx) - len(cards) != self._fixed:
+            raise ValueError(f"Surrogate state has {len(xtx) - len(cards)} rule features, this "
+                             f"model has {self._fixed}; rerun with the same --interactions setting")
+        self._cards = cards.copy()
+        self._seen[:] = False
+        self._seen[cards] = True
+        self._xtx = xtx.copy()
+        self._xty = np.asarray(state['xty'], dtype=np.float64).copy()
+        self._weights = None
+        self.observed = int(state['observed'])
+        self.correlations = [float(r) for r in state['correlations']]
+
+    def summary(self) -> str:
+        if not self.correlations:
+            return f"Surrogate: {self.observed} decks observed, no rank correlation yet"
+        rho = np.array(self.correlations)
+        return (f"Surrogate: {self.observed} decks observed, Spearman rho "
+                f"mean={rho.mean():.3f} last={rho[-1]:.3f} over {len(rho)} generations")
+
+
+def make_surrogate(ctx: EvalContext, enabled: bool,
+                   interactions: bool = False) -> Optional[Surrogate]:
+    """Surrogate when pre-screening is enabled, otherwise None."""
+    return Surrogate(ctx, interactions) if enabled else None
@@ -0,0 +1,132 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from src.deck import Deck
+
+# Phase names used by the engines
+PHASES = ('mutation', 'crossover', 'screening', 'evaluation', 'selection', 'rescue', 'io')
+
+_NULL_PHASE = nullcontext()
+
+
+class NullTelemetry:
+    """Disabled telemetry: every hook is a no-op."""
+    enabled = False
+
+    def start_generation(self, cache: Optional[Any] = None) -> None:
+        pass
+
+    def phase(self, name: str):
+        return _NULL_PHASE
+
+    def end_generation(self, gen: int, pop: Sequence[Deck], scores: Sequence[float],
+                       **kwargs: Any) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+NULL_TELEMETRY = NullTelemetry()
+
+
+def duplicate_rate(offspring: Sequence[Deck], parents: Sequence[Deck]) -> float:
+    """Fraction of offspring identical to a parent or to an earlier offspring."""
+    if not offspring:
+        return 0.0
+    seen = {p.key() for p in parents}
+    dups = 0
+    for child in offspring:
+        key = child.key()
+        if key in seen:
+            dups += 1
+        seen.add(key)
+    return dups / len(offspring)
+
+
+def diversity(pop: Sequence[Deck]) -> Dict[str, float]:
+    """Share of distinct decks and mean card distance to the population centroid."""
+    counts = np.array([d.counts for d in pop], dtype=np.float64)
+    unique = len({d.key() for d in pop})
+    spread = np.abs(counts - counts.mean(axis=0)).sum(axis=1).mean() / 2
+    return {'unique_frac': unique / len(pop), 'centroid_dist': float(spread)}
+
+
+class Telemetry:
+    """
+    Per-generation instrumentation streamed as JSON Lines: wall time split
+    into PHASES, fitness-call counts and cache hit rate, duplicate-offspring
+    rate and best / average / diversity metrics. With `append` (a resumed
+    run), records are added after those already in the file.
+    """
+    enabled = True
+
+    def __init__(self, path: str, engine: str, append: bool = False):
+        self.engine = engine
+        self._f = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._phases: Dict[str, float] = {}
+        self._gen_start = 0.0
+        self._lookups: Optional[int] = None
+        self._misses = 0
+
+    def start_generation(self, cache: Optional[Any] = None) -> None:
+        self._phases = dict.fromkeys(PHASES, 0.0)
+        self._gen_start = time.perf_counter()
+        if cache is not None and self._lookups is None:
+            # Count fitness calls from the first instrumented generation on
+            self._lookups = cache.hits + cache.misses
+            self._misses = cache.misses
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + time.perf_counter() - start
+
+    def end_generation(
+        self,
+        gen: int,
+        pop: Sequence[Deck],
+        scores: Sequence[float],
+        offspring: Sequence[Deck] = (),
+        parents: Sequence[Deck] = (),
+        cache: Optional[Any] = None,
+        **extra: Any
+    ) -> None:
+        finite = [s for s in scores if s != float('-inf')]
+        record: Dict[str, Any] = {
+            'engine': self.engine,
+            'gen': gen,
+            'wall_s': time.perf_counter() - self._gen_start,
+            'phases_s': self._phases,
+            'best': max(finite) if finite else None,
+            'avg': sum(finite) / len(finite) if finite else None,
+            'invalid': len(scores) - len(finite),
+            'duplicate_rate': duplicate_rate(offspring, parents),
+        }
+        record.update(diversity(pop))
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            d_lookups = lookups - (self._lookups or 0)
+            d_misses = cache.misses - self._misses
+            self._lookups, self._misses = lookups, cache.misses
+            record['fitness_calls'] = d_lookups
+            record['fitness_evals'] = d_misses
+            record['cache_hit_rate'] = 1 - d_misses / d_lookups if d_lookups else None
+        record.update(extra)
+        self._f.write(json.dumps(record) + '\n')
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def make_telemetry(path: Optional[str], engine: str, append: bool = False):
+    """Telemetry writing to `path`, or the no-op NULL_TELEMETRY if path is None."""
+    return Telemetry(path, engine, append) if path else NULL_TELEMETRY
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from src.database import load_card_db
+from src.deck_optimiser import load_seed_decks
+from src.fitness import EvalContext, set_exact_hand_rates
+
+SEEDS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'seed_decks.json')
+
+
+@pytest.fixture(scope='session')
+def card_db():
+    return load_card_db()
+
+
+@pytest.fixture(scope='session')
+def ctx(card_db):
+    return EvalContext.for_card_db(card_db)
+
+
+@pytest.fixture(scope='session')
+def seeds():
+    return load_seed_decks(SEEDS_PATH)
+
+
+@pytest.fixture
+def monte_carlo():
+    """Monte Carlo hand rates for one test; exact mode is restored after it."""
+    set_exact_hand_rates(False)
+    yield
+    set_exact_hand_rates(True)
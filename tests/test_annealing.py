@@ -0,0 +1,46 @@
+import pytest
+
+from src.annealing import SCHEDULES, anneal, tabu_search
+from src.deck import DECK_SIZE, seed_rngs
+from src.deck_optimiser import generate_random_deck
+from src.fitness import EvalContext, evaluate_fitness, fitness
+
+
+@pytest.mark.parametrize('schedule', sorted(SCHEDULES))
+def test_schedules_cool_from_t0_towards_t_end(schedule):
+    cool = SCHEDULES[schedule]
+    temps = [cool(2.0, 0.01, step, 100) for step in range(100)]
+    assert temps[0] == pytest.approx(2.0)
+    assert all(a >= b for a, b in zip(temps, temps[1:]))
+    assert temps[-1] >= 0.01 - 1e-12
+
+
+def assert_search_improves(search, ctx, card_db, **kwargs):
+    seed_rngs(0)
+    start = generate_random_deck(card_db)
+    best, score, walk = search(start, ctx, verbose=False, **kwargs)
+    assert score > evaluate_fitness(start, ctx)
+    assert best.total() == DECK_SIZE and (best.counts <= ctx.index.limits).all()
+    assert score == pytest.approx(evaluate_fitness(best, ctx), rel=1e-12)
+    # The walk's running score stays in step with its deck
+    assert walk.score == pytest.approx(evaluate_fitness(walk.deck(), ctx), rel=1e-12)
+    assert walk.evaluated > 0
+
+
+@pytest.mark.parametrize('schedule', sorted(SCHEDULES))
+def test_anneal_improves_the_start(ctx, card_db, schedule):
+    assert_search_improves(anneal, ctx, card_db, steps=1500, schedule=schedule)
+
+
+def test_tabu_search_improves_the_start(ctx, card_db):
+    assert_search_improves(tabu_search, ctx, card_db, steps=150)
+
+
+def test_monte_carlo_walks_score_through_fitness(ctx, card_db, monte_carlo):
+    mc = EvalContext(ctx.index, ctx.card_db, exact=False)
+    seed_rngs(1)
+    start = generate_random_deck(card_db)
+    best, score, walk = anneal(start, mc, steps=200, verbose=False)
+    # The walk starts from the cached score, so the best is never below it
+    assert score >= fitness(start, mc)
+    assert best.total() == DECK_SIZE
@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+import src.database as database
+from src.card_index import CardIndex
+from src.database import compiled_index_path, load_card_index
+
+CARDS = [
+    {'id': 89631139, 'name': 'Blue-Eyes White Dragon', 'type': 'Normal Monster'},
+    {'id': 38120068, 'name': 'Trade-In', 'type': 'Spell Card'},
+    {'id': 55144522, 'name': 'Pot of Greed', 'type': 'Spell Card', 'banlist_status': 'Forbidden'},
+]
+
+
+def write_cards(path, cards, mtime_ns):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cards, f)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def cards_json(tmp_path):
+    path = str(tmp_path / 'cards.json')
+    write_cards(path, CARDS, 1_000_000_000)
+    return path
+
+
+def forbid_parsing(monkeypatch):
+    def parse(path):
+        raise AssertionError(f"{path} was parsed again")
+    monkeypatch.setattr(database, '_read_card_json', parse)
+
+
+def test_index_is_compiled_beside_the_json(cards_json, monkeypatch):
+    index = load_card_index(cards_json)
+    assert index.ids.tolist() == [c['id'] for c in CARDS]
+    assert index.limits.tolist() == [3, 3, 0]
+    assert os.path.isfile(compiled_index_path(cards_json))
+    forbid_parsing(monkeypatch)
+    assert load_card_index(cards_json).names == index.names
+
+
+def test_edited_json_rebuilds_the_index(cards_json):
+    load_card_index(cards_json)
+    edited = CARDS[:2] + [dict(CARDS[2], banlist_status='Limited')]
+    write_cards(cards_json, edited, 2_000_000_000)
+    assert load_card_index(cards_json).limits.tolist() == [3, 3, 1]
+
+
+def test_touched_json_only_refreshes_the_stamp(cards_json, monkeypatch):
+    load_card_index(cards_json)
+    os.utime(cards_json, ns=(3_000_000_000, 3_000_000_000))
+    forbid_parsing(monkeypatch)
+    assert load_card_index(cards_json).limits.tolist() == [3, 3, 0]
+    _, source = CardIndex.load(compiled_index_path(cards_json))
+    assert source['mtime_ns'] == 3_000_000_000
+
+
+def test_unreadable_index_is_rebuilt(cards_json):
+    load_card_index(cards_json)
+    with open(compiled_index_path(cards_json), 'wb') as f:
+        f.write(b'not an npz')
+    assert load_card_index(cards_json).ids.tolist() == [c['id'] for c in CARDS]
+    CardIndex.load(compiled_index_path(cards_json))
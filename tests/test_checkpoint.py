@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from src.checkpoint import load_checkpoint, make_checkpointer, restore_checkpoint
+from src.deck import seed_rngs
+from src.deck_optimiser import build_initial_population, de_evolve
+from src.ga_optimizer import main as ga_main
+from src.ga_optimizer import run_ga
+from src.racing import Racer
+from src.surrogate import Surrogate
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+POP = 16
+GENS = 6
+SPLIT = 3
+
+
+def run_de(card_db, seeds, gens, checkpointer=None, resume=None, surrogate=None, racer=None):
+    pop = build_initial_population(card_db, seeds, POP) if resume is None else None
+    return de_evolve(card_db, pop, gens, None, verbosity='quiet', checkpointer=checkpointer,
+                     resume=resume, surrogate=surrogate, racer=racer, screen_factor=2)
+
+
+def run_ga_quiet(card_db, seeds, gens, checkpointer=None, resume=None, surrogate=None,
+                 racer=None):
+    return run_ga(card_db, seeds, gens, verbose=False, pop_size=POP, checkpointer=checkpointer,
+                  resume=resume, surrogate=surrogate, racer=racer, screen_factor=2)
+
+
+ENGINES = {'de': run_de, 'ga': run_ga_quiet}
+
+
+def assert_resume_matches(engine, card_db, seeds, ctx, tmp_path, make_helpers=dict):
+    """
+    A run checkpointed at SPLIT and resumed to GENS ends like an unbroken
+    one; `make_helpers` returns fresh surrogate/racer keyword arguments.
+    """
+    run = ENGINES[engine]
+    path = str(tmp_path / f'{engine}.npz')
+
+    ctx.cache.clear()
+    seed_rngs(7)
+    full_pop, full_history = run(card_db, seeds, GENS, **make_helpers())
+
+    ctx.cache.clear()
+    seed_rngs(7)
+    run(card_db, seeds, SPLIT, make_checkpointer(path, engine, SPLIT, None),
+        **make_helpers())
+
+    # Scramble everything the checkpoint has to put back
+    ctx.cache.clear()
+    seed_rngs(99)
+    state = load_checkpoint(path, ctx.index)
+    assert state['gen'] == SPLIT
+    helpers = make_helpers()
+    restore_checkpoint(state, ctx, None, **helpers)
+    pop, history = run(card_db, seeds, GENS, resume=state, **helpers)
+
+    assert np.array_equal([d.counts for d in pop], [d.counts for d in full_pop])
+    assert history == full_history
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_resume_is_bit_for_bit(engine, card_db, seeds, ctx, tmp_path):
+    assert_resume_matches(engine, card_db, seeds, ctx, tmp_path)
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_resume_monte_carlo_with_racing(engine, card_db, seeds, ctx, tmp_path, monte_carlo):
+    assert_resume_matches(engine, card_db, seeds, ctx, tmp_path,
+                          lambda: {'racer': Racer(ctx)})
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_resume_with_surrogate(engine, card_db, seeds, ctx, tmp_path):
+    assert_resume_matches(engine, card_db, seeds, ctx, tmp_path,
+                          lambda: {'surrogate': Surrogate(ctx, min_observed=POP)})
+
+
+def test_resume_needs_the_same_helpers(card_db, seeds, ctx, tmp_path):
+    path = str(tmp_path / 'ga.npz')
+    seed_rngs(7)
+    run_ga_quiet(card_db, seeds, SPLIT, make_checkpointer(path, 'ga', SPLIT, None),
+                 surrogate=Surrogate(ctx))
+    state = load_checkpoint(path, ctx.index)
+    with pytest.raises(ValueError, match='--surrogate'):
+        restore_checkpoint(state, ctx)
+    with pytest.raises(ValueError, match='--interactions'):
+        restore_checkpoint(state, ctx, surrogate=Surrogate(ctx, interactions=True))
+
+
+def run_ga_cli(monkeypatch, *argv):
+    """ga_optimizer's main() from the repository root, without plotting."""
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setitem(sys.modules, 'matplotlib.pyplot', None)
+    monkeypatch.setattr(sys, 'argv', ['ga_optimizer', *argv])
+    ga_main()
+
+
+def telemetry_gens(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['gen'] for line in f]
+
+
+def test_resumed_run_appends_telemetry(tmp_path, monkeypatch):
+    ckpt, tel = str(tmp_path / 'ga.npz'), str(tmp_path / 'ga.jsonl')
+    common = ('--seed', '7', '--checkpoint', ckpt, '--telemetry', tel)
+    run_ga_cli(monkeypatch, '--gens', str(SPLIT), *common)
+    run_ga_cli(monkeypatch, '--gens', str(GENS), '--resume', *common)
+    assert telemetry_gens(tel) == list(range(1, GENS + 1))
+
+
+def test_resume_without_a_checkpoint_starts_over(ctx, tmp_path, monkeypatch, capsys):
+    ckpt, tel = str(tmp_path / 'missing.npz'), str(tmp_path / 'ga.jsonl')
+    run_ga_cli(monkeypatch, '--gens', str(SPLIT), '--seed', '7', '--resume',
+               '--checkpoint', ckpt, '--telemetry', tel)
+    assert f"No checkpoint at '{ckpt}'" in capsys.readouterr().out
+    assert telemetry_gens(tel) == list(range(1, SPLIT + 1))
+    assert load_checkpoint(ckpt, ctx.index)['gen'] == SPLIT
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.deck import Deck, seed_rngs
+from src.deck_optimiser import generate_random_deck
+from src.fitness import evaluate_fitness
+
+
+@pytest.fixture(scope='module')
+def decks(card_db):
+    seed_rngs(0)
+    return [generate_random_deck(card_db) for _ in range(50)]
+
+
+def test_deck_behaves_as_its_dict(ctx, decks):
+    for deck in decks:
+        as_dict = deck.to_dict()
+        assert dict(deck) == as_dict
+        assert len(deck) == len(as_dict)
+        assert deck.total() == sum(as_dict.values()) == len(deck.slots())
+        cid = next(iter(as_dict))
+        assert deck[cid] == as_dict[cid]
+        assert Deck.from_mapping(ctx.index, as_dict).key() == deck.key()
+        assert Deck.from_slots(ctx.index, deck.slots()).key() == deck.key()
+
+
+def test_deck_hides_absent_cards(ctx, decks):
+    absent = int(ctx.index.ids[np.flatnonzero(decks[0].counts == 0)[0]])
+    assert absent not in decks[0]
+    with pytest.raises(KeyError):
+        decks[0][absent]
+    with pytest.raises(KeyError):
+        Deck.from_mapping(ctx.index, {-1: 1})
+
+
+def test_decks_score_like_their_dicts(ctx, decks):
+    assert ([evaluate_fitness(d, ctx) for d in decks]
+            == [evaluate_fitness(d.to_dict(), ctx) for d in decks])
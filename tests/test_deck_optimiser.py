@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from src.deck import DECK_SIZE, get_rng, seed_rngs
+from src.deck_optimiser import build_initial_population, crossover_batch, mutate_batch, pick_donors
+
+
+@pytest.fixture(scope='module')
+def counts(card_db, seeds):
+    seed_rngs(0)
+    return np.array([d.counts for d in build_initial_population(card_db, seeds, 16)])
+
+
+def assert_legal(rows, ctx):
+    assert (rows.sum(axis=1) == DECK_SIZE).all()
+    assert (rows <= ctx.index.limits).all()
+
+
+def test_donors_are_distinct_and_not_the_target():
+    rng = np.random.default_rng(0)
+    n = 8
+    targets = np.tile(np.arange(n), 5000)
+    donors = pick_donors(n, targets, rng)
+    assert donors.shape == (len(targets), 3)
+    assert (donors != targets[:, None]).all()
+    assert (np.sort(donors, axis=1)[:, 1:] != np.sort(donors, axis=1)[:, :-1]).all()
+    # Each role is uniform over the n-1 non-targets
+    for role in range(3):
+        freq = np.bincount(donors[targets == 0, role], minlength=n)[1:] / 5000
+        assert np.abs(freq - 1 / (n - 1)).max() < 0.02
+
+
+def test_mutants_are_legal(card_db, ctx, counts):
+    seed_rngs(1)
+    targets = np.arange(len(counts))
+    mutants = mutate_batch(counts, pick_donors(len(counts), targets, get_rng()), card_db)
+    assert mutants.shape == counts.shape
+    assert_legal(mutants, ctx)
+
+
+def test_equal_donors_mutate_by_at_most_one_swap(card_db, counts):
+    # a + F * (b - c) is a itself; only the card swap can change it
+    seed_rngs(2)
+    donors = np.repeat(np.arange(len(counts))[:, None], 3, axis=1)
+    mutants = mutate_batch(counts, donors, card_db)
+    assert (np.abs(mutants.astype(np.int64) - counts).sum(axis=1) <= 2).all()
+
+
+def test_trials_are_legal(card_db, ctx, counts):
+    seed_rngs(3)
+    mutants = mutate_batch(counts, pick_donors(len(counts), np.arange(len(counts)), get_rng()),
+                           card_db)
+    trials = crossover_batch(counts, mutants, card_db)
+    assert_legal(trials, ctx)
+    # Apart from the one random card of the 20% mutation, cards come from the pair
+    used = counts.astype(bool) | mutants.astype(bool)
+    assert (trials.astype(bool) & ~used).sum(axis=1).max() <= 1
+
+
+def test_crossing_a_deck_with_itself_keeps_it(card_db, counts):
+    seed_rngs(4)
+    trials = crossover_batch(counts, counts, card_db)
+    assert (np.abs(trials.astype(np.int64) - counts).sum(axis=1) <= 2).all()
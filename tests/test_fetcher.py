@@ -0,0 +1,70 @@
+import functools
+import json
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.fetcher import API_BASE, CardFetcher, local_name
+
+URL = API_BASE + 'cardinfo.php?type=trap card&archetype=Blue-Eyes'
+OTHER_URL = API_BASE + 'cardinfo.php?type=spell card&archetype=Blue-Eyes'
+PAYLOAD = {'data': [{'id': 89631139, 'name': 'Blue-Eyes White Dragon'}]}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """
+    A local HTTP stand-in for API_BASE serving cardinfo.php (queries are
+    ignored); it answers If-Modified-Since with 304.
+    """
+    root = tmp_path / 'upstream'
+    root.mkdir()
+    (root / 'cardinfo.php').write_text(json.dumps(PAYLOAD), encoding='utf-8')
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0),
+                                functools.partial(QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_conditional_get_reuses_the_cached_body(server, tmp_path):
+    cache = str(tmp_path / 'cache')
+    with CardFetcher(cache, source=server) as fetcher:
+        assert fetcher.fetch_cards(URL) == PAYLOAD['data']
+        assert fetcher.fetch_cards(URL) == PAYLOAD['data']
+        assert (fetcher.stats['downloaded'], fetcher.stats['not_modified']) == (1, 1)
+    with CardFetcher(cache, source=server, refresh=True) as fetcher:
+        fetcher.fetch_cards(URL)
+        assert fetcher.stats['downloaded'] == 1
+
+
+def test_offline_answers_from_the_cache_only(server, tmp_path):
+    cache = str(tmp_path / 'cache')
+    with CardFetcher(cache, source=server) as fetcher:
+        fetcher.fetch_cards(URL)
+    offline = CardFetcher(cache, offline=True)
+    assert offline.fetch_cards(URL) == PAYLOAD['data']
+    assert offline.stats['cached'] == 1
+    with pytest.raises(FileNotFoundError):
+        offline.fetch_cards(OTHER_URL)
+
+
+def test_local_directory_stands_in_for_the_api(tmp_path):
+    source = tmp_path / 'mirror'
+    source.mkdir()
+    (source / local_name(URL)).write_text(json.dumps(PAYLOAD), encoding='utf-8')
+    fetcher = CardFetcher(str(tmp_path / 'cache'), source=str(source))
+    assert local_name(URL) == 'cardinfo__archetype-Blue-Eyes__type-trap_card.json'
+    assert fetcher.fetch_cards(URL) == PAYLOAD['data']
+    assert fetcher.stats['local'] == 1
+    with pytest.raises(FileNotFoundError):
+        fetcher.fetch_cards(OTHER_URL)
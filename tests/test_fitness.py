@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from src.deck import seed_rngs
+from src.deck_optimiser import generate_random_deck, sanitize_seed_deck
+from src.fitness import (
+    EXTENDER_IDS,
+    PLAYABLE_HAND_IDS,
+    EvalContext,
+    FitnessCache,
+    HandBank,
+    deck_fingerprint,
+    evaluate_fitness,
+    fitness,
+    fitness_batch,
+    fitness_many,
+)
+
+# Probability rules scored as points * P, so a deck's score is P itself
+STARTER = {'ids': sorted(PLAYABLE_HAND_IDS)}
+EXTENDER = {'ids': sorted(EXTENDER_IDS)}
+PROBABILITY_RULES = {
+    'starter': [STARTER],
+    'starter_and_extender': [STARTER, EXTENDER],
+}
+
+
+@pytest.fixture(scope='module')
+def decks(card_db, seeds):
+    seed_rngs(0)
+    return ([sanitize_seed_deck(s, card_db) for s in seeds]
+            + [generate_random_deck(card_db) for _ in range(20)])
+
+
+def test_fingerprint_ignores_card_order(decks):
+    as_dict = decks[0].to_dict()
+    reordered = dict(reversed(list(as_dict.items())))
+    assert deck_fingerprint(reordered) == deck_fingerprint(as_dict)
+    assert deck_fingerprint(decks[0]) == deck_fingerprint(decks[0].copy())
+
+
+def test_cache_evicts_least_recently_used():
+    cache = FitnessCache(maxsize=2)
+    cache.put('a', 1.0)
+    cache.put('b', 2.0)
+    assert cache.get('a') == 1.0
+    cache.put('c', 3.0)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1.0, 3.0)
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_fitness_is_memoized(ctx, decks):
+    ctx.cache.clear()
+    first = fitness_many(decks, ctx)
+    assert ctx.cache.misses == len(decks) and ctx.cache.hits == 0
+    assert [fitness(d, ctx) for d in decks] == first
+    assert fitness_many(decks, ctx) == first
+    assert ctx.cache.hits == 2 * len(decks)
+    assert first == pytest.approx([evaluate_fitness(d, ctx) for d in decks], rel=1e-12)
+
+
+@pytest.mark.parametrize('event', sorted(PROBABILITY_RULES))
+def test_exact_hand_rates_match_monte_carlo(event, ctx, decks):
+    spec = {'rules': [{'kind': 'probability', 'all_of': PROBABILITY_RULES[event],
+                       'scale': True, 'sampled': True, 'points': 1}]}
+    exact = EvalContext(ctx.index, ctx.card_db, exact=True, rules=spec)
+    sampled = EvalContext(ctx.index, ctx.card_db, exact=False, rules=spec)
+    sampled.hand_bank = HandBank(n_trials=20_000, seed=0)
+    p_exact = [evaluate_fitness(d, exact) for d in decks]
+    p_sampled = [evaluate_fitness(d, sampled) for d in decks]
+    # 20k hands: one standard error is at most 0.0035
+    assert p_sampled == pytest.approx(p_exact, abs=0.01)
+    assert max(p_exact) > 0.1
+
+
+def test_fitness_batch_matches_scalar(ctx, decks):
+    scalar = [evaluate_fitness(d.to_dict(), ctx) for d in decks]
+    batch = fitness_batch(np.array([d.counts for d in decks]), ctx)
+    assert batch.tolist() == pytest.approx(scalar, rel=1e-12)
+    assert len(set(scalar)) > 1
+
+
+def test_fitness_batch_scores_invalid_rows_minus_infinity(ctx, decks):
+    counts = np.array([d.counts for d in decks[:3]], dtype=np.int64)
+    counts[0, np.flatnonzero(counts[0] < ctx.index.limits)[0]] += 1  # 41 cards
+    held = np.flatnonzero(counts[1])
+    counts[1, held[0]] = ctx.index.limits[held[0]] + 1  # over the banlist limit
+    counts[1, held[1:]] = 0
+    scores = fitness_batch(counts, ctx)
+    assert scores[:2].tolist() == [float('-inf')] * 2
+    assert np.isfinite(scores[2])
+
+
+def test_hand_bank_is_a_function_of_its_state():
+    bank = HandBank(n_trials=50, refresh_every=3, seed=11)
+    again = HandBank(n_trials=50, refresh_every=3, seed=11)
+    assert np.array_equal(bank.positions(40), again.positions(40))
+    assert not np.array_equal(bank.positions(40), HandBank(50, 3, seed=12).positions(40))
+    # Generations 0-2 share epoch 0; generation 3 redraws
+    first = bank.positions(40)
+    assert not bank.set_generation(2)
+    assert bank.set_generation(3)
+    assert not np.array_equal(bank.positions(40), first)
+    again.set_state(bank.state())
+    assert np.array_equal(again.positions(40), bank.positions(40))
+    assert np.array_equal(again.positions(41), bank.positions(41))
+
+
+def test_shared_hands_make_monte_carlo_scores_repeatable(ctx, decks):
+    spec = {'rules': [{'kind': 'probability', 'all_of': [STARTER],
+                       'scale': True, 'sampled': True, 'points': 1}]}
+    sampled = EvalContext(ctx.index, ctx.card_db, exact=False, rules=spec)
+    sampled.hand_bank = HandBank(seed=5)
+    scores = [evaluate_fitness(d, sampled) for d in decks]
+    assert [evaluate_fitness(d, sampled) for d in decks] == scores
+    # Generations on the same hands keep cached scores; new hands drop them
+    sampled.cache.put('deck', 1.0)
+    sampled.start_generation(1)
+    assert len(sampled.cache) == 1
+    sampled.start_generation(sampled.hand_bank.refresh_every)
+    assert len(sampled.cache) == 0
+    assert [evaluate_fitness(d, sampled) for d in decks] != scores
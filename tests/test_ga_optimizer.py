@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from src import ga_optimizer
+from src.deck import DECK_SIZE, seed_rngs
+from src.deck_optimiser import build_initial_population
+from src.fitness import fitness_many
+from src.ga_optimizer import breed_batch
+
+
+@pytest.fixture(scope='module')
+def scored(card_db, seeds, ctx):
+    seed_rngs(0)
+    pop = build_initial_population(card_db, seeds, 32)
+    return pop, fitness_many(pop, ctx)
+
+
+def test_children_are_legal_decks(card_db, ctx, scored):
+    pop, scores = scored
+    seed_rngs(1)
+    children = breed_batch(pop, scores, 200, card_db)
+    counts = np.array([c.counts for c in children])
+    assert len(children) == 200
+    assert (counts.sum(axis=1) == DECK_SIZE).all()
+    assert (counts <= ctx.index.limits).all()
+
+
+def test_children_without_mutation_use_their_parents_cards(card_db, scored, monkeypatch):
+    pop, scores = scored
+    monkeypatch.setattr(ga_optimizer, 'MUT_RATE', 0.0)
+    seed_rngs(2)
+    used = np.any([d.counts for d in pop], axis=0)
+    for child in breed_batch(pop, scores, 100, card_db):
+        assert not child.counts[~used].any()
+
+
+def test_a_whole_population_tournament_breeds_the_best(card_db, scored, monkeypatch):
+    pop, scores = scored
+    monkeypatch.setattr(ga_optimizer, 'MUT_RATE', 0.0)
+    monkeypatch.setattr(ga_optimizer, 'TOUR_SIZE', len(pop))
+    seed_rngs(3)
+    best = pop[int(np.argmax(scores))]
+    for child in breed_batch(pop, scores, 20, card_db):
+        assert (child.counts == best.counts).all()
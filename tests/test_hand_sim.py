@@ -0,0 +1,89 @@
+from math import comb
+
+import numpy as np
+import pytest
+
+from src.deck import repair
+from src.hand_sim import (
+    GOING_FIRST,
+    GOING_SECOND,
+    HandCondition,
+    deck_slots,
+    draw_positions,
+    hand_rates,
+)
+
+N_HANDS = 200_000
+
+
+def hypergeom_at_least(n, deck_size, copies, hand_size):
+    """P(at least n of `copies` cards in a hand drawn from deck_size cards)."""
+    return sum(comb(copies, k) * comb(deck_size - copies, hand_size - k)
+               for k in range(n, min(copies, hand_size) + 1)) / comb(deck_size, hand_size)
+
+
+@pytest.fixture(scope='module')
+def counts(ctx):
+    rng = np.random.default_rng(0)
+    rows = [repair(np.zeros(len(ctx.index), dtype=np.int64), ctx.index, rng, size)
+            for size in (40, 40, 45, 60)]
+    return np.array(rows)
+
+
+def test_draw_positions_are_distinct_slots_of_each_deck():
+    sizes = np.array([5, 6, 40, 60])
+    pos = draw_positions(sizes, GOING_FIRST, 2000, np.random.default_rng(1))
+    assert pos.shape == (4, 2000, GOING_FIRST)
+    assert (pos >= 0).all() and (pos < sizes[:, None, None]).all()
+    srt = np.sort(pos, axis=-1)
+    assert (np.diff(srt, axis=-1) > 0).all()
+    # A 5-card deck's hand is the whole deck; 40-card slots are hit evenly
+    assert (srt[0] == np.arange(5)).all()
+    hits = np.bincount(pos[2].ravel(), minlength=40) / pos[2].size
+    assert np.abs(hits - 1 / 40).max() < 0.005
+
+
+def test_deck_slots_lists_every_copy(counts):
+    slots, sizes = deck_slots(counts)
+    assert sizes.tolist() == [40, 40, 45, 60]
+    for row, deck_slots_row, size in zip(counts, slots, sizes):
+        assert (np.bincount(deck_slots_row[:size], minlength=len(row)) == row).all()
+        assert (deck_slots_row[size:] == -1).all()
+
+
+@pytest.mark.parametrize('hand_size', [GOING_FIRST, GOING_SECOND])
+def test_hand_rates_match_the_hypergeometric(ctx, counts, hand_size):
+    # A group of ~a third of each deck's cards
+    group = np.zeros(len(ctx.index), dtype=bool)
+    group[np.flatnonzero(counts.sum(axis=0))[::3]] = True
+    conditions = {
+        'one': HandCondition.any_of(group),
+        'two': HandCondition.any_of(group, 2),
+        'none': HandCondition.none_of(group),
+    }
+    rates = hand_rates(counts, conditions, hand_size, N_HANDS, np.random.default_rng(2),
+                       chunk_hands=1 << 16)
+    copies = counts[:, group].sum(axis=1)
+    for d, (size, k) in enumerate(zip(counts.sum(axis=1), copies)):
+        expected = {'one': hypergeom_at_least(1, size, k, hand_size),
+                    'two': hypergeom_at_least(2, size, k, hand_size)}
+        expected['none'] = 1 - expected['one']
+        for name, p in expected.items():
+            # 200k hands: one standard error is at most 0.0012
+            assert rates[name][d] == pytest.approx(p, abs=0.006)
+
+
+def test_all_of_needs_every_group(ctx, counts):
+    held = np.flatnonzero(counts[0])
+    a = np.zeros(len(ctx.index), dtype=bool)
+    b = np.zeros(len(ctx.index), dtype=bool)
+    a[held[:5]] = True
+    b[held[5:10]] = True
+    rates = hand_rates(counts[:1], {'a': HandCondition.any_of(a), 'b': HandCondition.any_of(b),
+                                    'ab': HandCondition.all_of(a, b)},
+                       GOING_FIRST, N_HANDS, np.random.default_rng(3))
+    ka, kb = counts[0, a].sum(), counts[0, b].sum()
+    hit = [hypergeom_at_least(1, 40, k, GOING_FIRST) for k in (ka, kb, ka + kb)]
+    # Inclusion-exclusion: P(a and b) = P(a) + P(b) - P(a or b)
+    assert rates['ab'][0] == pytest.approx(hit[0] + hit[1] - hit[2], abs=0.006)
+    assert rates['ab'][0] <= min(rates['a'][0], rates['b'][0])
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.deck import seed_rngs
+from src.deck_optimiser import generate_random_deck, sanitize_seed_deck
+from src.fitness import evaluate_fitness
+from src.incremental import IncrementalScorer
+
+
+@pytest.fixture(scope='module')
+def decks(card_db, seeds):
+    seed_rngs(0)
+    return ([sanitize_seed_deck(s, card_db) for s in seeds]
+            + [generate_random_deck(card_db) for _ in range(20)])
+
+
+def test_incremental_scorer_follows_swaps(ctx, decks):
+    rng = np.random.default_rng(0)
+    ids = ctx.index.ids
+    for start in decks[:20]:
+        scorer = IncrementalScorer(start, ctx)
+        assert scorer.score == pytest.approx(evaluate_fitness(start, ctx), rel=1e-12)
+        for _ in range(25):
+            counts = np.array(scorer.counts)
+            remove = int(ids[rng.choice(np.flatnonzero(counts))])
+            add = int(ids[rng.choice(np.flatnonzero(counts < ctx.index.limits))])
+            peeked = scorer.peek([(remove, add)])
+            assert scorer.apply([(remove, add)]) == peeked
+            assert peeked == pytest.approx(evaluate_fitness(scorer.deck(), ctx), rel=1e-12)
+        # A copy past the banlist limit makes the deck invalid
+        full = np.flatnonzero(np.array(scorer.counts) == ctx.index.limits)
+        if len(full):
+            assert scorer.peek([(None, int(ids[full[0]]))]) == float('-inf')
@@ -0,0 +1,62 @@
+import queue
+
+import numpy as np
+import pytest
+
+from src.database import DEFAULT_DB_PATH
+from src.deck import Deck, repair
+from src.fitness import EvalContext, evaluate_fitness, set_exact_hand_rates, set_rules
+from src.islands import _island_main, migration_target
+from tests.conftest import SEEDS_PATH
+
+N_MIGRANTS = 2
+
+
+@pytest.mark.parametrize('topology', ['ring', 'random'])
+def test_every_island_receives_one_batch(topology):
+    for n_islands in (2, 3, 5):
+        for epoch in range(10):
+            targets = [migration_target(r, n_islands, epoch, topology, seed=3)
+                       for r in range(n_islands)]
+            assert sorted(targets) == list(range(n_islands))
+            assert all(t != r for r, t in enumerate(targets))
+
+
+@pytest.fixture
+def migrant_rules(ctx, seeds):
+    """
+    Rules under which every full deck scores 10 (so no deck is rescued) plus
+    a point per copy of ten cards the seed decks lack, and a deck full of them.
+    """
+    in_seeds = {cid for s in seeds for cid in s}
+    rare = [int(cid) for cid, lim in zip(ctx.index.ids, ctx.index.limits)
+            if lim == 3 and cid not in in_seeds][:10]
+    spec = {'rules': [{'kind': 'count', 'cards': {'all': True}, 'min': 40, 'points': 10},
+                      {'kind': 'per_card', 'per_copy': [[cid, 1] for cid in rare]}]}
+    counts = ctx.index.to_counts({cid: 3 for cid in rare})
+    migrant = repair(counts, ctx.index, np.random.default_rng(0))
+    yield spec, Deck(ctx.index, migrant)
+    set_rules(None)
+    set_exact_hand_rates(True)
+
+
+def test_island_sends_its_best_and_keeps_migrants(ctx, migrant_rules):
+    spec, migrant = migrant_rules
+    scorer = EvalContext(ctx.index, ctx.card_db, rules=spec)
+    config = {'card_db_path': DEFAULT_DB_PATH, 'seeds_path': SEEDS_PATH, 'migrate_every': 1,
+              'migrants': N_MIGRANTS, 'topology': 'ring', 'seed': 1, 'exact': True,
+              'rules': spec}
+    inboxes = [queue.Queue(), queue.Queue()]
+    inboxes[0].put([migrant.counts])
+    results = queue.Queue()
+    _island_main(0, 'de', 2, config, inboxes, results)
+
+    (_, _, gen1, best1, _), (_, _, gen2, best2, _), done = (results.get() for _ in range(3))
+    assert (gen1, gen2) == (1, 2)
+    # The island's top decks went to its ring neighbour
+    sent = [evaluate_fitness(Deck(ctx.index, c), scorer) for c in inboxes[1].get_nowait()]
+    assert len(sent) == N_MIGRANTS and sent[0] == best1 >= sent[1]
+    # The newcomer replaced a deck and, being far better, survived selection
+    migrant_score = evaluate_fitness(migrant, scorer)
+    assert best1 < migrant_score <= best2
+    assert done[2] == best2
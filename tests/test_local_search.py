@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.deck import DECK_SIZE, Deck, seed_rngs
+from src.deck_optimiser import generate_random_deck, sanitize_seed_deck
+from src.fitness import EvalContext, evaluate_fitness
+from src.local_search import MIN_GAIN, SwapSearch, local_search
+
+
+@pytest.fixture(scope='module')
+def starts(card_db, seeds):
+    seed_rngs(0)
+    return [sanitize_seed_deck(seeds[1], card_db), generate_random_deck(card_db)]
+
+
+def test_neighbour_scores_are_the_swapped_decks_fitness(ctx, starts):
+    search = SwapSearch(ctx)
+    counts, agg, score = search.start(starts[0])
+    assert score == evaluate_fitness(starts[0], ctx)
+    present, scores = search.neighbours(counts, agg)
+    rng = np.random.default_rng(0)
+    for r, a in zip(rng.integers(len(present), size=50), rng.integers(len(counts), size=50)):
+        swapped = counts.copy()
+        swapped[present[r]] -= 1
+        swapped[a] += 1
+        if a == present[r] or counts[a] >= ctx.index.limits[a]:
+            assert scores[r, a] == float('-inf')
+        else:
+            expected = evaluate_fitness(Deck(ctx.index, swapped), ctx)
+            assert scores[r, a] == pytest.approx(expected, rel=1e-12)
+
+
+def test_climb_reaches_a_local_optimum(ctx, starts):
+    search = SwapSearch(ctx)
+    for deck in starts:
+        counts, agg, start = search.start(deck)
+        score, steps = search.climb(counts, agg, start)
+        assert steps > 0 and score > start
+        assert counts.sum() == DECK_SIZE and (counts <= ctx.index.limits).all()
+        assert score == pytest.approx(evaluate_fitness(Deck(ctx.index, counts), ctx), rel=1e-12)
+        assert search.neighbours(counts, agg)[1].max() <= score + MIN_GAIN
+
+
+def test_local_search_keeps_the_best_restart(card_db, ctx, starts):
+    seed_rngs(1)
+    best, score, runs = local_search(card_db, starts, tries=3, verbose=False)
+    assert all(final >= start for start, final in runs)
+    assert score == max(final for _, final in runs)
+    assert score == pytest.approx(evaluate_fitness(best, ctx), rel=1e-12)
+
+
+def test_monte_carlo_contexts_are_rejected(ctx):
+    with pytest.raises(ValueError, match='exact'):
+        SwapSearch(EvalContext(ctx.index, ctx.card_db, exact=False))
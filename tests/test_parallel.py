@@ -0,0 +1,55 @@
+import pytest
+
+from src.database import DEFAULT_DB_PATH
+from src.deck import seed_rngs
+from src.deck_optimiser import generate_random_deck, sanitize_seed_deck
+from src.fitness import PLAYABLE_HAND_IDS, fitness_many, set_rules
+from src.parallel import ParallelEvaluator, make_evaluator
+
+WORKERS = 2
+
+# Scores points * P(starter in hand), so sampled scores vary with the draws
+SAMPLED_RULES = {'rules': [{'kind': 'probability', 'all_of': [{'ids': sorted(PLAYABLE_HAND_IDS)}],
+                            'scale': True, 'sampled': True, 'points': 1}]}
+
+
+@pytest.fixture(scope='module')
+def decks(card_db, seeds):
+    seed_rngs(0)
+    return ([sanitize_seed_deck(s, card_db) for s in seeds]
+            + [generate_random_deck(card_db) for _ in range(24)])
+
+
+@pytest.fixture
+def sampled_rules():
+    set_rules(SAMPLED_RULES)
+    yield
+    set_rules(None)
+
+
+def score_remotely(ctx, decks, seed, batches=2):
+    """Scores of `batches` evaluations of the decks, each on an empty cache."""
+    with ParallelEvaluator(WORKERS, DEFAULT_DB_PATH, seed) as evaluator:
+        runs = []
+        for _ in range(batches):
+            ctx.cache.clear()
+            runs.append(evaluator.evaluate(decks))
+    ctx.cache.clear()
+    return runs
+
+
+def test_parallel_matches_in_process_scores(ctx, decks):
+    ctx.cache.clear()
+    local = fitness_many(decks, ctx)
+    assert score_remotely(ctx, decks, seed=1, batches=1)[0] == pytest.approx(local, rel=1e-12)
+
+
+def test_monte_carlo_scores_repeat_for_the_same_seed(ctx, decks, monte_carlo, sampled_rules):
+    first = score_remotely(ctx, decks, seed=1)
+    assert score_remotely(ctx, decks, seed=1) == first
+    # Each batch draws from its own stream
+    assert first[0] != first[1]
+
+
+def test_make_evaluator_stays_in_process_for_one_worker():
+    assert make_evaluator(1, DEFAULT_DB_PATH, seed=1) is None
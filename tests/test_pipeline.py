@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+
+from src.database import compiled_index_path, load_card_index
+from src.pipeline import build_pool, iter_json_cards
+
+DUMP = [
+    {'id': 1, 'name': 'Dragon A', 'type': 'Effect Monster', 'race': 'Dragon', 'archetype': None},
+    {'id': 2, 'name': 'Fusion B', 'type': 'Fusion Monster', 'race': 'Dragon', 'archetype': None},
+    {'id': 3, 'name': 'Warrior C', 'type': 'Effect Monster', 'race': 'Warrior',
+     'archetype': None},
+    {'id': 4, 'name': 'Blue-Eyes Spell', 'type': 'Spell Card', 'race': 'Normal',
+     'archetype': 'Blue-Eyes'},
+    {'id': 5, 'name': 'Blue-Eyes Equip', 'type': 'Equip Spell', 'race': 'Equip',
+     'archetype': 'Blue-Eyes'},
+    {'id': 6, 'name': 'Piri Reis Map', 'type': 'Spell Card', 'race': 'Normal',
+     'archetype': None},
+    {'id': 7, 'name': 'Banned Dragon', 'type': 'Effect Monster', 'race': 'Dragon',
+     'archetype': None, 'banlist_info': {'ban_tcg': 'Forbidden'}},
+    {'id': 8, 'name': 'Odd-Eyes Dragon', 'type': 'Effect Monster', 'race': 'Dragon',
+     'archetype': 'Odd-Eyes'},
+    {'id': 9, 'name': 'Sage', 'type': 'Tuner Monster', 'race': 'Spellcaster',
+     'archetype': 'Blue-Eyes', 'banlist_info': {'ban_tcg': 'Limited'}},
+]
+KEPT = [1, 4, 6, 9]
+
+
+@pytest.fixture
+def dump(tmp_path):
+    """The cards as an API response, with a key before the data array."""
+    path = str(tmp_path / 'dump.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': {'total_rows': len(DUMP), 'note': ']}'}, 'data': DUMP}, f)
+    return path
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 16])
+def test_cards_stream_out_of_the_dump(dump, chunk_size):
+    assert list(iter_json_cards(dump, chunk_size)) == DUMP
+
+
+def test_top_level_arrays_stream_too(tmp_path):
+    path = str(tmp_path / 'cards.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(DUMP, f, indent=2)
+    assert list(iter_json_cards(path, 5)) == DUMP
+
+
+def test_build_pool_writes_the_clean_pool_and_its_index(dump, tmp_path):
+    out = str(tmp_path / 'pool' / 'clean.json')
+    assert build_pool(dump, out) == len(KEPT)
+    with open(out, encoding='utf-8') as f:
+        text = f.read()
+    expected = [{'id': c['id'], 'name': c['name'], 'type': c['type'], 'archetype': c['archetype']}
+                for c in DUMP if c['id'] in KEPT]
+    assert text == json.dumps(expected, ensure_ascii=False, indent=2)
+    assert os.path.isfile(compiled_index_path(out))
+    assert load_card_index(out).ids.tolist() == KEPT
@@ -0,0 +1,55 @@
+from itertools import combinations
+
+import pytest
+
+from src.deck import seed_rngs
+from src.deck_optimiser import sanitize_seed_deck
+from src.fitness import EvalContext, evaluate_fitness
+from src.racing import Racer
+
+
+@pytest.fixture(scope='module')
+def decks(card_db, seeds):
+    seed_rngs(0)
+    return [sanitize_seed_deck(s, card_db) for s in seeds]
+
+
+@pytest.fixture(scope='module')
+def exact_scores(ctx, decks):
+    exact = EvalContext(ctx.index, ctx.card_db, exact=True)
+    return [evaluate_fitness(d, exact) for d in decks]
+
+
+def test_races_pick_the_exactly_better_deck(ctx, decks, exact_scores, monte_carlo):
+    seed_rngs(1)
+    racer = Racer(ctx)
+    pairs = [(i, j) for i, j in combinations(range(len(decks)), 2)
+             if exact_scores[i] != exact_scores[j]]
+    assert pairs
+    for i, j in pairs:
+        a, b = racer.scores([decks[i], decks[j]])
+        assert (a > b) == (exact_scores[i] > exact_scores[j])
+    # Hands are kept per deck profile, so later races draw few new ones
+    assert racer.hands < len(decks) * racer.cap
+
+
+def test_equal_decks_tie_and_invalid_decks_lose(ctx, decks, monte_carlo):
+    seed_rngs(2)
+    racer = Racer(ctx)
+    invalid = decks[0].to_dict()
+    invalid[next(iter(invalid))] = 4
+    a, b, c = racer.scores([decks[0], decks[0].copy(), invalid])
+    assert a == b > c == float('-inf')
+
+
+def test_state_carries_the_remembered_hands(ctx, decks, monte_carlo):
+    seed_rngs(3)
+    racer = Racer(ctx)
+    racer.scores(decks[:6])
+    restored = Racer(ctx)
+    restored.set_state(racer.state())
+    assert (restored.races, restored.hands) == (racer.races, racer.hands)
+    seed_rngs(4)
+    expected = racer.scores(decks[4:])
+    seed_rngs(4)
+    assert restored.scores(decks[4:]) == expected
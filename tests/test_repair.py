@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from src.card_index import CardIndex
+from src.deck import DECK_SIZE, repair, repair_batch
+from src.deck_optimiser import sanitize_seed_deck
+
+
+@pytest.fixture(scope='module')
+def index(card_db):
+    # A small pool with mixed banlist limits
+    ids = sorted(card_db)[:60]
+    return CardIndex.from_card_db({cid: dict(card_db[cid], banlist_limit=1 + i % 3)
+                                   for i, cid in enumerate(ids)})
+
+
+def random_rows(index, rng, n=300):
+    """Count rows from empty to far over size, some over their limits or negative."""
+    density = rng.random((n, 1))
+    counts = rng.integers(-1, 5, size=(n, len(index))) * (rng.random((n, len(index))) < density)
+    return counts
+
+
+def assert_legal(rows, index, deck_size=DECK_SIZE):
+    rows = np.atleast_2d(rows)
+    assert (rows.sum(axis=1) == deck_size).all()
+    assert (rows >= 0).all()
+    assert (rows <= index.limits).all()
+
+
+def test_repair_gives_legal_decks(index):
+    rng = np.random.default_rng(4)
+    for row in random_rows(index, rng, 100):
+        assert_legal(repair(row, index, rng), index)
+
+
+def test_repair_other_deck_sizes(index):
+    rng = np.random.default_rng(2)
+    for deck_size in (5, 60):
+        for row in random_rows(index, rng, 50):
+            assert_legal(repair(row, index, rng, deck_size), index, deck_size)
+
+
+def test_repair_keeps_legal_decks(index):
+    rng = np.random.default_rng(3)
+    for row in random_rows(index, rng, 50):
+        legal = repair(row, index, rng)
+        assert (repair(legal, index, rng) == legal).all()
+
+
+def test_repair_adds_preferred_cards_first(index):
+    rng = np.random.default_rng(1)
+    prefer = np.zeros(len(index), dtype=bool)
+    prefer[:30] = True  # 60 copies of room
+    for row in random_rows(index, rng, 100):
+        clipped = np.clip(row, 0, index.limits)
+        if clipped.sum() >= DECK_SIZE:
+            continue
+        out = repair(row, index, rng, prefer=prefer)
+        assert_legal(out, index)
+        added = out - clipped
+        assert (added >= 0).all()
+        assert not added[~prefer].any()
+
+
+def test_repair_drops_copies_uniformly(index):
+    # An over-size row drops copies uniformly: card i keeps c_i * 40 / total on average
+    rng = np.random.default_rng(5)
+    row = np.minimum(rng.integers(0, 4, len(index)), index.limits)
+    assert row.sum() > DECK_SIZE
+    expected = row * DECK_SIZE / row.sum()
+    kept = np.mean([repair(row, index, rng) for _ in range(4000)], axis=0)
+    assert np.abs(kept - expected).max() < 0.1
+
+
+def test_repair_batch_gives_legal_decks(index):
+    rng = np.random.default_rng(0)
+    assert_legal(repair_batch(random_rows(index, rng), index, rng), index)
+
+
+def test_repair_batch_with_preferred_cards(index):
+    rng = np.random.default_rng(1)
+    counts = random_rows(index, rng)
+    prefer = rng.random(counts.shape) < 0.3
+    out = repair_batch(counts, index, rng, prefer=prefer)
+    assert_legal(out, index)
+    # Short rows add preferred cards first, while they have room
+    clipped = np.clip(counts, 0, index.limits)
+    short = clipped.sum(axis=1) < DECK_SIZE
+    room = np.where(prefer, index.limits - clipped, 0).sum(axis=1)
+    fits = short & (clipped.sum(axis=1) + room >= DECK_SIZE)
+    added = out[fits] - clipped[fits]
+    assert (added >= 0).all()
+    assert not added[~prefer[fits]].any()
+
+
+def test_repair_batch_other_deck_sizes(index):
+    rng = np.random.default_rng(2)
+    for deck_size in (5, 60):
+        assert_legal(repair_batch(random_rows(index, rng, 50), index, rng, deck_size),
+                     index, deck_size)
+
+
+def test_repair_batch_keeps_legal_rows(index):
+    rng = np.random.default_rng(3)
+    legal = repair_batch(random_rows(index, rng), index, rng)
+    assert (repair_batch(legal, index, rng) == legal).all()
+
+
+def test_repair_batch_matches_repair_distribution(index):
+    rng = np.random.default_rng(5)
+    row = np.minimum(rng.integers(0, 4, len(index)), index.limits)
+    expected = row * DECK_SIZE / row.sum()
+    batch = repair_batch(np.tile(row, (4000, 1)), index, rng).mean(axis=0)
+    assert np.abs(batch - expected).max() < 0.1
+
+
+def test_sanitize_seed_deck_replaces_unknown_cards(card_db, ctx, seeds):
+    for seed in seeds:
+        deck = sanitize_seed_deck({**seed, -1: 3}, card_db)
+        assert deck.total() == DECK_SIZE
+        assert (deck.counts <= ctx.index.limits).all()
+        assert -1 not in deck
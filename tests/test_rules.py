@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.deck import Deck, seed_rngs
+from src.deck_optimiser import generate_random_deck, sanitize_seed_deck
+from src.fitness import (
+    BUILTIN_RULES_PATH,
+    EvalContext,
+    compute_deck_score,
+    evaluate_fitness,
+    is_deck_valid,
+)
+from src.rules import CompiledRules, load_rules, validate_rules
+
+
+@pytest.fixture(scope='module')
+def decks(card_db, seeds):
+    seed_rngs(0)
+    return ([sanitize_seed_deck(s, card_db) for s in seeds]
+            + [generate_random_deck(card_db) for _ in range(200)])
+
+
+def test_compiled_rule_file_paths_agree(ctx, decks):
+    scalar = [evaluate_fitness(d.to_dict(), ctx) for d in decks]
+    compiled = CompiledRules(load_rules(BUILTIN_RULES_PATH), ctx.index)
+    rows = [compiled.score_row(compiled.deck_aggregates(d)) for d in decks]
+    batch = compiled.score_counts(np.array([d.counts for d in decks]))
+    assert rows == pytest.approx(scalar, rel=1e-12)
+    assert batch.tolist() == pytest.approx(scalar, rel=1e-12)
+    assert len(set(scalar)) > 1
+
+
+def test_invalid_decks_score_minus_infinity(ctx, decks):
+    over_limit = dict(decks[0].to_dict())
+    over_limit[next(iter(over_limit))] = 4
+    over_size = decks[0].counts.astype(np.int64)
+    over_size[np.flatnonzero(over_size < 3)[0]] += 1
+    unknown = decks[1].to_dict()
+    unknown[-1] = 1
+    for deck in (over_limit, Deck(ctx.index, over_size.astype(np.uint8)), unknown):
+        assert evaluate_fitness(deck, ctx) == float('-inf')
+        assert not is_deck_valid(deck, ctx)
+    assert all(is_deck_valid(d, ctx) for d in decks)
+
+
+def test_compute_deck_score_is_evaluate_fitness(ctx, decks):
+    assert ([compute_deck_score(d.to_dict(), ctx) for d in decks[:20]]
+            == [evaluate_fitness(d.to_dict(), ctx) for d in decks[:20]])
+
+
+def test_custom_rules_replace_the_builtin_ones(ctx, decks):
+    spec = {'rules': [{'kind': 'count', 'cards': {'types': ['Normal Monster']}, 'min': 1,
+                       'points': 2},
+                      {'kind': 'per_card', 'per_copy': [[int(ctx.index.ids[0]), 1]]}]}
+    custom = EvalContext(ctx.index, ctx.card_db, rules=spec)
+    normal = ctx.index.type_mask('Normal Monster')
+    for deck in decks[:20]:
+        expected = 2 * (deck.counts[normal].sum() >= 1) + deck.counts[0]
+        assert evaluate_fitness(deck, custom) == expected
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({}, "'rules' list"),
+    ({'rules': [{'kind': 'count', 'cards': {'all': True}, 'points': 1}]}, "'min' and/or 'max'"),
+    ({'rules': [{'kind': 'count', 'cards': {'ids': [], 'all': True}, 'min': 1, 'points': 1}]},
+     'exactly one of'),
+    ({'rules': [{'kind': 'probability', 'one_each': [{'all': True}], 'sampled': True,
+                 'points': 1}]}, 'can be sampled'),
+    ({'rules': [{'kind': 'probability', 'all_of': [{'all': True}]}]}, "missing 'points'"),
+    ({'rules': [{'kind': 'bonus', 'points': 1}]}, 'unknown rule kind'),
+])
+def test_malformed_rules_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        validate_rules(spec)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.deck import Deck, seed_rngs
+from src.deck_optimiser import build_initial_population
+from src.fitness import fitness_many
+from src.surrogate import Surrogate, spearman
+
+
+@pytest.fixture(scope='module')
+def scored(card_db, seeds, ctx):
+    seed_rngs(0)
+    pop = build_initial_population(card_db, seeds, 400)
+    return pop, np.array(fitness_many(pop, ctx))
+
+
+def test_spearman_ranks_ties_and_constants():
+    assert spearman([1, 2, 3, 4], [10, 20, 30, 40]) == pytest.approx(1.0)
+    assert spearman([1, 2, 3, 4], [4, 3, 2, 1]) == pytest.approx(-1.0)
+    assert spearman([1, 1, 2, 3], [5, 5, 6, 7]) == pytest.approx(1.0)
+    assert spearman([1, 2, 3], [2, 2, 2]) != spearman([1, 2, 3], [2, 2, 2])
+
+
+def test_new_cards_grow_the_normal_equations_exactly(ctx, scored):
+    pop, scores = scored
+    model = Surrogate(ctx, card_weight=0.0)
+    model.observe(pop[:50], scores[:50])
+    first = len(model._cards)
+    model.observe(pop[50:100], scores[50:100])
+    assert len(model._cards) > first
+    # Same as fitting both batches with the final columns from the start
+    xa = model.features(np.array([d.counts for d in pop[:50]]))
+    xb = model.features(np.array([d.counts for d in pop[50:100]]))
+    assert np.allclose(model._xtx, model.decay * xa.T @ xa + xb.T @ xb)
+    assert np.allclose(model._xty, model.decay * xa.T @ scores[:50] + xb.T @ scores[50:100])
+
+
+def test_cards_out_of_use_lose_their_columns(ctx, scored):
+    pop, scores = scored
+    model = Surrogate(ctx)
+    model.observe(pop[:1], scores[:1])
+    once = set(np.flatnonzero(pop[0].counts == 1))
+    assert once <= set(model._cards.tolist())
+    gone = once - set(np.flatnonzero(np.any([d.counts for d in pop[1:3]], axis=0)))
+    assert gone
+    model.observe(pop[1:3], scores[1:3])
+    assert not gone & set(model._cards.tolist())
+    assert len(model._xtx) == len(model._xty) == model._fixed + len(model._cards)
+
+
+@pytest.mark.parametrize('interactions', [False, True])
+def test_predictions_rank_unseen_decks(ctx, scored, interactions):
+    pop, scores = scored
+    model = Surrogate(ctx, interactions=interactions, min_observed=300)
+    assert not model.ready
+    model.observe(pop[:300], scores[:300])
+    assert model.ready
+    assert spearman(model.predict(pop[300:]), scores[300:]) > 0.25
+    assert model.record(pop[300:], scores[300:]) == model.correlations[-1]
+
+
+def test_screen_keeps_the_best_predicted(ctx, scored):
+    pop, scores = scored
+    model = Surrogate(ctx, min_observed=300)
+    rng = np.random.default_rng(0)
+    picked = model.screen(pop[300:], 10, rng)
+    assert len(set(picked)) == 10 and picked == sorted(picked)
+    model.observe(pop[:300], scores[:300])
+    pred = model.predict(pop[300:])
+    picked = model.screen(pop[300:], 10)
+    assert min(pred[picked]) >= np.sort(pred)[-10]
+    assert model.screen(pop[:5], 10) == list(range(5))
+
+
+def test_state_round_trip(ctx, scored):
+    pop, scores = scored
+    model = Surrogate(ctx)
+    model.observe(pop[:200], scores[:200])
+    restored = Surrogate(ctx)
+    restored.set_state(model.state())
+    assert np.array_equal(restored.predict(pop[200:]), model.predict(pop[200:]))
+    with pytest.raises(ValueError, match='--interactions'):
+        Surrogate(ctx, interactions=True).set_state(model.state())
+
+
+def test_invalid_decks_are_not_learned_from(ctx, scored):
+    pop, scores = scored
+    model = Surrogate(ctx)
+    invalid = Deck(ctx.index, pop[0].counts * 0)
+    model.observe([invalid], [float('-inf')])
+    assert model.observed == 0 and not len(model._cards)